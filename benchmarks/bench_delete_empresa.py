@@ -0,0 +1,96 @@
+"""
+Benchmark da exclusão de empresas com muitas obrigações acessórias.
+
+Compara o caminho antigo (o ORM carrega e exclui cada obrigação) com o atual
+(um DELETE por tabela, filtrado pela empresa). No caminho atual o tempo gasto
+no Python não deve crescer com o número de obrigações; no SQLite o trabalho do
+banco roda no mesmo processo e por isso ainda aparece na medição.
+
+Uso:
+    python -m benchmarks.bench_delete_empresa [--url sqlite://] [--filhas 0 100 1000 10000]
+"""
+import argparse
+import time
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session
+
+from models import Base, Empresa, ObrigacaoAcessoria, PeriodicidadeEnum, Usuario
+
+
+def criar_engine(url: str):
+    """Cria a engine do benchmark, ativando as chaves estrangeiras no SQLite."""
+    engine = create_engine(url)
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def _ativar_foreign_keys(dbapi_connection, connection_record):
+            dbapi_connection.execute("PRAGMA foreign_keys=ON")
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def popular(engine, filhas: int) -> int:
+    """Cria uma empresa com `filhas` obrigações e retorna o id da empresa."""
+    with Session(engine) as db:
+        usuario = Usuario(nome="Benchmark", email=f"bench{time.time_ns()}@exemplo.com", senha_hash="x")
+        empresa = Empresa(nome="Empresa Benchmark", cnpj=str(time.time_ns())[-14:],
+                          endereco="Rua Exemplo, 123", email="bench@exemplo.com",
+                          telefone="11999998888", responsavel=usuario)
+        db.add(empresa)
+        db.flush()
+        if filhas:
+            db.execute(insert(ObrigacaoAcessoria), [
+                {"nome": f"Obrigação {i}", "periodicidade": PeriodicidadeEnum.MENSAL,
+                 "empresa_id": empresa.id}
+                for i in range(filhas)
+            ])
+        db.commit()
+        return empresa.id
+
+
+def excluir_orm(engine, empresa_id: int) -> None:
+    """Caminho antigo: carrega as obrigações na sessão e exclui uma a uma."""
+    with Session(engine) as db:
+        empresa = db.get(Empresa, empresa_id)
+        for obrigacao in list(empresa.obrigacoes_acessorias):
+            db.delete(obrigacao)
+        db.delete(empresa)
+        db.commit()
+
+
+def excluir_em_lote(engine, empresa_id: int) -> None:
+    """Caminho atual: um DELETE das obrigações e outro da empresa, sem carregar nada."""
+    with Session(engine) as db:
+        db.query(ObrigacaoAcessoria).filter(ObrigacaoAcessoria.empresa_id == empresa_id).delete(
+            synchronize_session=False)
+        db.query(Empresa).filter(Empresa.id == empresa_id).delete(synchronize_session=False)
+        db.commit()
+
+
+def medir(engine, filhas: int, excluir) -> float:
+    empresa_id = popular(engine, filhas)
+    inicio = time.perf_counter()
+    excluir(engine, empresa_id)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite://", help="URL do banco usado no benchmark")
+    parser.add_argument("--filhas", type=int, nargs="+", default=[0, 100, 1000, 10000, 50000])
+    args = parser.parse_args()
+
+    engine = criar_engine(args.url)
+    print(f"{'obrigações':>12} {'ORM (s)':>10} {'lote (s)':>12}")
+    for filhas in args.filhas:
+        tempo_orm = medir(engine, filhas, excluir_orm)
+        tempo_lote = medir(engine, filhas, excluir_em_lote)
+        with engine.connect() as conn:
+            restantes = conn.exec_driver_sql("SELECT COUNT(*) FROM obrigacoes_acessorias").scalar()
+        assert restantes == 0, "as obrigações não foram removidas"
+        print(f"{filhas:>12} {tempo_orm:>10.4f} {tempo_lote:>12.4f}")
+
+
+if __name__ == "__main__":
+    main()
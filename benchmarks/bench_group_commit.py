@@ -0,0 +1,161 @@
+"""
+Benchmark de POST /empresa concorrente, com e sem agrupamento de escritas (group commit).
+
+Cada modo roda em um processo novo, sobre uma cópia do mesmo banco: o processo
+dispara `--requisicoes` criações com `--concorrencia` clientes simultâneos no
+event loop da aplicação e mede vazão e latência. Uma fração das criações
+(`--duplicadas`) repete um CNPJ já cadastrado, para conferir que só essas
+requisições recebem 409.
+
+Uso:
+    python -m benchmarks.bench_group_commit [--url sqlite:////tmp/bench.db] [--concorrencia 64]
+
+Sem --url, cria um banco SQLite temporário com dados do gerador sintético.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def cnpj_valido(numero: int) -> str:
+    from validators import calcular_digitos_cnpj
+
+    base = f"{numero:012d}"
+    return base + calcular_digitos_cnpj(base)
+
+
+async def medir_processo(requisicoes: int, concorrencia: int, duplicadas: float, inicio_cnpj: int) -> dict:
+    """Executado no processo filho: status e latências (ms) de cada criação."""
+    import httpx
+
+    import main
+    from core import group_commit
+    from core.auth import create_access_token
+    from models import Empresa, Usuario
+
+    with main.SessionLocal() as db:
+        usuario = db.query(Usuario).order_by(Usuario.id).first()
+        existente = db.query(Empresa.cnpj).order_by(Empresa.id).first()[0]
+        cabecalhos = {"Authorization": "Bearer " + create_access_token(
+            {"sub": usuario.email, "uid": usuario.id, "role": "user"})}
+        inicial = db.query(Empresa).count()
+
+    a_cada = round(1 / duplicadas) if duplicadas else 0
+    corpos = [{
+        "nome": f"Bench {i}",
+        "cnpj": existente if a_cada and i % a_cada == 0 else cnpj_valido(inicio_cnpj + i),
+        "endereco": "Rua do Benchmark",
+        "email": "bench@example.com",
+        "telefone": "11999999999",
+    } for i in range(requisicoes)]
+
+    fila = asyncio.Queue()
+    for corpo in corpos:
+        fila.put_nowait(corpo)
+    resultados = []
+
+    async def cliente(http):
+        while not fila.empty():
+            corpo = fila.get_nowait()
+            inicio = time.perf_counter()
+            resposta = await http.post("/empresa", json=corpo, headers=cabecalhos)
+            resultados.append((resposta.status_code, (time.perf_counter() - inicio) * 1000))
+
+    transporte = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as http:
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente(http) for _ in range(concorrencia)))
+        segundos = time.perf_counter() - inicio
+
+    with main.SessionLocal() as db:
+        criadas = db.query(Empresa).count() - inicial
+    return {
+        "segundos": segundos,
+        "status": [status for status, _ in resultados],
+        "latencias": [latencia for _, latencia in resultados],
+        "criadas": criadas,
+        "esperadas_409": sum(1 for corpo in corpos if corpo["cnpj"] == existente),
+        "escritas": group_commit.empresas.stats(),
+    }
+
+
+def percentil(valores, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def executar_modo(url: str, agrupado: bool, args) -> dict:
+    env = {
+        **os.environ,
+        "DATABASE_URL": url,
+        "GROUP_COMMIT_ENABLED": str(agrupado).lower(),
+        "GROUP_COMMIT_MAX_BATCH": str(args.lote),
+        "GROUP_COMMIT_MAX_DELAY_MS": str(args.espera_ms),
+        "WARMUP_ENABLED": "false",
+        "JOBS_ENABLED": "false",
+        "RATE_LIMIT_DEFAULT": "[1000000, 1000000]",
+        "RATE_LIMITS": "{}",
+        "LOG_LEVEL": "ERROR",
+    }
+    saida = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_group_commit", "--filho", "--requisicoes", str(args.requisicoes),
+         "--concorrencia", str(args.concorrencia), "--duplicadas", str(args.duplicadas),
+         # CNPJs novos distintos por modo, caso os dois modos usem o mesmo banco
+         "--inicio-cnpj", str(900_000_000 + int(agrupado) * args.requisicoes)],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="banco já populado (copiado por modo se for SQLite)")
+    parser.add_argument("--requisicoes", type=int, default=2000)
+    parser.add_argument("--concorrencia", type=int, default=64)
+    parser.add_argument("--duplicadas", type=float, default=0.01, help="fração das criações com CNPJ repetido")
+    parser.add_argument("--lote", type=int, default=100, help="GROUP_COMMIT_MAX_BATCH")
+    parser.add_argument("--espera-ms", type=float, default=5.0, help="GROUP_COMMIT_MAX_DELAY_MS")
+    parser.add_argument("--filho", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--inicio-cnpj", type=int, default=900_000_000, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        print(json.dumps(asyncio.run(medir_processo(args.requisicoes, args.concorrencia, args.duplicadas,
+                                                     args.inicio_cnpj))))
+        return
+
+    diretorio = tempfile.mkdtemp()
+    url = args.url
+    if url is None:
+        url = f"sqlite:///{os.path.join(diretorio, 'bench_group_commit.db')}"
+        subprocess.run([sys.executable, "-m", "scripts.gerar_dados", "--url", url, "--usuarios", "50"],
+                       check=True, capture_output=True)
+
+    print(f"{'modo':<10} {'req/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'criadas':>8} {'409':>6} {'lotes':>6}")
+    for agrupado in (False, True):
+        url_modo = url
+        if url.startswith("sqlite:///"):
+            # Cada modo parte do mesmo estado do banco
+            caminho = os.path.join(diretorio, f"modo_{int(agrupado)}.db")
+            shutil.copyfile(url[len("sqlite:///"):], caminho)
+            url_modo = f"sqlite:///{caminho}"
+        resultado = executar_modo(url_modo, agrupado, args)
+        conflitos = resultado["status"].count(409)
+        falhas = len(resultado["status"]) - resultado["status"].count(201) - conflitos
+        print(f"{'agrupado' if agrupado else 'simples':<10} {len(resultado['status']) / resultado['segundos']:>9.0f} "
+              f"{statistics.median(resultado['latencias']):>9.2f} {percentil(resultado['latencias'], 99):>9.2f} "
+              f"{resultado['criadas']:>8} {conflitos:>6} {resultado['escritas']['lotes']:>6}"
+              + (f"   {falhas} respostas inesperadas" if falhas else "")
+              + ("" if conflitos == resultado["esperadas_409"] else
+                 f"   esperados {resultado['esperadas_409']} conflitos"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark da listagem de empresas por usuário (GET /empresas).
+
+Um usuário fixo tem `--por-usuario` empresas; as dos demais usuários crescem
+até `--totais`. Com o índice (usuario_id, id) a latência da página do usuário
+deve ficar estável, enquanto a mesma consulta impedida de usar o índice
+(`usuario_id + 0`) cresce com o total da tabela.
+
+Uso:
+    python -m benchmarks.bench_owner_listing [--url sqlite://] [--totais 10000 100000 1000000]
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.orm import Session
+
+from models import Base, Empresa, Usuario
+
+
+def inserir_empresas(engine, inicio: int, fim: int, usuarios: int, lote: int = 50_000) -> None:
+    """Insere as empresas com ids em [inicio, fim), distribuídas entre `usuarios` usuários."""
+    for base in range(inicio, fim, lote):
+        with engine.begin() as conn:
+            conn.execute(insert(Empresa), [
+                {"id": i, "nome": f"Empresa {i}", "cnpj": f"{i:014d}", "endereco": "Rua Exemplo, 123",
+                 "email": "bench@exemplo.com", "telefone": "11999998888", "usuario_id": 2 + i % usuarios}
+                for i in range(base, min(base + lote, fim))
+            ])
+
+
+def medir(engine, consulta, repeticoes: int) -> float:
+    """Mediana, em milissegundos, de `repeticoes` execuções da consulta."""
+    tempos = []
+    with Session(engine) as db:
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            db.execute(consulta).all()
+            tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite://", help="URL do banco usado no benchmark")
+    parser.add_argument("--totais", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--por-usuario", type=int, default=100)
+    parser.add_argument("--usuarios", type=int, default=1000, help="demais usuários")
+    parser.add_argument("--repeticoes", type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Usuario), [
+            {"id": i, "nome": f"Usuário {i}", "email": f"bench{i}@exemplo.com", "senha_hash": "x"}
+            for i in range(1, args.usuarios + 2)
+        ])
+        # As empresas do usuário medido ficam espalhadas entre as demais (ids altos)
+        conn.execute(insert(Empresa), [
+            {"id": 10 ** 9 + i, "nome": f"Empresa do usuário {i}", "cnpj": f"9{i:013d}",
+             "endereco": "Rua Exemplo, 123", "email": "bench@exemplo.com",
+             "telefone": "11999998888", "usuario_id": 1}
+            for i in range(args.por_usuario)
+        ])
+
+    pagina = select(Empresa).where(Empresa.usuario_id == 1, Empresa.id > 0).order_by(Empresa.id).limit(100)
+    # Mesma consulta, mas a expressão sobre a coluna impede o uso do índice
+    sem_indice = select(Empresa).where(Empresa.usuario_id + 0 == 1, Empresa.id > 0).order_by(Empresa.id).limit(100)
+
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            plano = conn.execute(text("EXPLAIN QUERY PLAN " + str(pagina.compile(
+                engine, compile_kwargs={"literal_binds": True})))).all()
+        print("Plano:", "; ".join(linha[-1] for linha in plano))
+
+    print(f"{'empresas':>10} {'com índice (ms)':>16} {'sem índice (ms)':>16}")
+    inseridas = 0
+    for total in args.totais:
+        inserir_empresas(engine, inseridas + 1, total + 1, args.usuarios)
+        inseridas = total
+        with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                conn.execute(text("ANALYZE empresas"))
+        print(f"{total:>10} {medir(engine, pagina, args.repeticoes):>16.3f} "
+              f"{medir(engine, sem_indice, max(3, args.repeticoes // 10)):>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark de validação e serialização dos schemas de listagem.
+
+Compara o caminho antigo, um item por vez (equivalente ao from_orm/dict do
+Pydantic v1), com o atual, em que o TypeAdapter de List[schema] valida e
+serializa a lista inteira em uma única chamada ao núcleo do Pydantic.
+
+Uso:
+    python -m benchmarks.bench_schemas [--itens 100 1000 10000] [--repeticoes 5]
+"""
+from datetime import datetime
+from types import SimpleNamespace
+import argparse
+import json
+import time
+
+from core.pagination import list_adapter
+from models import PeriodicidadeEnum
+from schemas.empresa import Empresa
+from schemas.obrigacao_acessoria import ObrigacaoAcessoria
+
+
+def gerar_empresas(quantidade: int):
+    """Objetos com os atributos de um models.Empresa carregado do banco."""
+    agora = datetime.now()
+    return [
+        SimpleNamespace(id=i, nome=f"Empresa {i}", cnpj="11222333000181", endereco="Rua Exemplo, 123",
+                        email=f"contato{i}@exemplo.com", telefone="11999998888", usuario_id=1,
+                        data_criacao=agora, data_atualizacao=None)
+        for i in range(1, quantidade + 1)
+    ]
+
+
+def gerar_obrigacoes(quantidade: int):
+    """Objetos com os atributos de um models.ObrigacaoAcessoria, com a empresa carregada."""
+    agora = datetime.now()
+    empresa = gerar_empresas(1)[0]
+    return [
+        SimpleNamespace(id=i, nome=f"Obrigação {i}", periodicidade=PeriodicidadeEnum.MENSAL,
+                        descricao=None, data_vencimento=agora, empresa_id=empresa.id,
+                        empresa=empresa, data_criacao=agora, data_atualizacao=None)
+        for i in range(1, quantidade + 1)
+    ]
+
+
+def por_item(schema, objetos) -> bytes:
+    """Caminho antigo: valida e converte cada objeto separadamente."""
+    itens = [schema.model_validate(obj, from_attributes=True) for obj in objetos]
+    return json.dumps([item.model_dump(mode="json") for item in itens]).encode()
+
+
+def em_lote(schema, objetos) -> bytes:
+    """Caminho atual: uma validação e uma serialização para a lista inteira."""
+    adapter = list_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(objetos, from_attributes=True))
+
+
+def medir(funcao, schema, objetos, repeticoes: int) -> float:
+    """Retorna o melhor tempo entre as repetições."""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(schema, objetos)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--itens", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'schema':<20} {'itens':>8} {'por item (s)':>13} {'em lote (s)':>12} {'itens/s (lote)':>15}")
+    for schema, gerar in ((Empresa, gerar_empresas), (ObrigacaoAcessoria, gerar_obrigacoes)):
+        for quantidade in args.itens:
+            objetos = gerar(quantidade)
+            assert json.loads(por_item(schema, objetos)) == json.loads(em_lote(schema, objetos))
+            tempo_item = medir(por_item, schema, objetos, args.repeticoes)
+            tempo_lote = medir(em_lote, schema, objetos, args.repeticoes)
+            print(f"{schema.__name__:<20} {quantidade:>8} {tempo_item:>13.4f} {tempo_lote:>12.4f} "
+                  f"{quantidade / tempo_lote:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
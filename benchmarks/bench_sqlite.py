@@ -0,0 +1,200 @@
+"""
+Benchmark do SQLite padrão contra o modo ajustado (SQLITE_TUNED) com vários workers.
+
+Para cada modo, `--processos` processos (como os workers do uvicorn) abrem a
+aplicação sobre uma cópia do mesmo banco e, a partir do mesmo instante,
+executam por `--segundos` uma mistura de leituras (listagens e busca por id)
+e escritas (criação de obrigação e edição de empresa), na proporção de
+`--escritas`. Mede vazão, latência por tipo e respostas de erro (no modo
+padrão, tipicamente "database is locked").
+
+Com --sem-http as operações vão direto às sessões (leitura com a sessão de
+get_read_db, escrita com SessionLocal e commit), isolando o custo do banco do
+custo das requisições.
+
+Uso:
+    python -m benchmarks.bench_sqlite [--processos 4] [--segundos 10] [--escritas 0.2] [--sem-http]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+LEITURAS = (
+    ("GET", "/empresas?limit=20"),
+    ("GET", "/empresa/{empresa_id}"),
+    ("GET", "/obrigacaoAcessoria?limit=20&sort=data_vencimento"),
+)
+ESCRITAS = (
+    ("POST", "/obrigacaoAcessoria"),
+    ("PUT", "/empresa/{empresa_id}"),
+)
+
+
+def medir_sessoes(segundos: float, escritas: float, inicio: float, semente: int) -> dict:
+    """Como medir_processo, sem HTTP: leitura por id e edição de empresa com commit."""
+    from sqlalchemy import update
+    from sqlalchemy.exc import OperationalError
+
+    import database
+    from core.consultas import EMPRESA_POR_ID
+    from models import Empresa
+
+    with database.SessionLocal() as db:
+        empresas = [empresa_id for (empresa_id,) in db.query(Empresa.id)]
+    sessao_leitura = next(database._replica_sessions)
+
+    aleatorio = random.Random(semente)
+    resultados = {"leitura": [], "escrita": []}
+    status = {}
+    time.sleep(max(0.0, inicio - time.time()))
+    fim = time.time() + segundos
+    while time.time() < fim:
+        tipo = "escrita" if aleatorio.random() < escritas else "leitura"
+        empresa_id = aleatorio.choice(empresas)
+        comeco = time.perf_counter()
+        codigo = 200
+        try:
+            if tipo == "escrita":
+                with database.SessionLocal() as db:
+                    # Lê e depois escreve, como os endpoints de edição
+                    db.scalars(EMPRESA_POR_ID, {"id": empresa_id}).first()
+                    db.execute(update(Empresa).where(Empresa.id == empresa_id)
+                               .values(nome=f"Bench {aleatorio.random():.6f}"))
+                    db.commit()
+            else:
+                with sessao_leitura() as db:
+                    db.scalars(EMPRESA_POR_ID, {"id": empresa_id}).first()
+        except OperationalError:
+            codigo = 500
+        resultados[tipo].append((time.perf_counter() - comeco) * 1000)
+        status[codigo] = status.get(codigo, 0) + 1
+    return {"latencias": resultados, "status": status}
+
+
+def medir_processo(segundos: float, escritas: float, inicio: float, semente: int) -> dict:
+    """Executado em cada processo filho: latências (ms) e status por tipo de operação."""
+    from fastapi.testclient import TestClient
+
+    import main
+    from core.auth import create_access_token
+    from models import Empresa, Usuario
+
+    with main.SessionLocal() as db:
+        usuario = db.query(Usuario).order_by(Usuario.id).first()
+        cnpjs = dict(db.query(Empresa.id, Empresa.cnpj))
+        empresas = list(cnpjs)
+        cabecalhos = {"Authorization": "Bearer " + create_access_token(
+            {"sub": usuario.email, "uid": usuario.id, "role": "admin"})}
+
+    aleatorio = random.Random(semente)
+    resultados = {"leitura": [], "escrita": []}
+    status = {}
+    with TestClient(main.app) as client:
+        while client.get("/health/ready").status_code != 200:
+            time.sleep(0.01)
+        time.sleep(max(0.0, inicio - time.time()))
+        fim = time.time() + segundos
+        while time.time() < fim:
+            tipo = "escrita" if aleatorio.random() < escritas else "leitura"
+            metodo, rota = aleatorio.choice(ESCRITAS if tipo == "escrita" else LEITURAS)
+            empresa_id = aleatorio.choice(empresas)
+            corpo = None
+            if metodo == "POST":
+                corpo = {"nome": "Bench", "periodicidade": "MENSAL", "empresa_id": empresa_id}
+            elif metodo == "PUT":
+                corpo = {"nome": f"Bench {aleatorio.random():.6f}", "cnpj": cnpjs[empresa_id],
+                         "endereco": "Rua do Benchmark", "email": "bench@example.com", "telefone": "11999999999"}
+            comeco = time.perf_counter()
+            resposta = client.request(metodo, rota.format(empresa_id=empresa_id), json=corpo, headers=cabecalhos)
+            resultados[tipo].append((time.perf_counter() - comeco) * 1000)
+            status[resposta.status_code] = status.get(resposta.status_code, 0) + 1
+    return {"latencias": resultados, "status": status}
+
+
+def percentil(valores, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def executar_modo(caminho: str, ajustado: bool, args) -> dict:
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{caminho}",
+        "SQLITE_TUNED": str(ajustado).lower(),
+        "RESPONSE_CACHE_ROUTES": "{}",
+        "EMPRESA_SNAPSHOT_ENABLED": "false",
+        "JOBS_ENABLED": "false",
+        "RATE_LIMIT_DEFAULT": "[1000000, 1000000]",
+        "RATE_LIMITS": "{}",
+        "LOG_LEVEL": "CRITICAL",
+    }
+    # Todos os processos começam a medir no mesmo instante, depois de importar a aplicação
+    inicio = time.time() + args.preparo
+    processos = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_sqlite", "--filho", "--segundos", str(args.segundos),
+             "--escritas", str(args.escritas), "--inicio", str(inicio), "--semente", str(i)]
+            + (["--sem-http"] if args.sem_http else []),
+            env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        for i in range(args.processos)
+    ]
+    total = {"latencias": {"leitura": [], "escrita": []}, "status": {}}
+    for processo in processos:
+        saida, _ = processo.communicate()
+        if processo.returncode != 0:
+            raise RuntimeError(f"processo de benchmark terminou com código {processo.returncode}")
+        resultado = json.loads(saida.strip().splitlines()[-1])
+        for tipo, latencias in resultado["latencias"].items():
+            total["latencias"][tipo].extend(latencias)
+        for codigo, quantidade in resultado["status"].items():
+            total["status"][codigo] = total["status"].get(codigo, 0) + quantidade
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processos", type=int, default=4)
+    parser.add_argument("--segundos", type=float, default=10.0)
+    parser.add_argument("--escritas", type=float, default=0.2, help="fração das operações que escrevem")
+    parser.add_argument("--usuarios", type=int, default=200, help="tamanho do banco gerado")
+    parser.add_argument("--preparo", type=float, default=8.0, help="segundos para os processos iniciarem")
+    parser.add_argument("--sem-http", action="store_true", help="operações direto nas sessões, sem a aplicação")
+    parser.add_argument("--filho", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--inicio", type=float, default=0.0, help=argparse.SUPPRESS)
+    parser.add_argument("--semente", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        medir = medir_sessoes if args.sem_http else medir_processo
+        print(json.dumps(medir(args.segundos, args.escritas, args.inicio, args.semente)))
+        return
+
+    diretorio = tempfile.mkdtemp()
+    original = os.path.join(diretorio, "bench_sqlite.db")
+    subprocess.run([sys.executable, "-m", "scripts.gerar_dados", "--url", f"sqlite:///{original}",
+                    "--usuarios", str(args.usuarios)], check=True, capture_output=True)
+
+    print(f"{'modo':<9} {'op/s':>7} {'leit. p50':>10} {'leit. p99':>10} {'escr. p50':>10} {'escr. p99':>10} "
+          f"{'erros':>6}")
+    for ajustado in (False, True):
+        # Cada modo parte do mesmo banco, no journal padrão
+        caminho = os.path.join(diretorio, f"modo_{int(ajustado)}.db")
+        shutil.copyfile(original, caminho)
+        resultado = executar_modo(caminho, ajustado, args)
+        leituras, escritas = resultado["latencias"]["leitura"], resultado["latencias"]["escrita"]
+        erros = sum(quantidade for codigo, quantidade in resultado["status"].items() if int(codigo) >= 500)
+        print(f"{'ajustado' if ajustado else 'padrão':<9} {(len(leituras) + len(escritas)) / args.segundos:>7.0f} "
+              f"{statistics.median(leituras):>10.2f} {percentil(leituras, 99):>10.2f} "
+              f"{statistics.median(escritas):>10.2f} {percentil(escritas, 99):>10.2f} {erros:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark das primeiras requisições de um worker recém-iniciado, com e sem aquecimento.
+
+Cada modo roda em um processo novo (caches de compilação, pool e backend do
+bcrypt vazios): o processo importa a aplicação, espera /health/ready e mede
+as `--rodadas` primeiras passadas pelo conjunto de rotas. O cache de respostas
+é desligado para que todas as requisições cheguem ao banco.
+
+Uso:
+    python -m benchmarks.bench_warmup [--url sqlite:////tmp/bench.db] [--rodadas 20]
+
+Sem --url, cria um banco SQLite temporário com dados do gerador sintético.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROTAS = [
+    ("GET", "/empresa/1"),
+    ("GET", "/obrigacaoAcessoria/1"),
+    ("GET", "/empresas?limit=20"),
+    ("GET", "/obrigacaoAcessoria?limit=20&sort=data_vencimento"),
+    ("POST", "/login"),
+]
+
+
+def medir_processo(rodadas: int) -> dict:
+    """Executado no processo filho: tempos (ms) por rota, na ordem das rodadas."""
+    from fastapi.testclient import TestClient
+
+    import main
+    from core.auth import create_access_token
+    from models import Usuario
+
+    with main.SessionLocal() as db:
+        usuario = db.query(Usuario).order_by(Usuario.id).first()
+        email, uid = usuario.email, usuario.id
+    # Administrador: /empresa/1 e /obrigacaoAcessoria/1 respondem qualquer que seja o dono
+    cabecalhos = {"Authorization": "Bearer " + create_access_token({"sub": email, "uid": uid, "role": "admin"})}
+
+    tempos = {f"{metodo} {rota}": [] for metodo, rota in ROTAS}
+    with TestClient(main.app) as client:
+        inicio = time.perf_counter()
+        while client.get("/health/ready").status_code != 200:
+            time.sleep(0.01)
+        pronto_ms = (time.perf_counter() - inicio) * 1000
+        for _ in range(rodadas):
+            for metodo, rota in ROTAS:
+                inicio = time.perf_counter()
+                if metodo == "POST":
+                    client.post(rota, data={"username": email, "password": os.environ["BENCH_SENHA"]})
+                else:
+                    client.get(rota, headers=cabecalhos)
+                tempos[f"{metodo} {rota}"].append((time.perf_counter() - inicio) * 1000)
+    return {"pronto_ms": pronto_ms, "tempos": tempos}
+
+
+def percentil(valores, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def executar_modo(url: str, aquecimento: bool, rodadas: int, senha: str) -> dict:
+    env = {
+        **os.environ,
+        "DATABASE_URL": url,
+        "WARMUP_ENABLED": str(aquecimento).lower(),
+        "RESPONSE_CACHE_ROUTES": "{}",
+        "JOBS_ENABLED": "false",
+        "RATE_LIMIT_DEFAULT": "[100000, 100000]",
+        "RATE_LIMITS": "{}",
+        "LOG_LEVEL": "ERROR",
+        "BENCH_SENHA": senha,
+    }
+    saida = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_warmup", "--filho", "--rodadas", str(rodadas)],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="banco já populado (usuários com a senha de --senha)")
+    parser.add_argument("--senha", default="senha123", help="senha dos usuários do gerador sintético")
+    parser.add_argument("--rodadas", type=int, default=20)
+    parser.add_argument("--filho", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        print(json.dumps(medir_processo(args.rodadas)))
+        return
+
+    url = args.url
+    if url is None:
+        caminho = os.path.join(tempfile.mkdtemp(), "bench_warmup.db")
+        url = f"sqlite:///{caminho}"
+        subprocess.run([sys.executable, "-m", "scripts.gerar_dados", "--url", url, "--usuarios", "50",
+                        "--senha", args.senha], check=True, capture_output=True)
+
+    print(f"{'rota':<55} {'modo':>6} {'1ª (ms)':>9} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for aquecimento in (False, True):
+        resultado = executar_modo(url, aquecimento, args.rodadas, args.senha)
+        modo = "quente" if aquecimento else "frio"
+        for rota, tempos in resultado["tempos"].items():
+            print(f"{rota:<55} {modo:>6} {tempos[0]:>9.2f} {statistics.median(tempos):>9.2f} "
+                  f"{percentil(tempos, 99):>9.2f}")
+        todos = [tempo for rota, tempos in resultado["tempos"].items() if rota != "POST /login"
+                 for tempo in tempos]
+        print(f"{'(todas exceto login)':<55} {modo:>6} {'':>9} {statistics.median(todos):>9.2f} "
+              f"{percentil(todos, 99):>9.2f}   pronto em {resultado['pronto_ms']:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""
+Verificação de regressão de desempenho contra uma linha de base em JSON.
+
+Executa um conjunto fixo de benchmarks sobre um banco SQLite local populado
+pelo gerador sintético (sempre com a mesma semente):
+
+    validar_cnpj             validators.validar_cnpj
+    paginate                 core.pagination.paginate (contagem + página de 50 empresas)
+    POST /empresa, GET /empresa/{id}, PUT /empresa/{id}, DELETE /empresa/{id}
+    GET /empresas, GET /obrigacaoAcessoria
+    POST /login
+
+As rotas passam pela aplicação inteira (TestClient), com o cache de respostas
+e os limites de requisição desligados. Cada métrica é medida em `--repeticoes`
+rodadas; a amostra de uma rodada é o tempo médio por operação (µs) e o
+resultado é a mediana das rodadas, com o intervalo interquartil (IQR) como
+medida de ruído.
+
+Uma métrica regride quando a mediana atual passa da linha de base em mais de
+`--tolerancia` E a diferença é maior que o ruído (o maior dos dois IQRs). A
+linha de base é antes corrigida pela calibração (uma carga fixa de Python
+puro medida nas duas execuções), que absorve mudanças de velocidade da máquina.
+
+Uso:
+    python -m benchmarks.regressao --salvar              # grava a linha de base
+    python -m benchmarks.regressao [--tolerancia 0.15]   # compara; sai com 1 se regredir
+    python -m benchmarks.regressao --apenas validar_cnpj paginate
+
+A linha de base depende da máquina: grave-a no mesmo ambiente em que a
+verificação vai rodar (por exemplo, no runner de CI).
+"""
+from typing import Callable, Dict, List
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASELINE_PADRAO = os.path.join(os.path.dirname(__file__), "baselines", "regressao.json")
+SEMENTE = 42
+SENHA = "senha123"
+
+# nome -> (função(contexto, n) -> segundos gastos nas n operações, n por rodada)
+BENCHMARKS: Dict[str, tuple] = {}
+
+
+def benchmark(nome: str, operacoes: int):
+    def registrar(funcao: Callable):
+        BENCHMARKS[nome] = (funcao, operacoes)
+        return funcao
+    return registrar
+
+
+def calibrar(repeticoes: int) -> float:
+    """
+    Mediana (µs) de uma carga fixa de Python puro, que não depende do código do projeto.
+
+    Compartilhar a máquina (CPU turbo, vizinhos barulhentos) muda todas as
+    métricas na mesma proporção; as comparações dividem cada mediana pela
+    calibração da mesma execução.
+    """
+    def carga() -> float:
+        inicio = time.perf_counter()
+        total = 0
+        for i in range(200_000):
+            total += int(str(i)[::-1]) % 7
+        return (time.perf_counter() - inicio) * 1e6
+
+    carga()
+    return statistics.median(carga() for _ in range(max(repeticoes, 5)))
+
+
+def _cnpj(numero: int) -> str:
+    from validators import calcular_digitos_cnpj
+
+    base = f"99{numero:06d}0001"
+    return base + calcular_digitos_cnpj(base)
+
+
+@benchmark("validar_cnpj", 20_000)
+def bench_validar_cnpj(ctx, n: int) -> float:
+    from validators import validar_cnpj
+
+    cnpjs = ctx["cnpjs"]
+    inicio = time.perf_counter()
+    for i in range(n):
+        validar_cnpj(cnpjs[i % len(cnpjs)])
+    return time.perf_counter() - inicio
+
+
+@benchmark("paginate", 50)
+def bench_paginate(ctx, n: int) -> float:
+    from core.pagination import PaginationParams, paginate
+    from models import Empresa
+    from schemas.empresa import Empresa as EmpresaSchema
+
+    with ctx["SessionLocal"]() as db:
+        inicio = time.perf_counter()
+        for i in range(n):
+            paginate(db.query(Empresa).order_by(Empresa.id), PaginationParams(page=1 + i % 20, size=50), EmpresaSchema)
+        return time.perf_counter() - inicio
+
+
+def _crud(ctx, n: int, medir: str) -> float:
+    """Ciclo criar/buscar/editar/excluir, cronometrando apenas a etapa `medir`."""
+    client, cabecalhos = ctx["client"], ctx["cabecalhos"]
+    gasto = 0.0
+    for _ in range(n):
+        ctx["sequencia"] += 1
+        cnpj = _cnpj(ctx["sequencia"])
+        corpo = {"nome": f"Regressão {cnpj}", "cnpj": cnpj, "endereco": "Rua Exemplo, 123",
+                 "email": "regressao@exemplo.com", "telefone": "11999998888"}
+
+        inicio = time.perf_counter()
+        resposta = client.post("/empresa", json=corpo, headers=cabecalhos)
+        gasto += time.perf_counter() - inicio if medir == "POST" else 0.0
+        resposta.raise_for_status()
+        with ctx["SessionLocal"]() as db:
+            empresa_id = db.scalars(ctx["EMPRESA_POR_CNPJ"], {"cnpj": cnpj}).one().id
+
+        inicio = time.perf_counter()
+        client.get(f"/empresa/{empresa_id}", headers=cabecalhos).raise_for_status()
+        gasto += time.perf_counter() - inicio if medir == "GET" else 0.0
+
+        inicio = time.perf_counter()
+        client.put(f"/empresa/{empresa_id}", json={**corpo, "nome": corpo["nome"] + " (editada)"},
+                   headers=cabecalhos).raise_for_status()
+        gasto += time.perf_counter() - inicio if medir == "PUT" else 0.0
+
+        inicio = time.perf_counter()
+        client.delete(f"/empresa/{empresa_id}", headers=cabecalhos).raise_for_status()
+        gasto += time.perf_counter() - inicio if medir == "DELETE" else 0.0
+    return gasto
+
+
+for _metodo, _rota in (("POST", "/empresa"), ("GET", "/empresa/{id}"), ("PUT", "/empresa/{id}"),
+                       ("DELETE", "/empresa/{id}")):
+    benchmark(f"{_metodo} {_rota}", 30)(lambda ctx, n, medir=_metodo: _crud(ctx, n, medir))
+
+
+def _get(rota: str, autenticado: bool):
+    def medir(ctx, n: int) -> float:
+        cabecalhos = ctx["cabecalhos"] if autenticado else {}
+        inicio = time.perf_counter()
+        for _ in range(n):
+            ctx["client"].get(rota, headers=cabecalhos).raise_for_status()
+        return time.perf_counter() - inicio
+    return medir
+
+
+benchmark("GET /empresas", 50)(_get("/empresas?limit=100", autenticado=True))
+benchmark("GET /obrigacaoAcessoria", 50)(_get("/obrigacaoAcessoria?limit=100&sort=data_vencimento", autenticado=True))
+
+
+@benchmark("POST /login", 3)
+def bench_login(ctx, n: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(n):
+        ctx["client"].post("/login", data={"username": ctx["email"], "password": SENHA}).raise_for_status()
+    return time.perf_counter() - inicio
+
+
+def preparar(diretorio: str) -> dict:
+    """Cria e popula o banco, configura a aplicação e devolve o contexto dos benchmarks."""
+    url = f"sqlite:///{os.path.join(diretorio, 'regressao.db')}"
+    subprocess.run([sys.executable, "-m", "scripts.gerar_dados", "--url", url, "--usuarios", "200",
+                    "--semente", str(SEMENTE), "--data-referencia", "2024-01-01", "--senha", SENHA],
+                   check=True, capture_output=True)
+    # Antes de importar a aplicação: settings é lido no import
+    os.environ.update({
+        "DATABASE_URL": url,
+        "CACHE_INVALIDATION_PATH": os.path.join(diretorio, "geracoes"),
+        "EXPORT_DIR": os.path.join(diretorio, "exportacoes"),
+        "RESPONSE_CACHE_ROUTES": "{}",
+        "JOBS_ENABLED": "false",
+        "RATE_LIMITS": "{}",
+        "RATE_LIMIT_DEFAULT": "[1000000, 1000000]",
+        "LOG_LEVEL": "ERROR",
+    })
+
+    from fastapi.testclient import TestClient
+
+    import main
+    from core.auth import create_access_token
+    from core.consultas import EMPRESA_POR_CNPJ
+    from models import Empresa, Usuario
+
+    with main.SessionLocal() as db:
+        usuario = db.query(Usuario).filter(Usuario.ativo.is_(True)).order_by(Usuario.id).first()
+        cnpjs = [cnpj for (cnpj,) in db.query(Empresa.cnpj).order_by(Empresa.id).limit(1000)]
+
+    client = TestClient(main.app)
+    client.__enter__()
+    while client.get("/health/ready").status_code != 200:
+        time.sleep(0.01)
+    return {
+        "client": client,
+        "SessionLocal": main.SessionLocal,
+        "EMPRESA_POR_CNPJ": EMPRESA_POR_CNPJ,
+        "email": usuario.email,
+        "cabecalhos": {"Authorization": "Bearer " + create_access_token(
+            {"sub": usuario.email, "uid": usuario.id, "role": usuario.role})},
+        "cnpjs": cnpjs,
+        "sequencia": 0,
+    }
+
+
+def quartis(amostras: List[float]) -> tuple:
+    if len(amostras) < 2:
+        return amostras[0], amostras[0]
+    q1, _, q3 = statistics.quantiles(amostras, n=4, method="inclusive")
+    return q1, q3
+
+
+def medir(ctx, nomes: List[str], repeticoes: int) -> Dict[str, dict]:
+    resultados = {}
+    for nome in nomes:
+        funcao, operacoes = BENCHMARKS[nome]
+        funcao(ctx, max(1, operacoes // 10))  # aquecimento, descartado
+        amostras = [funcao(ctx, operacoes) / operacoes * 1e6 for _ in range(repeticoes)]
+        q1, q3 = quartis(amostras)
+        resultados[nome] = {"mediana_us": statistics.median(amostras), "iqr_us": q3 - q1,
+                            "amostras_us": amostras}
+        print(f"  {nome:<28} {resultados[nome]['mediana_us']:>12.1f} µs  (IQR {q3 - q1:.1f})", file=sys.stderr)
+    return resultados
+
+
+def comparar(base: Dict[str, dict], atual: Dict[str, dict], tolerancia: float, escala: float = 1.0) -> List[str]:
+    """
+    Imprime a comparação e retorna as métricas que regrediram.
+
+    Args:
+        base: Métricas da linha de base
+        atual: Métricas desta execução
+        tolerancia: Piora relativa aceita
+        escala: Calibração atual / calibração da base; a base é corrigida por ela
+    """
+    regressoes = []
+    print(f"{'métrica':<28} {'base (µs)':>12} {'atual (µs)':>12} {'Δ':>8} {'ruído (µs)':>11}  situação")
+    for nome, medida in atual.items():
+        anterior = base.get(nome)
+        if anterior is None:
+            print(f"{nome:<28} {'-':>12} {medida['mediana_us']:>12.1f} {'':>8} {medida['iqr_us']:>11.1f}  nova")
+            continue
+        anterior = {"mediana_us": anterior["mediana_us"] * escala, "iqr_us": anterior["iqr_us"] * escala}
+        diferenca = medida["mediana_us"] - anterior["mediana_us"]
+        relativa = diferenca / anterior["mediana_us"]
+        ruido = max(medida["iqr_us"], anterior["iqr_us"])
+        if relativa > tolerancia and diferenca > ruido:
+            situacao = "REGRESSÃO"
+            regressoes.append(nome)
+        elif relativa < -tolerancia and -diferenca > ruido:
+            situacao = "melhora"
+        else:
+            situacao = "ok"
+        print(f"{nome:<28} {anterior['mediana_us']:>12.1f} {medida['mediana_us']:>12.1f} {relativa:>+8.1%} "
+              f"{ruido:>11.1f}  {situacao}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", default=BASELINE_PADRAO, help="arquivo JSON da linha de base")
+    parser.add_argument("--salvar", action="store_true", help="grava os resultados como nova linha de base")
+    parser.add_argument("--tolerancia", type=float, default=0.15, help="piora relativa aceita (0.15 = 15%%)")
+    parser.add_argument("--repeticoes", type=int, default=7)
+    parser.add_argument("--apenas", nargs="+", choices=sorted(BENCHMARKS), default=None)
+    parser.add_argument("--saida", default=None, help="grava também os resultados desta execução em JSON")
+    args = parser.parse_args()
+
+    nomes = args.apenas or list(BENCHMARKS)
+    with tempfile.TemporaryDirectory() as diretorio:
+        print("Preparando o banco...", file=sys.stderr)
+        ctx = preparar(diretorio)
+        try:
+            calibracao = calibrar(args.repeticoes)
+            resultados = medir(ctx, nomes, args.repeticoes)
+            # Média das duas medições: a velocidade da máquina pode mudar durante a execução
+            calibracao = (calibracao + calibrar(args.repeticoes)) / 2
+        finally:
+            ctx["client"].__exit__(None, None, None)
+
+    documento = {
+        "ambiente": {"python": platform.python_version(), "plataforma": platform.platform(),
+                     "processador": platform.processor() or platform.machine()},
+        "repeticoes": args.repeticoes,
+        "calibracao_us": calibracao,
+        "metricas": resultados,
+    }
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(documento, arquivo, indent=2, ensure_ascii=False)
+
+    if args.salvar:
+        base = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as arquivo:
+                anterior = json.load(arquivo)
+            # Métricas não medidas agora (--apenas) são mantidas, convertidas para esta calibração
+            escala = calibracao / anterior.get("calibracao_us", calibracao)
+            base = {nome: {**medida, "mediana_us": medida["mediana_us"] * escala, "iqr_us": medida["iqr_us"] * escala}
+                    for nome, medida in anterior["metricas"].items()}
+        documento["metricas"] = {**base, **resultados}
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as arquivo:
+            json.dump(documento, arquivo, indent=2, ensure_ascii=False)
+        print(f"Linha de base gravada em {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"Linha de base {args.baseline} não encontrada; grave-a com --salvar", file=sys.stderr)
+        sys.exit(2)
+    with open(args.baseline, encoding="utf-8") as arquivo:
+        base = json.load(arquivo)
+    if base.get("ambiente") != documento["ambiente"]:
+        print(f"Aviso: linha de base gravada em outro ambiente ({base.get('ambiente')})", file=sys.stderr)
+
+    escala = calibracao / base.get("calibracao_us", calibracao)
+    print(f"Calibração: base {base.get('calibracao_us', calibracao):.0f} µs, atual {calibracao:.0f} µs "
+          f"(base corrigida por {escala:.3f})\n")
+    regressoes = comparar(base["metricas"], resultados, args.tolerancia, escala)
+    if regressoes:
+        print(f"\n{len(regressoes)} métrica(s) regrediram mais de {args.tolerancia:.0%}: {', '.join(regressoes)}")
+        sys.exit(1)
+    print("\nSem regressões.")
+
+
+if __name__ == "__main__":
+    main()
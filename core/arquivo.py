@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from core.change_log import registrar_exclusoes
+from core.resumo import descontar_obrigacoes
+from models import ObrigacaoAcessoria, ObrigacaoAcessoriaArquivada
+
+# Colunas copiadas para o arquivo (data_arquivamento vem do default do banco)
+COLUNAS = ["id", "nome", "descricao", "periodicidade", "data_vencimento",
+           "empresa_id", "data_criacao", "data_atualizacao"]
+
+def limite_arquivamento(agora: Optional[datetime] = None) -> datetime:
+    """Vencimentos anteriores a este momento vão para o arquivo."""
+    agora = agora or datetime.now(timezone.utc)
+    return agora - timedelta(days=settings.OBRIGACAO_ARCHIVE_AFTER_DAYS)
+
+def arquivar_obrigacoes(db: Session, limite: datetime, lote: int = 10_000) -> int:
+    """
+    Move para obrigacoes_acessorias_arquivo as obrigações vencidas antes de `limite`.
+
+    Cada lote é uma transação: INSERT ... SELECT no arquivo, desconto no resumo
+    do dashboard, exclusões no feed de alterações (também INSERT ... SELECT) e
+    DELETE na tabela ativa, sem carregar objetos do ORM. A busca dos lotes usa
+    o índice de data_vencimento.
+
+    Args:
+        db: Sessão do banco de dados
+        limite: Data de vencimento a partir da qual as obrigações continuam ativas
+        lote: Número máximo de obrigações por transação
+
+    Returns:
+        int: Número de obrigações arquivadas
+    """
+    total = 0
+    while True:
+        ids = db.scalars(
+            select(ObrigacaoAcessoria.id)
+            .where(ObrigacaoAcessoria.data_vencimento < limite)
+            .order_by(ObrigacaoAcessoria.data_vencimento)
+            .limit(lote)
+        ).all()
+        if not ids:
+            return total
+
+        filtro = ObrigacaoAcessoria.id.in_(ids)
+        db.execute(insert(ObrigacaoAcessoriaArquivada).from_select(
+            COLUNAS, select(*(getattr(ObrigacaoAcessoria, coluna) for coluna in COLUNAS)).where(filtro)
+        ))
+        descontar_obrigacoes(db, filtro)
+        # Para os clientes do feed, a obrigação arquivada deixou de existir
+        registrar_exclusoes(db, ObrigacaoAcessoria, filtro)
+        db.execute(delete(ObrigacaoAcessoria).where(filtro))
+        db.commit()
+        total += len(ids)
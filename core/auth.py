@@ -1,5 +1,6 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional
+import uuid
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -8,15 +9,21 @@ from fastapi.security import OAuth2PasswordBearer
 
 from sqlalchemy.orm import Session
 
-from .. import models, schemas
-from ..database import get_db
-from ..config.settings import settings
+import models
+from config.settings import settings
+from core.consultas import USUARIO_POR_EMAIL
+from core.revogacao import lista_revogacao
+from schemas.auth import TokenData, UserRole
+
+# Tipos de token (claim typ)
+ACCESS = "access"
+REFRESH = "refresh"
 
 # Configuração do contexto de criptografia
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Configuração do esquema OAuth2 para autenticação via token
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 # Funções auxiliares
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -49,20 +56,32 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     Cria um token de acesso JWT.
     
     Args:
-        data: Dados a serem incluídos no token
+        data: Dados a serem incluídos no token (sub, uid e role)
         expires_delta: Tempo de expiração do token
         
     Returns:
         str: Token JWT codificado
     """
-    to_encode = data.copy()
-    
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
+    return _create_token(data, ACCESS, expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+
+def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    """
+    Cria um refresh token JWT, aceito apenas por POST /refresh.
     
-    to_encode.update({"exp": expire})
+    Args:
+        data: Dados a serem incluídos no token (sub e uid)
+        expires_delta: Tempo de expiração do token
+        
+    Returns:
+        str: Token JWT codificado
+    """
+    return _create_token(data, REFRESH, expires_delta or timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
+
+def _create_token(data: dict, token_type: str, expires_delta: timedelta) -> str:
+    now = datetime.now(timezone.utc)
+    to_encode = data.copy()
+    # jti identifica o token na lista de revogação; iat permite revogar tudo o que foi emitido antes
+    to_encode.update({"exp": now + expires_delta, "iat": now, "jti": uuid.uuid4().hex, "typ": token_type})
     
     encoded_jwt = jwt.encode(
         to_encode, 
@@ -72,6 +91,49 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     
     return encoded_jwt
 
+def create_token_pair(user: models.Usuario) -> dict:
+    """
+    Emite o par de tokens de acesso e de refresh para o usuário.
+    
+    Args:
+        user: Usuário autenticado
+        
+    Returns:
+        dict: Campos do schema Token
+    """
+    return {
+        "access_token": create_access_token({"sub": user.email, "uid": user.id, "role": user.role}),
+        "refresh_token": create_refresh_token({"sub": user.email, "uid": user.id}),
+        "token_type": "bearer",
+        "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+def decode_token(token: str, token_type: str) -> dict:
+    """
+    Decodifica e valida um token do tipo esperado, sem acessar o banco.
+    
+    Args:
+        token: Token JWT
+        token_type: ACCESS ou REFRESH
+        
+    Returns:
+        dict: Payload do token
+        
+    Raises:
+        JWTError: Se o token for inválido, expirado, de outro tipo ou revogado
+    """
+    payload = jwt.decode(
+        token, 
+        settings.SECRET_KEY, 
+        algorithms=[settings.ALGORITHM]
+    )
+    # Tokens emitidos antes dos refresh tokens não têm typ, uid nem jti: exigem novo login
+    if payload.get("typ") != token_type or payload.get("sub") is None or payload.get("uid") is None:
+        raise JWTError("Token de tipo inesperado")
+    if lista_revogacao.revogado(payload.get("jti"), payload["uid"], payload.get("iat", 0)):
+        raise JWTError("Token revogado")
+    return payload
+
 def get_user(db: Session, email: str) -> Optional[models.Usuario]:
     """
     Obtém um usuário pelo e-mail.
@@ -83,7 +145,7 @@ def get_user(db: Session, email: str) -> Optional[models.Usuario]:
     Returns:
         Optional[models.Usuario]: O usuário encontrado ou None
     """
-    return db.query(models.Usuario).filter(models.Usuario.email == email).first()
+    return db.scalars(USUARIO_POR_EMAIL, {"email": email}).first()
 
 def authenticate_user(db: Session, email: str, password: str) -> Optional[models.Usuario]:
     """
@@ -105,21 +167,23 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[models
     return user
 
 async def get_current_user(
-    db: Session = Depends(get_db),
     token: str = Depends(oauth2_scheme)
 ) -> models.Usuario:
     """
     Obtém o usuário atual a partir do token JWT.
     
+    Não consulta o banco: id, e-mail e papel vêm do token, e logout ou
+    desativação valem pela lista de revogação em memória (core.revogacao).
+    O usuário retornado não está em nenhuma sessão.
+    
     Args:
-        db: Sessão do banco de dados
         token: Token JWT
         
     Returns:
         models.Usuario: O usuário autenticado
         
     Raises:
-        HTTPException: Se o token for inválido ou o usuário não existir
+        HTTPException: Se o token for inválido, expirado ou revogado
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -128,23 +192,17 @@ async def get_current_user(
     )
     
     try:
-        payload = jwt.decode(
-            token, 
-            settings.SECRET_KEY, 
-            algorithms=[settings.ALGORITHM]
-        )
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(email=email)
+        payload = decode_token(token, ACCESS)
+        token_data = TokenData(email=payload["sub"], user_id=payload["uid"], role=payload.get("role"))
     except JWTError:
         raise credentials_exception
     
-    user = get_user(db, email=token_data.email)
-    if user is None:
-        raise credentials_exception
-    
-    return user
+    return models.Usuario(
+        id=token_data.user_id,
+        email=token_data.email,
+        role=token_data.role or UserRole.USER.value,
+        ativo=True,
+    )
 
 async def get_current_active_user(
     current_user: models.Usuario = Depends(get_current_user),
@@ -180,7 +238,7 @@ async def get_current_active_superuser(
     Raises:
         HTTPException: Se o usuário não for um superusuário
     """
-    if not current_user.role == schemas.UserRole.ADMIN:
+    if not current_user.role == UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="O usuário não tem privilégios suficientes"
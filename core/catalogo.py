@@ -0,0 +1,539 @@
+"""
+Snapshot em memória, somente leitura, do cadastro de empresas.
+
+Manter um milhão de objetos Empresa do ORM em memória custa kilobytes por
+linha. Aqui o cadastro fica em colunas: inteiros e datas em `array`, textos
+codificados uma única vez em um buffer por coluna (valores repetidos são
+internados e compartilhados) e índices compactos para busca O(1) por id e por
+CNPJ. As linhas são expostas como visões (`EmpresaView`, com `__slots__`) que
+leem as colunas sob demanda.
+
+O snapshot é construído na inicialização e atualizado de forma incremental a
+partir do feed de alterações (core.change_log) sempre que o barramento de
+invalidação indica escrita em empresas. A atualização lê o banco no executor
+padrão: as requisições não esperam por ela e recebem o snapshot atual.
+"""
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+import asyncio
+import logging
+import math
+import sys
+import time
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from core.invalidation import EMPRESAS, invalidation_bus
+from database import SessionLocal
+from models import Alteracao, Empresa, OperacaoEnum
+
+logger = logging.getLogger(__name__)
+
+# Colunas carregadas do banco, na ordem esperada por CatalogoEmpresas.aplicar
+COLUNAS = (
+    Empresa.id, Empresa.nome, Empresa.cnpj, Empresa.endereco, Empresa.email,
+    Empresa.telefone, Empresa.usuario_id, Empresa.data_criacao, Empresa.data_atualizacao,
+)
+
+
+def _cnpj_inteiro(cnpj: str) -> int:
+    """CNPJ como inteiro (apenas os dígitos); cabe em 64 bits."""
+    digitos = ''.join(filter(str.isdigit, cnpj or ""))
+    return int(digitos) if digitos else -3
+
+
+def _timestamp(data: Optional[datetime]) -> float:
+    """Converte para epoch (NaN para nulo); datas sem fuso (SQLite) são tratadas como UTC."""
+    if data is None:
+        return math.nan
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=timezone.utc)
+    return data.timestamp()
+
+
+def _datetime(valor: float) -> Optional[datetime]:
+    return None if math.isnan(valor) else datetime.fromtimestamp(valor, timezone.utc)
+
+
+def como_dict(empresa: Empresa) -> Dict[str, Any]:
+    """
+    Empresa do ORM na mesma forma de EmpresaView.as_dict.
+
+    As datas saem com fuso, em UTC, como as do catálogo: a resposta não muda
+    conforme a empresa venha do catálogo ou do banco.
+    """
+    dados = {coluna.key: getattr(empresa, coluna.key) for coluna in COLUNAS}
+    for chave in ("data_criacao", "data_atualizacao"):
+        dados[chave] = _datetime(_timestamp(dados[chave]))
+    return dados
+
+
+class _ColunaTexto:
+    """
+    Coluna de texto: valores distintos codificados em UTF-8 em um único buffer,
+    e um código (array de 4 bytes) por linha.
+
+    Durante a carga os valores repetidos são internados por um dicionário,
+    descartado em `congelar()`; depois disso cada valor novo é apenas anexado.
+    """
+
+    __slots__ = ("_dados", "_inicios", "codigos", "_indice")
+
+    def __init__(self):
+        self._dados = bytearray()
+        self._inicios = array("Q", [0])
+        self.codigos = array("I")
+        self._indice: Optional[Dict[str, int]] = {}
+
+    def _codigo(self, valor: str) -> int:
+        codigo = self._indice.get(valor) if self._indice is not None else None
+        if codigo is None:
+            self._dados += valor.encode()
+            self._inicios.append(len(self._dados))
+            codigo = len(self._inicios) - 2
+            if self._indice is not None:
+                self._indice[valor] = codigo
+        return codigo
+
+    def append(self, valor: str) -> None:
+        self.codigos.append(self._codigo(valor))
+
+    def set(self, pos: int, valor: str) -> None:
+        if self.get(pos) != valor:
+            self.codigos[pos] = self._codigo(valor)
+
+    def get(self, pos: int) -> str:
+        codigo = self.codigos[pos]
+        return self._dados[self._inicios[codigo]:self._inicios[codigo + 1]].decode()
+
+    def congelar(self) -> None:
+        self._indice = None
+
+    @property
+    def distintos(self) -> int:
+        return len(self._inicios) - 1
+
+    def memoria(self) -> int:
+        return sys.getsizeof(self._dados) + sys.getsizeof(self._inicios) + sys.getsizeof(self.codigos)
+
+
+class _IndiceInteiro:
+    """
+    Tabela hash de endereçamento aberto (sondagem linear) de inteiros não
+    negativos para posições, guardada em dois arrays: cerca de 24 bytes por
+    chave, contra mais de 100 de um dict de ints.
+    """
+
+    VAZIO = -1
+    REMOVIDO = -2
+
+    def __init__(self, capacidade: int = 8):
+        tamanho = 8
+        while tamanho < capacidade * 2:
+            tamanho <<= 1
+        self._chaves = array("q", [self.VAZIO]) * tamanho
+        self._posicoes = array("i", [0]) * tamanho
+        self._ocupados = 0  # chaves válidas e removidas
+
+    def _inicio(self, chave: int) -> int:
+        # Hash multiplicativo: os últimos dígitos do CNPJ (filial e verificadores) são pouco variados
+        return ((chave * 0x9E3779B97F4A7C15) >> 17) & (len(self._chaves) - 1)
+
+    def get(self, chave: int) -> int:
+        """Retorna a posição da chave, ou -1."""
+        mascara = len(self._chaves) - 1
+        i = self._inicio(chave)
+        while True:
+            atual = self._chaves[i]
+            if atual == chave:
+                return self._posicoes[i]
+            if atual == self.VAZIO:
+                return -1
+            i = (i + 1) & mascara
+
+    def set(self, chave: int, posicao: int) -> None:
+        mascara = len(self._chaves) - 1
+        i = self._inicio(chave)
+        livre = -1
+        while True:
+            atual = self._chaves[i]
+            if atual == chave:
+                self._posicoes[i] = posicao
+                return
+            if atual == self.REMOVIDO and livre < 0:
+                livre = i
+            elif atual == self.VAZIO:
+                break
+            i = (i + 1) & mascara
+        if livre < 0:
+            livre = i
+            self._ocupados += 1
+        self._chaves[livre] = chave
+        self._posicoes[livre] = posicao
+        if self._ocupados * 2 > len(self._chaves):
+            self._redimensionar()
+
+    def remove(self, chave: int) -> None:
+        mascara = len(self._chaves) - 1
+        i = self._inicio(chave)
+        while self._chaves[i] != self.VAZIO:
+            if self._chaves[i] == chave:
+                self._chaves[i] = self.REMOVIDO
+                return
+            i = (i + 1) & mascara
+
+    def _redimensionar(self) -> None:
+        pares = [(c, p) for c, p in zip(self._chaves, self._posicoes) if c >= 0]
+        self.__init__(max(len(pares), 4) * 2)
+        for chave, posicao in pares:
+            self.set(chave, posicao)
+
+    def memoria(self) -> int:
+        return sys.getsizeof(self._chaves) + sys.getsizeof(self._posicoes)
+
+
+class EmpresaView:
+    """Visão de uma linha do catálogo; os atributos são lidos das colunas a cada acesso."""
+
+    __slots__ = ("_catalogo", "_pos")
+
+    def __init__(self, catalogo: "CatalogoEmpresas", pos: int):
+        self._catalogo = catalogo
+        self._pos = pos
+
+    @property
+    def id(self) -> int:
+        return self._catalogo.ids[self._pos]
+
+    @property
+    def nome(self) -> str:
+        return self._catalogo.nomes.get(self._pos)
+
+    @property
+    def cnpj(self) -> str:
+        return f"{self._catalogo.cnpjs[self._pos]:014d}"
+
+    @property
+    def endereco(self) -> str:
+        return self._catalogo.enderecos.get(self._pos)
+
+    @property
+    def email(self) -> str:
+        return self._catalogo.emails.get(self._pos)
+
+    @property
+    def telefone(self) -> str:
+        return self._catalogo.telefones.get(self._pos)
+
+    @property
+    def usuario_id(self) -> int:
+        return self._catalogo.usuarios[self._pos]
+
+    @property
+    def data_criacao(self) -> Optional[datetime]:
+        return _datetime(self._catalogo.criacao[self._pos])
+
+    @property
+    def data_atualizacao(self) -> Optional[datetime]:
+        return _datetime(self._catalogo.atualizacao[self._pos])
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {coluna.key: getattr(self, coluna.key) for coluna in COLUNAS}
+
+    def __repr__(self):
+        return f"<EmpresaView {self.nome} - {self.cnpj}>"
+
+
+class CatalogoEmpresas:
+    """
+    Cadastro de empresas em colunas, com índices por id, CNPJ e usuário.
+
+    Linhas excluídas ou atualizadas deixam lixo (posições e textos antigos);
+    `lixo` conta essas ocorrências para que o catálogo seja reconstruído
+    quando passarem do número de linhas.
+
+    Attributes:
+        cursor: Última alteração (core.change_log) já aplicada
+    """
+
+    def __init__(self):
+        self.ids = array("q")
+        self.cnpjs = array("q")
+        self.usuarios = array("q")
+        self.criacao = array("d")
+        self.atualizacao = array("d")
+        self.nomes = _ColunaTexto()
+        self.enderecos = _ColunaTexto()
+        self.emails = _ColunaTexto()
+        self.telefones = _ColunaTexto()
+        # id -> posição (-1 se ausente); ids são sequenciais, então um array basta
+        self._pos_por_id = array("i")
+        self._por_cnpj = _IndiceInteiro()
+        self._por_usuario: Dict[int, array] = {}
+        self._ativas = 0
+        self.lixo = 0
+        self.cursor = 0
+
+    # Escrita (apenas pelo carregamento e pela atualização incremental)
+
+    def _posicao(self, empresa_id: int) -> int:
+        return self._pos_por_id[empresa_id] if 0 <= empresa_id < len(self._pos_por_id) else -1
+
+    def aplicar(self, linha) -> None:
+        """Insere ou substitui uma empresa a partir de uma linha com as COLUNAS."""
+        empresa_id, nome, cnpj, endereco, email, telefone, usuario_id, criacao, atualizacao = linha
+        cnpj = _cnpj_inteiro(cnpj)
+        pos = self._posicao(empresa_id)
+
+        if pos < 0:
+            pos = len(self.ids)
+            self.ids.append(empresa_id)
+            self.cnpjs.append(cnpj)
+            self.usuarios.append(usuario_id)
+            self.criacao.append(_timestamp(criacao))
+            self.atualizacao.append(_timestamp(atualizacao))
+            for coluna, valor in ((self.nomes, nome), (self.enderecos, endereco),
+                                  (self.emails, email), (self.telefones, telefone)):
+                coluna.append(valor)
+            if empresa_id >= len(self._pos_por_id):
+                self._pos_por_id.extend(array("i", [-1]) * (empresa_id + 1 - len(self._pos_por_id)))
+            self._pos_por_id[empresa_id] = pos
+            self._por_usuario.setdefault(usuario_id, array("I")).append(pos)
+            self._ativas += 1
+        else:
+            if self.cnpjs[pos] != cnpj:
+                self._por_cnpj.remove(self.cnpjs[pos])
+                self.cnpjs[pos] = cnpj
+            if self.usuarios[pos] != usuario_id:
+                self._por_usuario[self.usuarios[pos]].remove(pos)
+                self._por_usuario.setdefault(usuario_id, array("I")).append(pos)
+                self.usuarios[pos] = usuario_id
+            self.criacao[pos] = _timestamp(criacao)
+            self.atualizacao[pos] = _timestamp(atualizacao)
+            for coluna, valor in ((self.nomes, nome), (self.enderecos, endereco),
+                                  (self.emails, email), (self.telefones, telefone)):
+                coluna.set(pos, valor)
+            self.lixo += 1
+
+        if cnpj >= 0:
+            self._por_cnpj.set(cnpj, pos)
+
+    def remover(self, empresa_id: int) -> None:
+        """Remove a empresa dos índices; a posição vira lixo até a reconstrução."""
+        pos = self._posicao(empresa_id)
+        if pos < 0:
+            return
+        self._pos_por_id[empresa_id] = -1
+        self._por_cnpj.remove(self.cnpjs[pos])
+        posicoes = self._por_usuario[self.usuarios[pos]]
+        posicoes.remove(pos)
+        if not posicoes:
+            del self._por_usuario[self.usuarios[pos]]
+        self._ativas -= 1
+        self.lixo += 1
+
+    def congelar(self) -> None:
+        """Descarta as estruturas usadas apenas durante a carga."""
+        for coluna in (self.nomes, self.enderecos, self.emails, self.telefones):
+            coluna.congelar()
+
+    # Leitura
+
+    def __len__(self) -> int:
+        return self._ativas
+
+    def __iter__(self) -> Iterator[EmpresaView]:
+        for pos, empresa_id in enumerate(self.ids):
+            if self._pos_por_id[empresa_id] == pos:
+                yield EmpresaView(self, pos)
+
+    def por_id(self, empresa_id: int) -> Optional[EmpresaView]:
+        pos = self._posicao(empresa_id)
+        return EmpresaView(self, pos) if pos >= 0 else None
+
+    def por_cnpj(self, cnpj: str) -> Optional[EmpresaView]:
+        """Busca pelo CNPJ, com ou sem formatação."""
+        chave = _cnpj_inteiro(cnpj)
+        pos = self._por_cnpj.get(chave) if chave >= 0 else -1
+        return EmpresaView(self, pos) if pos >= 0 else None
+
+    def por_usuario(self, usuario_id: int) -> List[EmpresaView]:
+        return [EmpresaView(self, pos) for pos in self._por_usuario.get(usuario_id, ())]
+
+    def memoria(self) -> Dict[str, Any]:
+        """
+        Estima a memória ocupada pelas colunas e índices.
+
+        Returns:
+            Dict[str, Any]: Bytes por estrutura, total e média por linha ativa
+        """
+        colunas = {
+            "ids": sys.getsizeof(self.ids),
+            "cnpjs": sys.getsizeof(self.cnpjs),
+            "usuarios": sys.getsizeof(self.usuarios),
+            "datas": sys.getsizeof(self.criacao) + sys.getsizeof(self.atualizacao),
+            "nomes": self.nomes.memoria(),
+            "enderecos": self.enderecos.memoria(),
+            "emails": self.emails.memoria(),
+            "telefones": self.telefones.memoria(),
+        }
+        indices = {
+            "id": sys.getsizeof(self._pos_por_id),
+            "cnpj": self._por_cnpj.memoria(),
+            "usuario": sys.getsizeof(self._por_usuario) + sum(
+                sys.getsizeof(posicoes) for posicoes in self._por_usuario.values()
+            ),
+        }
+        total = sum(colunas.values()) + sum(indices.values())
+        return {
+            "linhas": self._ativas,
+            "lixo": self.lixo,
+            "colunas": colunas,
+            "indices": indices,
+            "total_bytes": total,
+            "bytes_por_linha": round(total / self._ativas, 1) if self._ativas else 0,
+        }
+
+
+def construir_catalogo(db: Session) -> CatalogoEmpresas:
+    """
+    Carrega o cadastro inteiro em um novo catálogo, em lotes e sem objetos do ORM.
+
+    O cursor é lido antes da carga: alterações concorrentes são reaplicadas na
+    próxima atualização, o que é inofensivo.
+    """
+    inicio = time.perf_counter()
+    catalogo = CatalogoEmpresas()
+    catalogo.cursor = db.scalar(select(func.max(Alteracao.id))) or 0
+    linhas = db.execute(select(*COLUNAS).order_by(Empresa.id).execution_options(yield_per=10_000))
+    for linha in linhas:
+        catalogo.aplicar(linha)
+    catalogo.congelar()
+    logger.info("Catálogo de empresas carregado: %d linhas em %.2fs, %s bytes por linha",
+                len(catalogo), time.perf_counter() - inicio, catalogo.memoria()["bytes_por_linha"])
+    return catalogo
+
+
+def ler_alteracoes(db: Session, cursor: int):
+    """
+    Lê do banco as alterações de empresas posteriores ao cursor, sem tocar no catálogo.
+
+    Returns:
+        O novo cursor, os ids excluídos e as linhas (COLUNAS) das empresas
+        criadas ou atualizadas; None se não houver alterações
+    """
+    alteracoes = db.execute(
+        select(Alteracao.id, Alteracao.registro_id, Alteracao.operacao)
+        .where(Alteracao.id > cursor, Alteracao.tabela == Empresa.__tablename__)
+        .order_by(Alteracao.id)
+    ).all()
+    if not alteracoes:
+        return None
+
+    # Apenas a última operação de cada empresa importa
+    ultimas = {registro_id: operacao for _, registro_id, operacao in alteracoes}
+    excluidas = [registro_id for registro_id, operacao in ultimas.items() if operacao == OperacaoEnum.EXCLUSAO]
+    alteradas = [registro_id for registro_id, operacao in ultimas.items() if operacao != OperacaoEnum.EXCLUSAO]
+
+    linhas = db.execute(select(*COLUNAS).where(Empresa.id.in_(alteradas))).all() if alteradas else []
+    return alteracoes[-1][0], excluidas, linhas
+
+
+def aplicar_alteracoes(catalogo: CatalogoEmpresas, alteracoes) -> int:
+    """
+    Aplica ao catálogo o resultado de ler_alteracoes.
+
+    Returns:
+        int: Número de empresas alteradas
+    """
+    if alteracoes is None:
+        return 0
+    cursor, excluidas, linhas = alteracoes
+    for empresa_id in excluidas:
+        catalogo.remover(empresa_id)
+    for linha in linhas:
+        catalogo.aplicar(linha)
+    catalogo.cursor = cursor
+    return len(excluidas) + len(linhas)
+
+
+def atualizar_catalogo(db: Session, catalogo: CatalogoEmpresas) -> int:
+    """
+    Aplica ao catálogo as alterações de empresas posteriores ao seu cursor.
+
+    Returns:
+        int: Número de empresas alteradas
+    """
+    return aplicar_alteracoes(catalogo, ler_alteracoes(db, catalogo.cursor))
+
+
+# O catálogo só é alterado pelo event loop (ou antes de ser publicado em _estado),
+# então as leituras não precisam de trava; o banco é lido no executor padrão.
+_estado: Dict[str, Any] = {"catalogo": None, "geracao": None, "tarefa": None}
+
+
+def _reconstruir() -> CatalogoEmpresas:
+    with SessionLocal() as db:
+        return construir_catalogo(db)
+
+
+def _ler(cursor: int):
+    # Banco primário: as réplicas podem ainda não ter a alteração
+    with SessionLocal() as db:
+        return ler_alteracoes(db, cursor)
+
+
+async def _atualizar(catalogo: CatalogoEmpresas, geracao) -> None:
+    """Atualiza (ou reconstrói, com lixo demais) o catálogo sem bloquear o event loop."""
+    loop = asyncio.get_running_loop()
+    try:
+        if catalogo.lixo > max(len(catalogo), 1000):
+            # Um catálogo novo, publicado de uma vez quando estiver pronto
+            catalogo = await loop.run_in_executor(None, _reconstruir)
+        else:
+            alteracoes = await loop.run_in_executor(None, _ler, catalogo.cursor)
+            aplicar_alteracoes(catalogo, alteracoes)
+        _estado["catalogo"], _estado["geracao"] = catalogo, geracao
+    except Exception:
+        logger.exception("Falha ao atualizar o catálogo de empresas")
+    finally:
+        _estado["tarefa"] = None
+
+
+def obter_catalogo() -> Optional[CatalogoEmpresas]:
+    """
+    Retorna o catálogo, ou None se ele estiver desativado ou ainda carregando.
+
+    Deve ser chamada no event loop. Não espera pelo banco: se a geração de
+    EMPRESAS mudou, agenda a atualização (ou a reconstrução, com lixo demais)
+    e devolve o snapshot atual, que pode estar alguns milissegundos atrasado.
+    """
+    catalogo: Optional[CatalogoEmpresas] = _estado["catalogo"]
+    if catalogo is None:
+        return None
+
+    geracao = invalidation_bus.generation(EMPRESAS)
+    if _estado["geracao"] != geracao and _estado["tarefa"] is None:
+        _estado["tarefa"] = asyncio.get_running_loop().create_task(_atualizar(catalogo, geracao))
+    return catalogo
+
+
+def setup_catalogo(app):
+    """Carrega o catálogo em segundo plano na inicialização, se EMPRESA_SNAPSHOT_ENABLED."""
+
+    def carregar():
+        geracao = invalidation_bus.generation(EMPRESAS)
+        try:
+            catalogo = _reconstruir()
+        except Exception:
+            logger.exception("Falha ao carregar o catálogo de empresas; buscas seguem no banco")
+            return
+        _estado["catalogo"], _estado["geracao"] = catalogo, geracao
+
+    @app.on_event("startup")
+    async def start_catalogo():
+        if settings.EMPRESA_SNAPSHOT_ENABLED:
+            asyncio.get_running_loop().run_in_executor(None, carregar)
@@ -0,0 +1,146 @@
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from models import Alteracao, Empresa, ObrigacaoAcessoria, OperacaoEnum
+
+# Tabelas expostas no feed e seus modelos
+MODELOS = {
+    Empresa.__tablename__: Empresa,
+    ObrigacaoAcessoria.__tablename__: ObrigacaoAcessoria,
+}
+
+# Trava de transação (PostgreSQL) das escritas no feed. O id de uma alteração é
+# atribuído no INSERT, não no commit: sem a trava, uma transação com id menor
+# que confirma depois de um leitor já ter passado por um id maior seria pulada
+# para sempre (pelos clientes de /changes e pela atualização do catálogo). Com
+# ela, quem grava no feed espera o commit de quem gravou antes, e os ids ficam
+# na ordem dos commits. No SQLite as escritas já são serializadas.
+TRAVA_FEED = 0x46454544
+
+def reservar_feed(db: Session) -> None:
+    """
+    Adquire a trava do feed até o fim da transação; chamar antes de inserir em alteracoes.
+
+    Reentrante: pode ser chamada várias vezes na mesma transação.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(TRAVA_FEED)))
+
+def _dono(modelo, empresa_id=None):
+    """Expressão do usuário dono dos registros do modelo (o da empresa, para obrigações)."""
+    if modelo is Empresa:
+        return Empresa.usuario_id
+    return (
+        select(Empresa.usuario_id)
+        .where(Empresa.id == (modelo.empresa_id if empresa_id is None else empresa_id))
+        .scalar_subquery()
+    )
+
+def registrar_alteracao(db: Session, registro, operacao: OperacaoEnum) -> None:
+    """
+    Registra a alteração de um objeto na mesma transação da escrita.
+
+    Args:
+        db: Sessão do banco de dados
+        registro: Empresa ou ObrigacaoAcessoria já com id (após flush)
+        operacao: Tipo da alteração
+    """
+    if isinstance(registro, Empresa):
+        usuario_id = registro.usuario_id
+    else:
+        usuario_id = _dono(ObrigacaoAcessoria, registro.empresa_id)
+    reservar_feed(db)
+    db.add(Alteracao(tabela=registro.__tablename__, registro_id=registro.id, operacao=operacao,
+                     usuario_id=usuario_id))
+
+def registrar_alteracoes(db: Session, modelo, operacao: OperacaoEnum, *filtros) -> None:
+    """
+    Registra a alteração de todas as linhas que atendem aos filtros, sem carregá-las.
+
+    Gera um único INSERT ... SELECT no banco, que também grava o dono de cada linha.
+
+    Args:
+        db: Sessão do banco de dados
+        modelo: Empresa ou ObrigacaoAcessoria
+        operacao: Tipo da alteração
+        filtros: Critérios das linhas alteradas
+    """
+    selecao = select(
+        literal(modelo.__tablename__),
+        modelo.id,
+        literal(operacao, Alteracao.operacao.type),
+        _dono(modelo),
+    ).where(*filtros).order_by(modelo.id)
+    reservar_feed(db)
+    db.execute(insert(Alteracao).from_select(["tabela", "registro_id", "operacao", "usuario_id"], selecao))
+
+def registrar_exclusoes(db: Session, modelo, *filtros) -> None:
+    """
+    Registra as exclusões de todas as linhas que atendem aos filtros; deve ser chamada antes do DELETE.
+
+    Args:
+        db: Sessão do banco de dados
+        modelo: Empresa ou ObrigacaoAcessoria
+        filtros: Critérios das linhas que serão excluídas
+    """
+    registrar_alteracoes(db, modelo, OperacaoEnum.EXCLUSAO, *filtros)
+
+def listar_alteracoes(db: Session, since: int, limit: int, usuario_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Lista as alterações posteriores ao cursor, em ordem.
+
+    Criações e atualizações trazem o estado atual do registro (carregado em um
+    SELECT por tabela); exclusões são tombstones sem dados.
+    Os ids seguem a ordem dos commits (ver TRAVA_FEED): uma alteração
+    confirmada depois nunca fica atrás do cursor já entregue.
+
+    Args:
+        db: Sessão do banco de dados
+        since: Último cursor recebido pelo cliente (0 para começar do início)
+        limit: Número máximo de alterações
+        usuario_id: Apenas as alterações de registros deste usuário (None para todas)
+
+    Returns:
+        Dict[str, Any]: Alterações, próximo cursor e se há mais páginas
+    """
+    consulta = db.query(Alteracao).filter(Alteracao.id > since)
+    if usuario_id is not None:
+        consulta = consulta.filter(Alteracao.usuario_id == usuario_id)
+    alteracoes: List[Alteracao] = (
+        consulta
+        .order_by(Alteracao.id)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(alteracoes) > limit
+    alteracoes = alteracoes[:limit]
+
+    ids_por_tabela: Dict[str, set] = {}
+    for alteracao in alteracoes:
+        if alteracao.operacao != OperacaoEnum.EXCLUSAO:
+            ids_por_tabela.setdefault(alteracao.tabela, set()).add(alteracao.registro_id)
+
+    registros = {}
+    for tabela, ids in ids_por_tabela.items():
+        modelo = MODELOS[tabela]
+        for registro in db.query(modelo).filter(modelo.id.in_(ids)):
+            registros[(tabela, registro.id)] = registro
+
+    return {
+        "changes": [
+            {
+                "cursor": alteracao.id,
+                "tabela": alteracao.tabela,
+                "id": alteracao.registro_id,
+                "operacao": alteracao.operacao.value,
+                "data": alteracao.data,
+                # None quando o registro já foi excluído por uma alteração posterior
+                "dados": registros.get((alteracao.tabela, alteracao.registro_id)),
+            }
+            for alteracao in alteracoes
+        ],
+        "next_cursor": alteracoes[-1].id if alteracoes else since,
+        "has_more": has_more,
+    }
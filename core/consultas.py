@@ -0,0 +1,30 @@
+"""
+Consultas frequentes montadas uma única vez, no import.
+
+`db.query(Empresa).filter(Empresa.id == empresa_id)` constrói a cada
+requisição uma árvore de expressões nova, só para o SQLAlchemy calcular a
+chave do cache de compilação e descobrir que o SQL já estava compilado. As
+constantes abaixo usam bindparam: o mesmo objeto é executado com parâmetros
+diferentes, a chave de cache é calculada uma vez e o SQL compilado é
+reaproveitado. core/warmup.py as executa na inicialização para que a primeira
+requisição também encontre o SQL compilado.
+
+Uso:
+    db.scalars(EMPRESA_POR_ID, {"id": empresa_id}).first()
+"""
+from sqlalchemy import bindparam, select
+
+from models import Empresa, ObrigacaoAcessoria, Usuario
+
+EMPRESA_POR_ID = select(Empresa).where(Empresa.id == bindparam("id"))
+EMPRESA_POR_CNPJ = select(Empresa).where(Empresa.cnpj == bindparam("cnpj"))
+OBRIGACAO_POR_ID = select(ObrigacaoAcessoria).where(ObrigacaoAcessoria.id == bindparam("id"))
+USUARIO_POR_EMAIL = select(Usuario).where(Usuario.email == bindparam("email"))
+
+# Consultas e parâmetros (que não encontram nada) executados no aquecimento
+AQUECIMENTO = (
+    (EMPRESA_POR_ID, {"id": 0}),
+    (EMPRESA_POR_CNPJ, {"cnpj": ""}),
+    (OBRIGACAO_POR_ID, {"id": 0}),
+    (USUARIO_POR_EMAIL, {"email": ""}),
+)
@@ -0,0 +1,181 @@
+from threading import Lock
+from typing import Any, Dict
+import logging
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStatistics:
+    """
+    Contadores de uso do pool de conexões, compartilhados entre as threads do worker.
+
+    Attributes:
+        checkouts: Total de conexões entregues pelo pool
+        wait_total: Tempo total (s) esperando por uma conexão
+        wait_max: Maior espera (s) registrada
+        overflow_events: Vezes em que foi preciso abrir conexões além de pool_size
+        timeouts: Vezes em que o pool esgotou e a espera estourou pool_timeout
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Zera todos os contadores."""
+        with self._lock:
+            self.checkouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.overflow_events = 0
+            self.timeouts = 0
+
+    def record_checkout(self, wait: float, overflow: bool) -> None:
+        """Registra uma conexão entregue após `wait` segundos."""
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            if wait > self.wait_max:
+                self.wait_max = wait
+            if overflow:
+                self.overflow_events += 1
+
+    def record_timeout(self) -> None:
+        """Registra uma espera que terminou em TimeoutError."""
+        with self._lock:
+            self.timeouts += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Retorna uma cópia consistente dos contadores."""
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "wait_total_ms": round(self.wait_total * 1000, 3),
+                "wait_avg_ms": round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "overflow_events": self.overflow_events,
+                "timeouts": self.timeouts,
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mede o tempo de espera por conexões e os eventos de overflow."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statistics = PoolStatistics()
+
+    def _do_get(self):
+        overflow_antes = self._overflow
+        inicio = time.perf_counter()
+        try:
+            conexao = super()._do_get()
+        except exc.TimeoutError:
+            self.statistics.record_timeout()
+            logger.warning(
+                "Pool de conexões esgotado",
+                extra={"size": self.size(), "overflow": self.overflow(), "timeout": self.timeout()},
+            )
+            raise
+        self.statistics.record_checkout(
+            time.perf_counter() - inicio,
+            overflow=self._overflow > overflow_antes and self._overflow > 0,
+        )
+        return conexao
+
+    def recreate(self):
+        # Mantém os contadores quando o SQLAlchemy recria o pool (ex.: dispose)
+        novo = super().recreate()
+        novo.statistics = self.statistics
+        return novo
+
+
+def sqlite_tuned(database_url: str, settings) -> bool:
+    """Indica se a URL é um arquivo SQLite e o modo ajustado (SQLITE_TUNED) está ativo."""
+    url = make_url(database_url)
+    return (settings.SQLITE_TUNED and url.get_backend_name() == "sqlite"
+            and url.database not in (None, "", ":memory:"))
+
+
+def engine_options(database_url: str, settings, leitura: bool = False) -> Dict[str, Any]:
+    """
+    Monta os argumentos de `create_engine` a partir das configurações de pool.
+
+    Args:
+        database_url: URL do banco ao qual a engine vai se conectar
+        settings: Configurações da aplicação
+        leitura: Engine dos leitores do SQLite ajustado (ver core.db_sqlite)
+
+    Returns:
+        Dict[str, Any]: Argumentos nomeados para `create_engine`
+    """
+    url = make_url(database_url)
+
+    if settings.DB_PGBOUNCER_MODE:
+        # O pgbouncer já faz o pool; em modo transação as conexões não podem
+        # reter estado de sessão, então nada de pool local nem prepared statements
+        options: Dict[str, Any] = {"poolclass": NullPool}
+        if url.drivername == "postgresql+psycopg":
+            options["connect_args"] = {"prepare_threshold": None}
+        elif url.drivername == "postgresql+asyncpg":
+            options["connect_args"] = {"prepared_statement_cache_size": 0,
+                                       "statement_cache_size": 0}
+        return options
+
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # Banco em memória precisa do pool padrão (uma conexão por thread)
+        return {}
+
+    if sqlite_tuned(database_url, settings) and not leitura:
+        # Escritor único: as transações de escrita do worker esperam na fila do pool
+        return {
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": 1,
+            "max_overflow": 0,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+        }
+
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def pool_status(engine) -> Dict[str, Any]:
+    """
+    Retorna o estado atual do pool de conexões de uma engine.
+
+    Args:
+        engine: Engine do SQLAlchemy
+
+    Returns:
+        Dict[str, Any]: Tamanho, conexões em uso, overflow e estatísticas de espera
+    """
+    pool = engine.pool
+    status: Dict[str, Any] = {"pool_class": type(pool).__name__}
+
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+
+    statistics = getattr(pool, "statistics", None)
+    if statistics is not None:
+        status["statistics"] = statistics.as_dict()
+
+    return status
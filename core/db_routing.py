@@ -0,0 +1,46 @@
+from fastapi import Request
+import time
+
+from config.settings import settings
+
+# Cookie que mantém o cliente no banco primário logo após uma escrita
+PRIMARY_COOKIE = "db_primario_ate"
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+def must_use_primary(request: Request) -> bool:
+    """
+    Indica se a leitura deve ir ao primário para o cliente ver as próprias escritas.
+
+    Args:
+        request: Requisição atual
+
+    Returns:
+        bool: True se o cliente escreveu há menos de DB_READ_AFTER_WRITE_SECONDS
+    """
+    valor = request.cookies.get(PRIMARY_COOKIE)
+    if not valor:
+        return False
+    try:
+        return float(valor) > time.time()
+    except ValueError:
+        return False
+
+def setup_db_routing(app):
+    """Marca os clientes que acabaram de escrever para que suas leituras usem o primário."""
+
+    @app.middleware("http")
+    async def read_after_write(request: Request, call_next):
+        response = await call_next(request)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            janela = settings.DB_READ_AFTER_WRITE_SECONDS
+            response.set_cookie(
+                PRIMARY_COOKIE,
+                str(time.time() + janela),
+                max_age=int(janela) + 1,
+                httponly=True,
+                samesite="lax",
+            )
+
+        return response
@@ -0,0 +1,68 @@
+"""
+Modo SQLite ajustado para instalações de um único servidor (SQLITE_TUNED).
+
+No modo padrão o SQLite usa o journal de rollback: um escritor bloqueia os
+leitores, e uma transação que lê e depois escreve pode falhar na hora com
+"database is locked" ao tentar promover o lock. No modo ajustado:
+
+- o journal é WAL: leitores não bloqueiam o escritor nem são bloqueados por
+  ele, e cada leitura vê todos os commits já feitos;
+- synchronous=NORMAL (seguro com WAL: só o fsync do checkpoint é adiado),
+  cache de páginas por conexão, memory map e tabelas temporárias em memória
+  são aplicados em cada conexão;
+- a engine principal é o escritor único: uma conexão só (as transações do
+  worker esperam na fila do pool) que abre as transações com BEGIN
+  IMMEDIATE, reservando o lock de escrita logo no início; entre processos, a
+  espera fica a cargo do busy_timeout;
+- uma segunda engine, de leitores somente leitura no mesmo arquivo, atende
+  get_read_db e as leituras longas (exportações) em paralelo ao escritor.
+"""
+from sqlalchemy import event
+
+# Aplicadas em toda conexão do modo ajustado, na ordem
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous={synchronous}",
+    "PRAGMA cache_size=-{cache_kb}",
+    "PRAGMA mmap_size={mmap_bytes}",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout={busy_timeout_ms}",
+)
+
+
+def configurar_sqlite(engine, settings, leitura: bool = False) -> None:
+    """
+    Registra na engine as pragmas do modo ajustado e o controle das transações.
+
+    O pysqlite abre as transações sozinho (BEGIN adiado, e só antes de uma
+    escrita); aqui ele é desligado e o BEGIN é emitido pelo SQLAlchemy, como
+    na receita da documentação do dialeto.
+
+    Args:
+        engine: Engine de um arquivo SQLite
+        settings: Configurações da aplicação
+        leitura: Engine dos leitores (query_only e BEGIN adiado)
+    """
+    pragmas = [pragma.format(
+        synchronous=settings.SQLITE_SYNCHRONOUS,
+        cache_kb=settings.SQLITE_CACHE_SIZE_KB,
+        mmap_bytes=settings.SQLITE_MMAP_SIZE,
+        busy_timeout_ms=settings.SQLITE_BUSY_TIMEOUT_MS,
+    ) for pragma in _PRAGMAS]
+    if leitura:
+        pragmas.append("PRAGMA query_only=ON")
+
+    @event.listens_for(engine, "connect")
+    def _aplicar_pragmas(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    # Leitores: snapshot consistente até o fim da transação; escritor: lock de escrita desde o início
+    begin = "BEGIN" if leitura else "BEGIN IMMEDIATE"
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql(begin)
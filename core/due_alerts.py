@@ -0,0 +1,322 @@
+"""
+Alertas de vencimento de obrigações acessórias enviados por SSE.
+
+Um agendador por worker mantém em um heap as obrigações que vencem dentro do
+horizonte configurado, ordenadas pelo momento do alerta (data_vencimento menos
+a antecedência). Em vez de varrer a tabela periodicamente, ele dorme até o
+próximo alerta. Quando o barramento de invalidação indica que as obrigações
+mudaram, lê o registro de alterações a partir do seu cursor e atualiza só as
+obrigações criadas, alteradas ou excluídas; a janela inteira é recarregada
+apenas quando avança, a cada meio horizonte.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+import asyncio
+import heapq
+import json
+import logging
+import time
+
+from sqlalchemy import func, select
+
+from config.settings import settings
+from core.invalidation import OBRIGACOES_ACESSORIAS, invalidation_bus
+from database import SessionLocal
+from models import Alteracao, Empresa, ObrigacaoAcessoria, OperacaoEnum
+
+logger = logging.getLogger(__name__)
+
+
+def _timestamp(data: datetime) -> float:
+    """Converte para epoch; datas sem fuso (SQLite) são tratadas como UTC."""
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=timezone.utc)
+    return data.timestamp()
+
+
+class DueDateScheduler:
+    """
+    Agenda os alertas de vencimento e os entrega às conexões SSE de cada usuário.
+
+    Attributes:
+        lead: Antecedência (s) com que o alerta é emitido
+        horizon: Janela (s) de vencimentos mantida no heap
+    """
+
+    def __init__(self, lead: float, horizon: float, reload_interval: float, queue_size: int):
+        self.lead = lead
+        self.horizon = horizon
+        self.reload_interval = reload_interval
+        self.queue_size = queue_size
+        # (momento do alerta, id da obrigação); entradas obsoletas (obrigação
+        # excluída ou com outra data em _agendadas) são descartadas ao sair
+        self._heap: List[Tuple[float, int]] = []
+        self._agendadas: Dict[int, float] = {}
+        # Último id de alteracoes já refletido no heap
+        self._cursor = 0
+        # Alertas já emitidos e ainda não vencidos, por usuário, para novas conexões
+        self._emitidos: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        self._vencimento_emitido: Dict[int, float] = {}
+        self._usuario_emitido: Dict[int, int] = {}
+        self._conexoes: Dict[int, Set[asyncio.Queue]] = {}
+        self._dirty = True
+        self._ultima_recarga = 0.0
+        self._fim_janela = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # Conexões
+
+    def connect(self, usuario_id: int) -> asyncio.Queue:
+        """Registra uma conexão do usuário e já enfileira os alertas pendentes."""
+        fila: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._conexoes.setdefault(usuario_id, set()).add(fila)
+        for alerta in list(self._emitidos.get(usuario_id, {}).values())[-self.queue_size:]:
+            fila.put_nowait(alerta)
+        return fila
+
+    def disconnect(self, usuario_id: int, fila: asyncio.Queue) -> None:
+        """Remove a conexão do usuário."""
+        filas = self._conexoes.get(usuario_id)
+        if filas is not None:
+            filas.discard(fila)
+            if not filas:
+                del self._conexoes[usuario_id]
+
+    def _entregar(self, usuario_id: int, alerta: Dict[str, Any]) -> None:
+        for fila in self._conexoes.get(usuario_id, ()):
+            if fila.full():
+                # Cliente lento: descarta o alerta mais antigo em vez de bloquear
+                fila.get_nowait()
+            fila.put_nowait(alerta)
+
+    # Ciclo de vida
+
+    def start(self) -> None:
+        """Inicia a tarefa do agendador no event loop atual."""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        # Exclusões de empresas também publicam OBRIGACOES_ACESSORIAS, com os tombstones das obrigações
+        invalidation_bus.subscribe(OBRIGACOES_ACESSORIAS, self._invalidar)
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancela a tarefa do agendador."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _invalidar(self, topic: str) -> None:
+        # Chamado pela thread do barramento: só marca e acorda o loop
+        self._dirty = True
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                agora = time.time()
+                recarga_em = self._ultima_recarga + self.reload_interval
+                if agora >= self._fim_janela - self.horizon / 2:
+                    await self._recarregar()
+                elif self._dirty and agora >= recarga_em:
+                    await self._aplicar_alteracoes()
+                await self._disparar()
+
+                proximo = self._heap[0][0] if self._heap else self._fim_janela
+                if self._dirty:
+                    proximo = min(proximo, recarga_em)
+                espera = max(0.0, min(proximo, self._fim_janela - self.horizon / 2) - time.time())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=espera)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Falha no agendador de vencimentos")
+                await asyncio.sleep(self.reload_interval)
+
+    # Heap
+
+    async def _recarregar(self) -> None:
+        """Recarrega do banco (consulta indexada por data_vencimento) a janela do horizonte."""
+        self._dirty = False
+        self._ultima_recarga = time.time()
+        inicio = datetime.fromtimestamp(self._ultima_recarga, timezone.utc)
+        fim = inicio + timedelta(seconds=self.horizon)
+
+        def consultar():
+            with SessionLocal() as db:
+                # O cursor é lido antes da janela: alterações concorrentes são reaplicadas depois
+                cursor = db.scalar(select(func.max(Alteracao.id))) or 0
+                return cursor, db.execute(
+                    select(ObrigacaoAcessoria.id, ObrigacaoAcessoria.data_vencimento)
+                    .where(ObrigacaoAcessoria.data_vencimento >= inicio,
+                           ObrigacaoAcessoria.data_vencimento < fim)
+                ).all()
+
+        self._cursor, linhas = await asyncio.get_running_loop().run_in_executor(None, consultar)
+
+        self._agendadas = {obrigacao_id: _timestamp(vencimento) for obrigacao_id, vencimento in linhas}
+        self._heap = [(vencimento - self.lead, obrigacao_id) for obrigacao_id, vencimento in self._agendadas.items()]
+        heapq.heapify(self._heap)
+        self._fim_janela = fim.timestamp()
+
+        # Descarta alertas emitidos de obrigações que venceram, sumiram ou mudaram de data
+        for usuario_id in list(self._emitidos):
+            alertas = self._emitidos[usuario_id]
+            for obrigacao_id in list(alertas):
+                if self._agendadas.get(obrigacao_id) != alertas[obrigacao_id]["_vencimento"]:
+                    self._descartar_emitido(obrigacao_id)
+
+    async def _aplicar_alteracoes(self) -> None:
+        """Atualiza o heap só com as obrigações alteradas desde o cursor (tombstones incluídos)."""
+        self._dirty = False
+        self._ultima_recarga = time.time()
+        cursor = self._cursor
+
+        def consultar():
+            with SessionLocal() as db:
+                alteracoes = db.execute(
+                    select(Alteracao.id, Alteracao.registro_id, Alteracao.operacao)
+                    .where(Alteracao.id > cursor, Alteracao.tabela == ObrigacaoAcessoria.__tablename__)
+                    .order_by(Alteracao.id)
+                ).all()
+                if not alteracoes:
+                    return None
+                # Apenas a última operação de cada obrigação importa
+                ultimas = {registro_id: operacao for _, registro_id, operacao in alteracoes}
+                alteradas = [registro_id for registro_id, operacao in ultimas.items()
+                             if operacao != OperacaoEnum.EXCLUSAO]
+                vencimentos = dict(db.execute(
+                    select(ObrigacaoAcessoria.id, ObrigacaoAcessoria.data_vencimento)
+                    .where(ObrigacaoAcessoria.id.in_(alteradas))
+                ).all()) if alteradas else {}
+                return alteracoes[-1][0], list(ultimas), vencimentos
+
+        resultado = await asyncio.get_running_loop().run_in_executor(None, consultar)
+        if resultado is None:
+            return
+        self._cursor, obrigacoes, vencimentos = resultado
+
+        agora = time.time()
+        for obrigacao_id in obrigacoes:
+            # Sem data: excluída, arquivada ou sem vencimento
+            data = vencimentos.get(obrigacao_id)
+            vencimento = _timestamp(data) if data is not None else None
+            if vencimento is not None and agora <= vencimento < self._fim_janela:
+                if self._agendadas.get(obrigacao_id) != vencimento:
+                    self._agendadas[obrigacao_id] = vencimento
+                    heapq.heappush(self._heap, (vencimento - self.lead, obrigacao_id))
+            else:
+                self._agendadas.pop(obrigacao_id, None)
+            if self._vencimento_emitido.get(obrigacao_id, vencimento) != vencimento:
+                self._descartar_emitido(obrigacao_id)
+
+    def _descartar_emitido(self, obrigacao_id: int) -> None:
+        """Esquece o alerta emitido de uma obrigação que venceu, sumiu ou mudou de data."""
+        self._vencimento_emitido.pop(obrigacao_id, None)
+        usuario_id = self._usuario_emitido.pop(obrigacao_id, None)
+        alertas = self._emitidos.get(usuario_id)
+        if alertas is not None:
+            alertas.pop(obrigacao_id, None)
+            if not alertas:
+                del self._emitidos[usuario_id]
+
+    async def _disparar(self) -> None:
+        """Emite os alertas cujo momento chegou, validando-os no banco em uma única consulta."""
+        agora = time.time()
+        vencidas: Dict[int, float] = {}
+        while self._heap and self._heap[0][0] <= agora:
+            momento, obrigacao_id = heapq.heappop(self._heap)
+            vencimento = self._agendadas.get(obrigacao_id)
+            if vencimento is None or momento != vencimento - self.lead:
+                continue  # entrada obsoleta
+            if self._vencimento_emitido.get(obrigacao_id) != vencimento:
+                vencidas[obrigacao_id] = vencimento
+        if not vencidas:
+            return
+
+        def consultar():
+            with SessionLocal() as db:
+                return db.execute(
+                    select(ObrigacaoAcessoria.id, ObrigacaoAcessoria.nome,
+                           ObrigacaoAcessoria.data_vencimento, ObrigacaoAcessoria.empresa_id,
+                           Empresa.nome, Empresa.usuario_id)
+                    .join(Empresa, Empresa.id == ObrigacaoAcessoria.empresa_id)
+                    .where(ObrigacaoAcessoria.id.in_(vencidas))
+                ).all()
+
+        linhas = await asyncio.get_running_loop().run_in_executor(None, consultar)
+
+        for obrigacao_id, nome, data_vencimento, empresa_id, empresa_nome, usuario_id in linhas:
+            vencimento = _timestamp(data_vencimento)
+            if vencimento != vencidas[obrigacao_id]:
+                continue  # mudou de data; a alteração reagenda
+            alerta = {
+                "obrigacao_id": obrigacao_id,
+                "nome": nome,
+                "empresa_id": empresa_id,
+                "empresa": empresa_nome,
+                "data_vencimento": datetime.fromtimestamp(vencimento, timezone.utc).isoformat(),
+                "_vencimento": vencimento,
+            }
+            self._emitidos.setdefault(usuario_id, {})[obrigacao_id] = alerta
+            self._vencimento_emitido[obrigacao_id] = vencimento
+            self._usuario_emitido[obrigacao_id] = usuario_id
+            self._entregar(usuario_id, alerta)
+
+
+scheduler = DueDateScheduler(
+    lead=settings.DUE_ALERT_LEAD_HOURS * 3600,
+    horizon=settings.DUE_ALERT_HORIZON_HOURS * 3600,
+    reload_interval=settings.DUE_ALERT_RELOAD_INTERVAL,
+    queue_size=settings.SSE_QUEUE_SIZE,
+)
+
+
+def format_event(alerta: Dict[str, Any]) -> str:
+    """Formata um alerta como evento SSE."""
+    dados = {chave: valor for chave, valor in alerta.items() if not chave.startswith("_")}
+    return f"event: vencimento\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+async def event_stream(request, usuario_id: int):
+    """
+    Gera o fluxo SSE de um usuário: alertas e, nos intervalos, comentários de heartbeat.
+
+    Cada conexão ociosa custa apenas uma corrotina suspensa e uma fila vazia.
+    """
+    fila = scheduler.connect(usuario_id)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                alerta = await asyncio.wait_for(fila.get(), timeout=settings.SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+            yield format_event(alerta)
+    finally:
+        scheduler.disconnect(usuario_id, fila)
+
+
+def setup_due_alerts(app):
+    """Inicia e encerra o agendador de vencimentos junto com a aplicação."""
+
+    @app.on_event("startup")
+    async def start_due_alerts():
+        scheduler.start()
+
+    @app.on_event("shutdown")
+    async def stop_due_alerts():
+        await scheduler.stop()
@@ -1,9 +1,9 @@
 from fastapi import Request, status
 from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError, HTTPException
-from pydantic import ValidationError
+from pydantic import ValidationError as PydanticValidationError
 from typing import Any, Dict, Optional
-import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,12 +16,14 @@ class AppError(Exception):
         message: str,
         status_code: int = status.HTTP_500_INTERNAL_SERVER_ERROR,
         details: Optional[Dict[str, Any]] = None,
-        error_code: Optional[str] = None
+        error_code: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None
     ):
         self.message = message
         self.status_code = status_code
         self.details = details or {}
         self.error_code = error_code or f"ERR_{status_code}"
+        self.headers = headers
         super().__init__(message)
 
 class NotFoundError(AppError):
@@ -77,14 +79,57 @@ class ConflictError(AppError):
             error_code="CONFLICT"
         )
 
+class TooManyRequestsError(AppError):
+    """Exceção para clientes que excederam o limite de requisições."""
+    
+    def __init__(self, retry_after: int, message: str = "Limite de requisições excedido"):
+        super().__init__(
+            message=message,
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            details={"retry_after": retry_after},
+            error_code="TOO_MANY_REQUESTS",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+class ServiceUnavailableError(AppError):
+    """Exceção para descarte de carga quando o servidor está sobrecarregado."""
+    
+    def __init__(self, retry_after: int, message: str = "Servidor sobrecarregado, tente novamente"):
+        super().__init__(
+            message=message,
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            details={"retry_after": retry_after},
+            error_code="SERVICE_UNAVAILABLE",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+def app_error_response(exc: AppError) -> JSONResponse:
+    """Monta a resposta JSON padronizada de um AppError."""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={
+            "success": False,
+            "error": {
+                "code": exc.error_code,
+                "message": exc.message,
+                "details": exc.details,
+            }
+        },
+        headers=exc.headers,
+    )
+
 def setup_exception_handlers(app):
     """Configura os manipuladores de exceção da aplicação."""
     
     @app.exception_handler(AppError)
     async def handle_app_error(request: Request, exc: AppError):
         """Manipula exceções personalizadas da aplicação."""
-        logger.error(
-            f"AppError: {exc.message}",
+        # Traceback apenas para erros do servidor; 4xx são erros do cliente
+        server_error = exc.status_code >= 500
+        logger.log(
+            logging.ERROR if server_error else logging.WARNING,
+            "AppError: %s",
+            exc.message,
             extra={
                 "status_code": exc.status_code,
                 "details": exc.details,
@@ -92,26 +137,17 @@ def setup_exception_handlers(app):
                 "path": request.url.path,
                 "method": request.method,
             },
-            exc_info=True
+            exc_info=exc if server_error else None
         )
         
-        return JSONResponse(
-            status_code=exc.status_code,
-            content={
-                "success": False,
-                "error": {
-                    "code": exc.error_code,
-                    "message": exc.message,
-                    "details": exc.details,
-                }
-            },
-        )
+        return app_error_response(exc)
     
     @app.exception_handler(HTTPException)
     async def handle_http_exception(request: Request, exc: HTTPException):
         """Manipula exceções HTTP do FastAPI."""
         logger.warning(
-            f"HTTPException: {exc.detail}",
+            "HTTPException: %s",
+            exc.detail,
             extra={
                 "status_code": exc.status_code,
                 "path": request.url.path,
@@ -135,10 +171,13 @@ def setup_exception_handlers(app):
     @app.exception_handler(RequestValidationError)
     async def handle_validation_error(request: Request, exc: RequestValidationError):
         """Manipula erros de validação do FastAPI."""
+        # Serializado uma única vez, para o log e para a resposta
+        errors = jsonable_encoder(exc.errors())
         logger.warning(
             "Erro de validação na requisição",
             extra={
-                "errors": json.loads(exc.json()),
+                "status_code": status.HTTP_422_UNPROCESSABLE_ENTITY,
+                "errors": errors,
                 "path": request.url.path,
                 "method": request.method,
             },
@@ -151,18 +190,20 @@ def setup_exception_handlers(app):
                 "error": {
                     "code": "VALIDATION_ERROR",
                     "message": "Erro de validação nos dados fornecidos",
-                    "details": {"errors": json.loads(exc.json())},
+                    "details": {"errors": errors},
                 }
             },
         )
     
-    @app.exception_handler(ValidationError)
-    async def handle_pydantic_validation_error(request: Request, exc: ValidationError):
+    @app.exception_handler(PydanticValidationError)
+    async def handle_pydantic_validation_error(request: Request, exc: PydanticValidationError):
         """Manipula erros de validação do Pydantic."""
+        errors = jsonable_encoder(exc.errors())
         logger.warning(
             "Erro de validação no modelo",
             extra={
-                "errors": exc.errors(),
+                "status_code": status.HTTP_422_UNPROCESSABLE_ENTITY,
+                "errors": errors,
                 "path": request.url.path,
                 "method": request.method,
             },
@@ -175,7 +216,7 @@ def setup_exception_handlers(app):
                 "error": {
                     "code": "VALIDATION_ERROR",
                     "message": "Erro de validação nos dados fornecidos",
-                    "details": {"errors": exc.errors()},
+                    "details": {"errors": errors},
                 }
             },
         )
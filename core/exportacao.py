@@ -0,0 +1,228 @@
+"""
+Exportação colunar (Parquet ou Arrow IPC) de empresas e obrigações para análise.
+
+O job lê o banco em lotes com consultas Core (tuplas, sem objetos do ORM),
+monta um RecordBatch do Arrow por lote diretamente das colunas e grava cada
+lote assim que ele chega: a memória usada fica proporcional ao lote, não à
+tabela. O arquivo é escrito ao lado, com um nome temporário único, e trocado
+por rename, de modo que downloads em andamento continuam lendo a versão
+anterior e duas exportações simultâneas não escrevem no mesmo arquivo.
+
+A exportação pedida pela API roda como job (tarefa "exportar" em core.tarefas).
+
+Conjuntos exportados:
+    empresas
+    obrigacoes_acessorias
+    obrigacoes_empresas  obrigações com nome, CNPJ e responsável da empresa
+
+Requer o pacote pyarrow.
+"""
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import logging
+import mmap
+import os
+import tempfile
+import time
+
+from sqlalchemy import select, type_coerce, String
+
+from config.settings import settings
+from models import Empresa, ObrigacaoAcessoria, PeriodicidadeEnum
+
+logger = logging.getLogger(__name__)
+
+CONJUNTOS = ("empresas", "obrigacoes_acessorias", "obrigacoes_empresas")
+FORMATOS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+# Tamanho dos pedaços enviados no download
+_PEDACO_DOWNLOAD = 1024 * 1024
+
+
+def _conjuntos(pa) -> Dict[str, Tuple[List[Tuple[str, object, object]], object]]:
+    """(colunas, consulta) de cada conjunto; colunas são (nome, expressão, tipo Arrow)."""
+    data = pa.timestamp("us", tz="UTC")
+    # A periodicidade é lida como texto (nome do enum) e convertida em dicionário
+    periodicidade = type_coerce(ObrigacaoAcessoria.periodicidade, String).label("periodicidade")
+    obrigacao = [
+        ("id", ObrigacaoAcessoria.id, pa.int64()),
+        ("nome", ObrigacaoAcessoria.nome, pa.string()),
+        ("descricao", ObrigacaoAcessoria.descricao, pa.string()),
+        ("periodicidade", periodicidade, pa.dictionary(pa.int8(), pa.string())),
+        ("data_vencimento", ObrigacaoAcessoria.data_vencimento, data),
+        ("empresa_id", ObrigacaoAcessoria.empresa_id, pa.int64()),
+        ("data_criacao", ObrigacaoAcessoria.data_criacao, data),
+        ("data_atualizacao", ObrigacaoAcessoria.data_atualizacao, data),
+    ]
+    empresa = [
+        ("id", Empresa.id, pa.int64()),
+        ("nome", Empresa.nome, pa.string()),
+        ("cnpj", Empresa.cnpj, pa.string()),
+        ("endereco", Empresa.endereco, pa.string()),
+        ("email", Empresa.email, pa.string()),
+        ("telefone", Empresa.telefone, pa.string()),
+        ("usuario_id", Empresa.usuario_id, pa.int64()),
+        ("data_criacao", Empresa.data_criacao, data),
+        ("data_atualizacao", Empresa.data_atualizacao, data),
+    ]
+    juncao = obrigacao + [
+        ("empresa_nome", Empresa.nome, pa.string()),
+        ("empresa_cnpj", Empresa.cnpj, pa.string()),
+        ("usuario_id", Empresa.usuario_id, pa.int64()),
+    ]
+
+    def consulta(colunas):
+        return select(*(expressao for _, expressao, _ in colunas))
+
+    return {
+        "empresas": (empresa, consulta(empresa).order_by(Empresa.id)),
+        "obrigacoes_acessorias": (obrigacao, consulta(obrigacao).order_by(ObrigacaoAcessoria.id)),
+        "obrigacoes_empresas": (juncao, consulta(juncao).select_from(ObrigacaoAcessoria).join(
+            Empresa, ObrigacaoAcessoria.empresa_id == Empresa.id).order_by(ObrigacaoAcessoria.id)),
+    }
+
+
+def _coluna(pa, pc, valores: tuple, tipo):
+    """Converte os valores de uma coluna do lote em um array Arrow."""
+    if pa.types.is_dictionary(tipo):
+        # Dicionário fixo com todos os valores do enum: o Arrow IPC não aceita trocar o dicionário entre lotes
+        nomes = pa.array([membro.name for membro in PeriodicidadeEnum], pa.string())
+        indices = pc.index_in(pa.array(valores, pa.string()), value_set=nomes).cast(tipo.index_type)
+        return pa.DictionaryArray.from_arrays(indices, pa.array([membro.value for membro in PeriodicidadeEnum]))
+    if pa.types.is_timestamp(tipo):
+        # O SQLite devolve datas sem fuso; todas são gravadas em UTC
+        valores = [
+            valor.replace(tzinfo=timezone.utc) if valor is not None and valor.tzinfo is None else valor
+            for valor in valores
+        ]
+    return pa.array(valores, tipo)
+
+
+def _escritor(pa, formato: str, caminho: str, schema):
+    if formato == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(caminho, schema, compression="zstd")
+    return pa.ipc.new_file(caminho, schema)
+
+
+def exportar_conjunto(conn, nome: str, diretorio: str, formato: str = "parquet", lote: int = 50_000) -> Dict:
+    """
+    Exporta um conjunto para `diretorio/<nome><extensão>`.
+
+    Args:
+        conn: Conexão do SQLAlchemy (de preferência com uma réplica)
+        nome: Um dos CONJUNTOS
+        diretorio: Diretório de destino
+        formato: "parquet" ou "arrow" (Arrow IPC, lido sem cópia com memory map)
+        lote: Linhas por RecordBatch
+
+    Returns:
+        Dict: Arquivo, linhas, bytes e segundos gastos
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    colunas, consulta = _conjuntos(pa)[nome]
+    schema = pa.schema([(coluna, tipo) for coluna, _, tipo in colunas])
+    caminho = os.path.join(diretorio, nome + FORMATOS[formato])
+    descritor, temporario = tempfile.mkstemp(prefix=f".{nome}.", suffix=".tmp", dir=diretorio)
+    os.close(descritor)
+
+    inicio = time.perf_counter()
+    linhas = 0
+    resultado = conn.execution_options(stream_results=True, yield_per=lote).execute(consulta)
+    escritor = _escritor(pa, formato, temporario, schema)
+    try:
+        for particao in resultado.partitions(lote):
+            valores = tuple(zip(*particao))
+            escritor.write_batch(pa.RecordBatch.from_arrays(
+                [_coluna(pa, pc, valores[i], tipo) for i, (_, _, tipo) in enumerate(colunas)],
+                schema=schema,
+            ))
+            linhas += len(particao)
+        escritor.close()
+    except BaseException:
+        resultado.close()
+        escritor.close()
+        os.unlink(temporario)
+        raise
+    os.replace(temporario, caminho)
+
+    return {
+        "arquivo": os.path.basename(caminho),
+        "linhas": linhas,
+        "bytes": os.path.getsize(caminho),
+        "segundos": round(time.perf_counter() - inicio, 3),
+    }
+
+
+def exportar(db_engine, diretorio: Optional[str] = None, formato: str = "parquet",
+             lote: Optional[int] = None, progresso: Optional[Callable[[int, int], None]] = None) -> List[Dict]:
+    """
+    Exporta todos os conjuntos, cada um lido em uma transação própria.
+
+    Args:
+        db_engine: Engine de onde ler (uma réplica, se houver)
+        diretorio: Destino; padrão EXPORT_DIR
+        formato: "parquet" ou "arrow"
+        lote: Linhas por lote; padrão EXPORT_BATCH_SIZE
+        progresso: Chamada com (conjuntos exportados, total) após cada conjunto
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de exportação inválido: {formato}")
+    diretorio = diretorio or settings.EXPORT_DIR
+    os.makedirs(diretorio, exist_ok=True)
+    arquivos = []
+    for nome in CONJUNTOS:
+        with db_engine.connect() as conn:
+            arquivos.append(exportar_conjunto(conn, nome, diretorio, formato, lote or settings.EXPORT_BATCH_SIZE))
+        if progresso is not None:
+            progresso(len(arquivos), len(CONJUNTOS))
+    logger.info("Exportação concluída", extra={"arquivos": arquivos})
+    return arquivos
+
+
+def listar_exportacoes(diretorio: Optional[str] = None) -> List[Dict]:
+    """Arquivos exportados disponíveis para download."""
+    diretorio = diretorio or settings.EXPORT_DIR
+    if not os.path.isdir(diretorio):
+        return []
+    arquivos = []
+    for arquivo in sorted(os.listdir(diretorio)):
+        if os.path.splitext(arquivo)[1] not in FORMATOS.values():
+            continue
+        info = os.stat(os.path.join(diretorio, arquivo))
+        arquivos.append({
+            "arquivo": arquivo,
+            "bytes": info.st_size,
+            "gerado_em": datetime.fromtimestamp(info.st_mtime, timezone.utc),
+        })
+    return arquivos
+
+
+def caminho_exportacao(arquivo: str, diretorio: Optional[str] = None) -> str:
+    """
+    Caminho de um arquivo exportado, apenas se ele estiver em `listar_exportacoes`.
+
+    Raises:
+        FileNotFoundError: Para nomes desconhecidos (inclusive tentativas de sair do diretório)
+    """
+    diretorio = diretorio or settings.EXPORT_DIR
+    if arquivo not in {item["arquivo"] for item in listar_exportacoes(diretorio)}:
+        raise FileNotFoundError(arquivo)
+    return os.path.join(diretorio, arquivo)
+
+
+def ler_mapeado(caminho: str) -> Iterator[bytes]:
+    """
+    Lê o arquivo por memory map, um pedaço por vez, sem carregá-lo inteiro na memória.
+
+    O arquivo é aberto antes do primeiro pedaço; uma nova exportação troca o
+    nome por rename e não afeta o mapeamento já aberto.
+    """
+    with open(caminho, "rb") as arquivo:
+        if os.fstat(arquivo.fileno()).st_size == 0:
+            return
+        with mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            for inicio in range(0, len(mapa), _PEDACO_DOWNLOAD):
+                yield mapa[inicio:inicio + _PEDACO_DOWNLOAD]
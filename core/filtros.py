@@ -0,0 +1,141 @@
+"""
+Filtros e ordenação das listagens, traduzidos em predicados SQL indexados.
+
+As listagens aceitam filtros por empresa, periodicidade, intervalo de
+vencimento e prefixo do nome, e `sort=campo,-campo`. Só podem ser ordenadas
+as colunas com índice (ORDENAVEIS_*); scripts/verificar_indices.py confere
+com EXPLAIN que cada combinação suportada usa um índice.
+"""
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence
+
+from core.exceptions import ValidationError
+from models import Empresa, PeriodicidadeEnum
+
+# Colunas ordenáveis (todas indexadas)
+ORDENAVEIS_EMPRESAS = ("id", "nome")
+ORDENAVEIS_OBRIGACOES = ("id", "nome", "data_vencimento", "empresa_id")
+
+
+def ordenacao(modelo, sort: Optional[str], permitidos: Sequence[str]) -> list:
+    """
+    Converte `sort` ("nome,-data_vencimento") em critérios de ORDER BY.
+
+    O id é acrescentado como desempate, para que a ordem seja estável, na mesma
+    direção do último campo: assim o índice pode ser percorrido ao contrário.
+
+    Raises:
+        ValidationError: Se algum campo não estiver na lista de permitidos
+    """
+    criterios = []
+    campos = set()
+    decrescente = False
+    for item in (sort or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        campo = item.lstrip("+-")
+        if campo not in permitidos:
+            raise ValidationError(
+                f"Ordenação por '{campo}' não é permitida",
+                details={"sort": sort, "permitidos": list(permitidos)},
+            )
+        if campo in campos:
+            continue
+        campos.add(campo)
+        coluna = getattr(modelo, campo)
+        decrescente = item.startswith("-")
+        criterios.append(coluna.desc() if decrescente else coluna.asc())
+    if "id" not in campos:
+        criterios.append(modelo.id.desc() if decrescente else modelo.id.asc())
+    return criterios
+
+
+def prefixo(coluna, valor: str, dialeto: str) -> list:
+    """
+    Predicados de "começa com" (diferenciando maiúsculas) que podem usar o índice da coluna.
+
+    No PostgreSQL o LIKE 'abc%' usa o índice text_pattern_ops. No SQLite o LIKE
+    não diferencia maiúsculas e por isso não usa o índice; o intervalo
+    [valor, sucessor) faz a busca no índice e o LIKE confirma o prefixo.
+    """
+    predicados = [coluna.startswith(valor, autoescape=True)]
+    if dialeto == "sqlite":
+        predicados.append(coluna >= valor)
+        if ord(valor[-1]) < 0x10FFFF:
+            predicados.append(coluna < valor[:-1] + chr(ord(valor[-1]) + 1))
+    return predicados
+
+
+def _periodicidade(valor: str) -> PeriodicidadeEnum:
+    """Aceita o valor ("Mensal") ou o nome ("MENSAL") da periodicidade."""
+    try:
+        return PeriodicidadeEnum(valor)
+    except ValueError:
+        pass
+    try:
+        return PeriodicidadeEnum[valor.upper()]
+    except KeyError:
+        raise ValidationError(
+            f"Periodicidade inválida: '{valor}'",
+            details={"permitidas": [membro.value for membro in PeriodicidadeEnum]},
+        )
+
+
+def filtros_empresa(dialeto: str, nome: Optional[str] = None) -> list:
+    """Predicados da listagem de empresas (o escopo por usuário é aplicado à parte)."""
+    return prefixo(Empresa.nome, nome, dialeto) if nome else []
+
+
+def _utc(valor: Optional[datetime]) -> Optional[datetime]:
+    """Limite do intervalo de vencimento em UTC; datas sem fuso são tratadas como UTC."""
+    if valor is None:
+        return None
+    if valor.tzinfo is None:
+        return valor.replace(tzinfo=timezone.utc)
+    return valor.astimezone(timezone.utc)
+
+
+def filtros_obrigacao(
+    modelo,
+    dialeto: str,
+    empresa_id: Optional[List[int]] = None,
+    periodicidade: Optional[List[str]] = None,
+    vencimento_de: Optional[datetime] = None,
+    vencimento_antes_de: Optional[datetime] = None,
+    nome: Optional[str] = None,
+) -> list:
+    """
+    Predicados da listagem de obrigações.
+
+    Args:
+        modelo: ObrigacaoAcessoria ou ObrigacaoAcessoriaArquivada
+        dialeto: Nome do dialeto do banco (ver `prefixo`)
+        empresa_id: Uma ou mais empresas
+        periodicidade: Uma ou mais periodicidades (valor ou nome)
+        vencimento_de: Vencimento a partir desta data (inclusive), com ou sem fuso
+        vencimento_antes_de: Vencimento antes desta data (exclusive), com ou sem fuso
+        nome: Prefixo do nome
+
+    Raises:
+        ValidationError: Se a periodicidade for inválida ou o intervalo estiver invertido
+    """
+    predicados = []
+    if empresa_id:
+        predicados.append(modelo.empresa_id.in_(empresa_id) if len(empresa_id) > 1
+                          else modelo.empresa_id == empresa_id[0])
+    if periodicidade:
+        valores = [_periodicidade(valor) for valor in periodicidade]
+        predicados.append(modelo.periodicidade.in_(valores) if len(valores) > 1
+                          else modelo.periodicidade == valores[0])
+    # Um limite com fuso e outro sem não são comparáveis: os dois passam para UTC
+    vencimento_de, vencimento_antes_de = _utc(vencimento_de), _utc(vencimento_antes_de)
+    if vencimento_de and vencimento_antes_de and vencimento_de >= vencimento_antes_de:
+        raise ValidationError("vencimento_de deve ser anterior a vencimento_antes_de")
+    if vencimento_de:
+        predicados.append(modelo.data_vencimento >= vencimento_de)
+    if vencimento_antes_de:
+        predicados.append(modelo.data_vencimento < vencimento_antes_de)
+    if nome:
+        predicados.extend(prefixo(modelo.nome, nome, dialeto))
+    return predicados
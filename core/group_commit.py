@@ -0,0 +1,216 @@
+"""
+Agrupamento de escritas (group commit) para criações de uma linha em alta taxa.
+
+Sem agrupamento cada POST /empresa ou POST /obrigacaoAcessoria paga uma
+transação inteira, com o fsync do commit. Com GROUP_COMMIT_ENABLED, as
+criações que chegam ao worker em até GROUP_COMMIT_MAX_DELAY_MS são reunidas
+(até GROUP_COMMIT_MAX_BATCH) em um único INSERT de várias linhas e um único
+commit, executados fora do event loop. Enquanto um lote grava, as criações
+seguintes formam o próximo lote.
+
+Cada requisição continua recebendo o próprio resultado: se o lote falha
+(ex.: CNPJ duplicado), ele é desfeito e as linhas são gravadas uma a uma,
+para que só a requisição culpada receba o erro.
+
+Desativado, a criação usa a sessão da requisição e passa pelas mesmas funções
+de gravação, com um lote de uma linha.
+"""
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from core.change_log import registrar_alteracoes
+from core.exceptions import AppError, ConflictError, ValidationError
+from core.invalidation import EMPRESAS, OBRIGACOES_ACESSORIAS, invalidation_bus
+from core.resumo import aplicar_deltas, chaves_obrigacao
+from database import SessionLocal
+from models import Empresa, ObrigacaoAcessoria, OperacaoEnum
+
+logger = logging.getLogger(__name__)
+
+# Grava as linhas na sessão (sem commit) e retorna os ids na ordem das linhas
+Insercao = Callable[[Session, List[Dict[str, Any]]], List[int]]
+
+
+def _inserir(db: Session, modelo, linhas: List[Dict[str, Any]]) -> List[int]:
+    """INSERT de várias linhas com RETURNING, mais as entradas do feed de alterações."""
+    ids = list(db.scalars(insert(modelo).returning(modelo.id, sort_by_parameter_order=True), linhas))
+    registrar_alteracoes(db, modelo, OperacaoEnum.CRIACAO, modelo.id.in_(ids))
+    return ids
+
+
+def inserir_empresas(db: Session, linhas: List[Dict[str, Any]]) -> List[int]:
+    return _inserir(db, Empresa, linhas)
+
+
+def inserir_obrigacoes(db: Session, linhas: List[Dict[str, Any]]) -> List[int]:
+    ids = _inserir(db, ObrigacaoAcessoria, linhas)
+    # Um único INSERT ... ON CONFLICT no resumo para o lote inteiro
+    deltas: Counter = Counter()
+    for linha in linhas:
+        for chave in chaves_obrigacao(linha["periodicidade"], linha["empresa_id"], linha.get("data_vencimento")):
+            deltas[chave] += 1
+    aplicar_deltas(db, deltas)
+    return ids
+
+
+def erro_empresa(linha: Dict[str, Any]) -> AppError:
+    return ConflictError("CNPJ já cadastrado", details={"cnpj": linha["cnpj"]})
+
+
+def erro_obrigacao(linha: Dict[str, Any]) -> AppError:
+    return ValidationError("Empresa não encontrada", details={"empresa_id": linha["empresa_id"]})
+
+
+def _falha(exc: Exception, linha: Dict[str, Any], erro: Callable[[Dict[str, Any]], AppError]) -> Exception:
+    """Resultado de uma linha que não pôde ser gravada sozinha."""
+    if isinstance(exc, IntegrityError):
+        return erro(linha)
+    logger.error("Falha ao gravar linha", exc_info=exc)
+    return exc
+
+
+def gravar_lote(db: Session, linhas: List[Dict[str, Any]], inserir: Insercao,
+                erro: Callable[[Dict[str, Any]], AppError]) -> List[Any]:
+    """
+    Grava as linhas em uma transação; se o lote falhar, grava uma a uma.
+
+    Qualquer falha do banco ou dos valores (ValueError) fica restrita à linha
+    que a causou; só a violação de uma restrição vira o erro de `erro`.
+
+    Args:
+        db: Sessão do banco de dados (sem transação pendente)
+        linhas: Valores de cada linha
+        inserir: Função que insere as linhas e retorna os ids
+        erro: Erro devolvido a quem enviou uma linha rejeitada pelo banco
+
+    Returns:
+        List[Any]: Para cada linha, o id criado ou a exceção correspondente
+    """
+    try:
+        ids = inserir(db, linhas)
+        db.commit()
+        return ids
+    except (SQLAlchemyError, ValueError) as exc:
+        db.rollback()
+        if len(linhas) == 1:
+            return [_falha(exc, linhas[0], erro)]
+
+    resultados: List[Any] = []
+    for linha in linhas:
+        try:
+            resultados.extend(inserir(db, [linha]))
+            db.commit()
+        except (SQLAlchemyError, ValueError) as exc:
+            db.rollback()
+            resultados.append(_falha(exc, linha, erro))
+    return resultados
+
+
+class GrupoEscrita:
+    """
+    Reúne as criações de um tipo de registro em lotes gravados com um único commit.
+
+    Usado apenas pelo event loop do worker (sem trava); cada lote é gravado em
+    uma thread do executor padrão, com sessão própria, um lote por vez.
+    """
+
+    def __init__(self, inserir: Insercao, erro: Callable[[Dict[str, Any]], AppError], topico: str,
+                 max_lote: int, max_espera_ms: float, ativo: bool, session_factory=SessionLocal):
+        self.inserir = inserir
+        self.erro = erro
+        self.topico = topico
+        self.max_lote = max_lote
+        self.max_espera = max_espera_ms / 1000
+        self.ativo = ativo
+        self.lotes = 0
+        self.linhas = 0
+        self._session_factory = session_factory
+        self._pendentes: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._gravando = False
+        self._tarefa: Optional[asyncio.Task] = None
+
+    async def criar(self, db: Session, linha: Dict[str, Any]) -> int:
+        """
+        Cria o registro e retorna o id.
+
+        Com o agrupamento desativado grava na sessão da requisição.
+
+        Raises:
+            AppError: Se o banco rejeitou a linha (ex.: CNPJ duplicado)
+        """
+        if not self.ativo:
+            resultado = gravar_lote(db, [linha], self.inserir, self.erro)[0]
+            if isinstance(resultado, Exception):
+                raise resultado
+            invalidation_bus.publish(self.topico)
+            return resultado
+
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self._pendentes.append((linha, futuro))
+        if len(self._pendentes) >= self.max_lote:
+            self._disparar()
+        elif self._timer is None and not self._gravando:
+            self._timer = loop.call_later(self.max_espera, self._disparar)
+        return await futuro
+
+    def _disparar(self) -> None:
+        """Inicia a gravação do próximo lote, se nenhum estiver gravando."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # O lote em andamento dispara o próximo ao terminar
+        if self._gravando or not self._pendentes:
+            return
+        lote = self._pendentes[:self.max_lote]
+        del self._pendentes[:self.max_lote]
+        self._gravando = True
+        self._tarefa = asyncio.get_running_loop().create_task(self._gravar(lote))
+
+    async def _gravar(self, lote: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        try:
+            resultados = await asyncio.get_running_loop().run_in_executor(
+                None, self._gravar_sessao, [linha for linha, _ in lote])
+        except Exception as exc:
+            logger.exception("Falha ao gravar lote", extra={"topico": self.topico, "linhas": len(lote)})
+            resultados = [exc] * len(lote)
+        finally:
+            self._gravando = False
+
+        for (_, futuro), resultado in zip(lote, resultados):
+            # A requisição pode ter sido cancelada (cliente desconectou) durante a gravação
+            if futuro.done():
+                continue
+            if isinstance(resultado, Exception):
+                futuro.set_exception(resultado)
+            else:
+                futuro.set_result(resultado)
+        self._disparar()
+
+    def _gravar_sessao(self, linhas: List[Dict[str, Any]]) -> List[Any]:
+        with self._session_factory() as db:
+            resultados = gravar_lote(db, linhas, self.inserir, self.erro)
+        self.lotes += 1
+        self.linhas += len(linhas)
+        if any(not isinstance(resultado, Exception) for resultado in resultados):
+            invalidation_bus.publish(self.topico)
+        return resultados
+
+    def stats(self) -> dict:
+        return {"ativo": self.ativo, "lotes": self.lotes, "linhas": self.linhas,
+                "pendentes": len(self._pendentes), "max_lote": self.max_lote,
+                "max_espera_ms": self.max_espera * 1000}
+
+
+empresas = GrupoEscrita(inserir_empresas, erro_empresa, EMPRESAS, settings.GROUP_COMMIT_MAX_BATCH,
+                        settings.GROUP_COMMIT_MAX_DELAY_MS, settings.GROUP_COMMIT_ENABLED)
+obrigacoes = GrupoEscrita(inserir_obrigacoes, erro_obrigacao, OBRIGACOES_ACESSORIAS, settings.GROUP_COMMIT_MAX_BATCH,
+                          settings.GROUP_COMMIT_MAX_DELAY_MS, settings.GROUP_COMMIT_ENABLED)
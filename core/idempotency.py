@@ -0,0 +1,215 @@
+from datetime import datetime, timedelta, timezone
+from hashlib import blake2b
+from typing import List, Optional, Tuple
+import asyncio
+
+from fastapi import Request, status
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+from config.settings import settings
+from core.exceptions import AppError, ConflictError, ValidationError, app_error_response
+from core.rate_limit import client_identity
+from database import SessionLocal
+from models import RespostaIdempotente
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+
+# Cabeçalhos que não devem ser repetidos na resposta reproduzida
+_SKIPPED_HEADERS = {b"set-cookie", b"date", b"server"}
+
+
+class _Entry:
+    """Resposta armazenada para uma chave; `body` é None enquanto a requisição original roda."""
+
+    __slots__ = ("request_hash", "status", "headers", "body")
+
+    def __init__(self, request_hash: bytes, status_code: int = 0,
+                 headers: Optional[List[Tuple[bytes, bytes]]] = None, body: Optional[bytes] = None):
+        self.request_hash = request_hash
+        self.status = status_code
+        self.headers = headers or []
+        self.body = body
+
+
+class IdempotencyStore:
+    """
+    Armazena as respostas por chave de idempotência na tabela respostas_idempotentes.
+
+    A restrição única em (identidade, método, caminho, chave) vale para todos os
+    workers: a mesma chave enviada a dois processos executa a requisição uma
+    vez só. A reserva dura `reserva` segundos, para que um worker que caia no
+    meio da requisição não prenda a chave até o fim do TTL; a resposta final
+    fica guardada por `ttl` segundos. Os métodos são síncronos (rodam no
+    executor) e cada um usa a sua própria sessão.
+    """
+
+    def __init__(self, ttl: float, reserva: float, session_factory=SessionLocal):
+        self.ttl = ttl
+        self.reserva = reserva
+        self.session_factory = session_factory
+
+    @staticmethod
+    def _filtro(key: tuple) -> tuple:
+        metodo, caminho, identidade, chave = key
+        return (
+            RespostaIdempotente.identidade == identidade,
+            RespostaIdempotente.metodo == metodo,
+            RespostaIdempotente.caminho == caminho,
+            RespostaIdempotente.chave == chave,
+        )
+
+    def begin(self, key: tuple, request_hash: bytes) -> Optional[_Entry]:
+        """
+        Reserva a chave para uma nova requisição.
+
+        Args:
+            key: Método, rota, cliente e valor do cabeçalho Idempotency-Key
+            request_hash: Hash do corpo da requisição
+
+        Returns:
+            Optional[_Entry]: A entrada existente, ou None se a chave foi reservada agora
+        """
+        metodo, caminho, identidade, chave = key
+        agora = datetime.now(timezone.utc)
+        with self.session_factory() as db:
+            # Aproveita para apagar as entradas vencidas (índice em expira_em), inclusive uma desta chave
+            db.execute(delete(RespostaIdempotente).where(RespostaIdempotente.expira_em <= agora))
+            db.add(RespostaIdempotente(
+                identidade=identidade, metodo=metodo, caminho=caminho, chave=chave,
+                hash_requisicao=request_hash, expira_em=agora + timedelta(seconds=self.reserva),
+            ))
+            try:
+                db.commit()
+                return None
+            except IntegrityError:
+                db.rollback()
+
+            resposta = db.scalars(select(RespostaIdempotente).where(*self._filtro(key))).first()
+        if resposta is None:
+            # A reserva concorrente foi descartada entre o INSERT e a consulta: o cliente tenta de novo
+            return _Entry(request_hash)
+        return _Entry(
+            resposta.hash_requisicao,
+            resposta.status or 0,
+            [(nome.encode("latin-1"), valor.encode("latin-1")) for nome, valor in resposta.cabecalhos or []],
+            resposta.corpo if resposta.status is not None else None,
+        )
+
+    def complete(self, key: tuple, status_code: int, headers: List[Tuple[bytes, bytes]], body: bytes) -> None:
+        """Guarda a resposta final da requisição original."""
+        with self.session_factory() as db:
+            db.execute(
+                update(RespostaIdempotente)
+                .where(*self._filtro(key), RespostaIdempotente.status.is_(None))
+                .values(
+                    status=status_code,
+                    cabecalhos=[[nome.decode("latin-1"), valor.decode("latin-1")] for nome, valor in headers],
+                    corpo=body,
+                    expira_em=datetime.now(timezone.utc) + timedelta(seconds=self.ttl),
+                )
+            )
+            db.commit()
+
+    def discard(self, key: tuple) -> None:
+        """Libera a chave para que uma nova tentativa seja executada."""
+        with self.session_factory() as db:
+            db.execute(delete(RespostaIdempotente).where(*self._filtro(key), RespostaIdempotente.status.is_(None)))
+            db.commit()
+
+
+store = IdempotencyStore(settings.IDEMPOTENCY_TTL_SECONDS, settings.IDEMPOTENCY_RESERVATION_SECONDS)
+
+
+async def _no_executor(funcao, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, funcao, *args)
+
+
+class IdempotencyMiddleware:
+    """
+    Reproduz a resposta original quando um POST é repetido com o mesmo Idempotency-Key.
+
+    Roda antes do roteamento: uma repetição não passa por validação nem pelas rotas,
+    só pela consulta à tabela respostas_idempotentes.
+    Respostas 5xx e 429 não são guardadas, para que o cliente possa tentar de novo.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or f'{scope["method"]} {scope["path"]}' not in settings.IDEMPOTENT_ROUTES:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope, receive)
+        idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not 1 <= len(idempotency_key) <= 255:
+            await app_error_response(AppError(
+                "Idempotency-Key deve ter entre 1 e 255 caracteres",
+                status_code=status.HTTP_400_BAD_REQUEST,
+                error_code="INVALID_IDEMPOTENCY_KEY",
+            ))(scope, receive, send)
+            return
+
+        body = await request.body()
+        request_hash = blake2b(body, digest_size=16).digest()
+        key = (scope["method"], scope["path"], client_identity(request), idempotency_key)
+
+        entry = await _no_executor(store.begin, key, request_hash)
+        if entry is not None:
+            if entry.request_hash != request_hash:
+                error = ValidationError("Idempotency-Key já usada com outro corpo de requisição")
+            elif entry.body is None:
+                error = ConflictError("Requisição com esta Idempotency-Key ainda em processamento")
+            else:
+                await send({
+                    "type": "http.response.start",
+                    "status": entry.status,
+                    "headers": entry.headers + [(b"idempotent-replayed", b"true")],
+                })
+                await send({"type": "http.response.body", "body": entry.body})
+                return
+            await app_error_response(error)(scope, receive, send)
+            return
+
+        # O corpo já foi consumido: entrega-o de novo à aplicação
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        response_status = 0
+        response_headers: List[Tuple[bytes, bytes]] = []
+        response_body = bytearray()
+
+        async def capture_send(message):
+            nonlocal response_status, response_headers
+            if message["type"] == "http.response.start":
+                response_status = message["status"]
+                response_headers = [
+                    (name, value) for name, value in message.get("headers", [])
+                    if name.lower() not in _SKIPPED_HEADERS
+                ]
+            elif message["type"] == "http.response.body":
+                response_body.extend(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            await _no_executor(store.discard, key)
+            raise
+
+        if response_status >= 500 or response_status == status.HTTP_429_TOO_MANY_REQUESTS:
+            await _no_executor(store.discard, key)
+        else:
+            await _no_executor(store.complete, key, response_status, response_headers, bytes(response_body))
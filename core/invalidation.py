@@ -0,0 +1,254 @@
+"""
+Barramento de invalidação de cache entre workers.
+
+Cada worker mantém caches próprios (empresas, obrigações, usuários); quando um
+deles escreve, os demais precisam descartar o que têm em memória. As escritas
+chamam `invalidation_bus.publish(topico)` e os caches consultam
+`invalidation_bus.generation(topico)` ou registram um callback com `subscribe`.
+
+Backends:
+    local: contadores de geração em um arquivo mapeado em memória, compartilhado
+        pelos workers do mesmo host (também usado nos testes)
+    postgres: LISTEN/NOTIFY no banco principal, para vários hosts
+"""
+from abc import ABC, abstractmethod
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, List, Optional
+import logging
+import mmap
+import os
+import select
+import struct
+import tempfile
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos, apenas entre threads
+    fcntl = None
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+from config.settings import settings
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+EMPRESAS = "empresas"
+OBRIGACOES_ACESSORIAS = "obrigacoes_acessorias"
+USUARIOS = "usuarios"
+TOKENS_REVOGADOS = "tokens_revogados"
+
+# Novos tópicos entram no fim: a posição é o slot no arquivo do backend local
+TOPICS = (EMPRESAS, OBRIGACOES_ACESSORIAS, USUARIOS, TOKENS_REVOGADOS)
+
+Callback = Callable[[str], None]
+
+
+class InvalidationBus(ABC):
+    """Interface comum dos backends: gerações locais e callbacks por tópico."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._generations: Dict[str, int] = {topic: 0 for topic in TOPICS}
+        self._callbacks: Dict[str, List[Callback]] = {topic: [] for topic in TOPICS}
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    def generation(self, topic: str) -> int:
+        """Retorna a geração atual do tópico; muda a cada invalidação."""
+        return self._generations[topic]
+
+    def subscribe(self, topic: str, callback: Callback) -> None:
+        """Registra `callback(topic)` para ser chamado a cada invalidação do tópico."""
+        with self._lock:
+            self._callbacks[topic].append(callback)
+
+    @abstractmethod
+    def publish(self, *topics: str) -> None:
+        """Invalida os tópicos neste worker e avisa os demais."""
+
+    def start(self) -> None:
+        """Inicia a thread que recebe as invalidações dos outros workers."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = Thread(target=self._listen, name=type(self).__name__, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Encerra a thread de escuta."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    @abstractmethod
+    def _listen(self) -> None:
+        """Recebe as invalidações dos outros workers até `stop`."""
+
+    def _notify(self, topic: str, generation: Optional[int] = None) -> None:
+        """Atualiza a geração local e chama os callbacks do tópico."""
+        with self._lock:
+            self._generations[topic] = (
+                generation if generation is not None else self._generations[topic] + 1
+            )
+            callbacks = list(self._callbacks[topic])
+        for callback in callbacks:
+            try:
+                callback(topic)
+            except Exception:
+                logger.exception("Falha no callback de invalidação", extra={"topic": topic})
+
+
+class LocalInvalidationBus(InvalidationBus):
+    """
+    Contadores de geração em memória compartilhada entre os processos do host.
+
+    O arquivo guarda um inteiro de 64 bits por tópico; publicar incrementa o
+    contador sob trava de arquivo, e a thread de escuta compara os contadores
+    a cada `poll_interval` segundos.
+    """
+
+    _SLOT = struct.Struct("<Q")
+
+    def __init__(self, path: str, poll_interval: float = 0.05):
+        super().__init__()
+        self.path = path
+        self.poll_interval = poll_interval
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        tamanho = self._SLOT.size * len(TOPICS)
+        if os.fstat(self._fd).st_size < tamanho:
+            os.ftruncate(self._fd, tamanho)
+        self._map = mmap.mmap(self._fd, tamanho)
+        # Parte das gerações já existentes para não disparar callbacks na partida
+        for topic in TOPICS:
+            self._generations[topic] = self._read(topic)
+
+    def _offset(self, topic: str) -> int:
+        return TOPICS.index(topic) * self._SLOT.size
+
+    def _read(self, topic: str) -> int:
+        return self._SLOT.unpack_from(self._map, self._offset(topic))[0]
+
+    def publish(self, *topics: str) -> None:
+        for topic in topics:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                generation = self._read(topic) + 1
+                self._SLOT.pack_into(self._map, self._offset(topic), generation)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self._notify(topic, generation)
+
+    def _listen(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            for topic in TOPICS:
+                generation = self._read(topic)
+                if generation != self._generations[topic]:
+                    self._notify(topic, generation)
+
+
+class PostgresInvalidationBus(InvalidationBus):
+    """
+    Invalidação via LISTEN/NOTIFY do PostgreSQL.
+
+    A publicação usa `pg_notify` em uma conexão do pool; a escuta mantém uma
+    conexão psycopg2 dedicada. Cada worker ignora as próprias notificações, já
+    aplicadas localmente em `publish`.
+    """
+
+    def __init__(self, db_engine, channel: str):
+        super().__init__()
+        self.engine = db_engine
+        self.channel = channel
+        self._instance = uuid.uuid4().hex
+
+    def publish(self, *topics: str) -> None:
+        with self.engine.connect() as conn:
+            for topic in topics:
+                conn.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": self.channel, "payload": f"{topic}:{self._instance}"},
+                )
+            conn.commit()
+        for topic in topics:
+            self._notify(topic)
+
+    def _listen(self) -> None:
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        url = make_url(self.engine.url).set(drivername="postgresql")
+        dsn = url.render_as_string(hide_password=False)
+
+        while not self._stop.is_set():
+            try:
+                conn = psycopg2.connect(dsn)
+            except psycopg2.Error:
+                logger.exception("Falha ao conectar o listener de invalidação")
+                self._stop.wait(5)
+                continue
+            try:
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                # Notificações podem ter se perdido enquanto estávamos desconectados
+                for topic in TOPICS:
+                    self._notify(topic)
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        topic, _, instance = conn.notifies.pop(0).payload.partition(":")
+                        if instance != self._instance and topic in self._generations:
+                            self._notify(topic)
+            except psycopg2.Error:
+                logger.exception("Listener de invalidação desconectado")
+                self._stop.wait(1)
+            finally:
+                conn.close()
+
+
+def create_invalidation_bus(db_engine) -> InvalidationBus:
+    """
+    Cria o barramento configurado em `settings.CACHE_INVALIDATION_BACKEND`.
+
+    Args:
+        db_engine: Engine do banco principal (usada pelo backend postgres)
+
+    Returns:
+        InvalidationBus: Barramento de invalidação
+
+    Raises:
+        ValueError: Se o backend for desconhecido ou incompatível com o banco
+    """
+    backend = settings.CACHE_INVALIDATION_BACKEND
+    if backend == "local":
+        path = settings.CACHE_INVALIDATION_PATH or os.path.join(
+            tempfile.gettempdir(), "cadastro-empresas-invalidacao"
+        )
+        return LocalInvalidationBus(path, settings.CACHE_INVALIDATION_POLL_INTERVAL)
+    if backend == "postgres":
+        if db_engine.dialect.name != "postgresql":
+            raise ValueError("CACHE_INVALIDATION_BACKEND=postgres exige DATABASE_URL PostgreSQL")
+        return PostgresInvalidationBus(db_engine, settings.CACHE_INVALIDATION_CHANNEL)
+    raise ValueError(f"Backend de invalidação desconhecido: {backend}")
+
+
+invalidation_bus = create_invalidation_bus(engine)
+
+
+def setup_invalidation(app):
+    """Inicia e encerra a escuta do barramento junto com a aplicação."""
+
+    @app.on_event("startup")
+    async def start_invalidation_bus():
+        invalidation_bus.start()
+
+    @app.on_event("shutdown")
+    async def stop_invalidation_bus():
+        invalidation_bus.stop()
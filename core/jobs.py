@@ -0,0 +1,300 @@
+"""
+Jobs em segundo plano para operações que não cabem no tempo de uma requisição.
+
+A fila é a tabela jobs do próprio banco, sem broker externo. Cada worker da
+API (ou scripts/executar_jobs.py) roda JOB_THREADS threads que reservam o
+próximo job pendente com um UPDATE condicional (só um processo consegue
+passar o status de pendente para executando) e o executam. Etapas pesadas de
+CPU, como validar milhares de CNPJs, vão para um ProcessPoolExecutor, fora
+do GIL dos workers.
+
+Os tipos de job são funções registradas com `@tarefa("nome")`, que recebem o
+ContextoJob, os parâmetros e o usuário e retornam o resultado (JSON). O
+contexto informa o progresso e interrompe o job com JobCancelado quando o
+cancelamento foi pedido.
+
+Um processo que morre no meio de um job para de renovar o heartbeat; depois
+de JOB_LEASE_SECONDS o job volta para a fila e é executado de novo do início,
+por isso as tarefas devem ser idempotentes (a importação usa upsert).
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+import logging
+import multiprocessing
+import os
+import socket
+import time
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from database import SessionLocal
+from models import Job, JobStatusEnum
+
+logger = logging.getLogger(__name__)
+
+Tarefa = Callable[["ContextoJob", Dict[str, Any], int], Any]
+
+TAREFAS: Dict[str, Tarefa] = {}
+
+# Intervalo mínimo entre gravações de progresso de um mesmo job
+_INTERVALO_PROGRESSO = 0.5
+
+
+def tarefa(tipo: str):
+    """Registra a função como executora dos jobs do tipo informado."""
+    def registrar(funcao: Tarefa) -> Tarefa:
+        TAREFAS[tipo] = funcao
+        return funcao
+    return registrar
+
+
+class JobCancelado(Exception):
+    """Levantada dentro do job quando o cancelamento foi pedido."""
+
+
+_pool_lock = Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def mapear_cpu(funcao: Callable, partes: Iterable) -> Iterator:
+    """
+    Aplica uma função pura (importável pelo nome) a cada parte no pool de processos.
+
+    Os resultados saem na ordem das partes, à medida que ficam prontos. Com
+    JOB_PROCESS_POOL_SIZE=0 executa na própria thread. O pool usa spawn: os
+    processos filhos não herdam as conexões nem as threads do worker.
+    """
+    global _pool
+    if settings.JOB_PROCESS_POOL_SIZE <= 0:
+        return map(funcao, partes)
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(settings.JOB_PROCESS_POOL_SIZE,
+                                        mp_context=multiprocessing.get_context("spawn"))
+    return _pool.map(funcao, partes)
+
+
+def encerrar_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+class ContextoJob:
+    """Progresso e cancelamento de um job em execução."""
+
+    def __init__(self, job_id: int, session_factory=SessionLocal):
+        self.job_id = job_id
+        self._session_factory = session_factory
+        self._ultima_gravacao = 0.0
+
+    def progresso(self, feito: int, total: Optional[int] = None, forcar: bool = False) -> None:
+        """
+        Registra o progresso (no máximo a cada meio segundo) e verifica o cancelamento.
+
+        Usa uma sessão própria: o progresso fica visível mesmo com a
+        transação de trabalho do job ainda aberta.
+
+        Raises:
+            JobCancelado: Se o cancelamento do job foi pedido
+        """
+        agora = time.monotonic()
+        if not forcar and agora - self._ultima_gravacao < _INTERVALO_PROGRESSO:
+            return
+        self._ultima_gravacao = agora
+        valores = {"progresso": feito, "heartbeat": datetime.now(timezone.utc)}
+        if total is not None:
+            valores["total"] = total
+        with self._session_factory() as db:
+            db.execute(update(Job).where(Job.id == self.job_id).values(**valores))
+            cancelar = db.scalar(select(Job.cancelar).where(Job.id == self.job_id))
+            db.commit()
+        if cancelar:
+            raise JobCancelado()
+
+
+def enfileirar(db: Session, tipo: str, parametros: Dict[str, Any], usuario_id: int) -> Job:
+    """
+    Cria um job pendente; o commit fica com quem chama.
+
+    Raises:
+        ValueError: Se o tipo não tiver tarefa registrada
+    """
+    if tipo not in TAREFAS:
+        raise ValueError(f"Tipo de job desconhecido: {tipo}")
+    job = Job(tipo=tipo, parametros=parametros, usuario_id=usuario_id, status=JobStatusEnum.PENDENTE)
+    db.add(job)
+    db.flush()
+    return job
+
+
+def cancelar(db: Session, job: Job) -> None:
+    """
+    Pede o cancelamento; um job ainda pendente é cancelado na hora.
+
+    O UPDATE condicional não sobrescreve um job reservado por um worker no
+    mesmo instante: esse recebe só o pedido e para na próxima atualização de
+    progresso. O commit fica com quem chama.
+    """
+    db.execute(
+        update(Job)
+        .where(Job.id == job.id, Job.status == JobStatusEnum.PENDENTE)
+        .values(status=JobStatusEnum.CANCELADO, data_fim=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(update(Job).where(Job.id == job.id).values(cancelar=True).execution_options(synchronize_session=False))
+    db.refresh(job)
+
+
+class JobRunner:
+    """Threads que reservam e executam os jobs da fila, com heartbeat dos jobs em andamento."""
+
+    def __init__(self, threads: int, poll_interval: float, lease_seconds: int, session_factory=SessionLocal):
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.nome = f"{socket.gethostname()}:{os.getpid()}"
+        self._session_factory = session_factory
+        self._stop = Event()
+        self._acordar = Event()
+        self._em_execucao: set = set()
+        self._lock = Lock()
+        self._threads: List[Thread] = []
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        self._threads = [Thread(target=self._loop, name=f"job-{i}", daemon=True) for i in range(self.threads)]
+        self._threads.append(Thread(target=self._batimentos, name="job-heartbeat", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._acordar.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def acordar(self) -> None:
+        """Avisa que há job novo, sem esperar o próximo poll."""
+        self._acordar.set()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job_id = self.reservar()
+            except Exception:
+                logger.exception("Falha ao reservar job")
+                job_id = None
+            if job_id is None:
+                self._acordar.wait(self.poll_interval)
+                self._acordar.clear()
+                continue
+            self.executar(job_id)
+
+    def reservar(self) -> Optional[int]:
+        """
+        Reserva o job pendente mais antigo para este processo.
+
+        Antes devolve à fila os jobs cujo heartbeat venceu (processo morto).
+
+        Returns:
+            Optional[int]: Id do job reservado, ou None se a fila estiver vazia
+        """
+        agora = datetime.now(timezone.utc)
+        with self._session_factory() as db:
+            db.execute(
+                update(Job)
+                .where(Job.status == JobStatusEnum.EXECUTANDO,
+                       Job.heartbeat < agora - timedelta(seconds=self.lease_seconds))
+                .values(status=JobStatusEnum.PENDENTE, trabalhador=None)
+            )
+            db.commit()
+            for job_id in db.scalars(
+                select(Job.id).where(Job.status == JobStatusEnum.PENDENTE).order_by(Job.id).limit(self.threads)
+            ).all():
+                # Só um processo passa o job de pendente para executando
+                reservado = db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == JobStatusEnum.PENDENTE)
+                    .values(status=JobStatusEnum.EXECUTANDO, trabalhador=self.nome, data_inicio=agora,
+                            heartbeat=agora)
+                ).rowcount
+                db.commit()
+                if reservado:
+                    return job_id
+        return None
+
+    def executar(self, job_id: int) -> None:
+        """Executa um job já reservado e grava o resultado, a falha ou o cancelamento."""
+        with self._session_factory() as db:
+            job = db.get(Job, job_id)
+            tipo, parametros, usuario_id = job.tipo, job.parametros, job.usuario_id
+
+        with self._lock:
+            self._em_execucao.add(job_id)
+        valores: Dict[str, Any] = {}
+        inicio = time.perf_counter()
+        try:
+            resultado = TAREFAS[tipo](ContextoJob(job_id, self._session_factory), parametros, usuario_id)
+            valores = {"status": JobStatusEnum.CONCLUIDO, "resultado": resultado}
+        except JobCancelado:
+            valores = {"status": JobStatusEnum.CANCELADO}
+        except Exception as exc:
+            logger.exception("Falha no job", extra={"job_id": job_id, "tipo": tipo})
+            valores = {"status": JobStatusEnum.FALHOU, "erro": str(exc)[:1000] or type(exc).__name__}
+        finally:
+            with self._lock:
+                self._em_execucao.discard(job_id)
+            with self._session_factory() as db:
+                db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.trabalhador == self.nome)
+                    .values(data_fim=datetime.now(timezone.utc), **valores)
+                )
+                db.commit()
+        logger.info("Job finalizado", extra={"job_id": job_id, "tipo": tipo, "status": valores.get("status"),
+                                              "segundos": round(time.perf_counter() - inicio, 3)})
+
+    def _batimentos(self) -> None:
+        """Renova o heartbeat dos jobs em execução, inclusive durante etapas longas sem progresso."""
+        while not self._stop.wait(max(1.0, self.lease_seconds / 3)):
+            with self._lock:
+                ids = list(self._em_execucao)
+            if not ids:
+                continue
+            try:
+                with self._session_factory() as db:
+                    db.execute(
+                        update(Job)
+                        .where(Job.id.in_(ids), Job.trabalhador == self.nome)
+                        .values(heartbeat=datetime.now(timezone.utc))
+                    )
+                    db.commit()
+            except Exception:
+                logger.exception("Falha ao renovar o heartbeat dos jobs")
+
+
+runner = JobRunner(settings.JOB_THREADS, settings.JOB_POLL_INTERVAL, settings.JOB_LEASE_SECONDS)
+
+
+def setup_jobs(app):
+    """Inicia e encerra as threads de jobs junto com a aplicação, se JOBS_ENABLED."""
+
+    @app.on_event("startup")
+    async def start_jobs():
+        if settings.JOBS_ENABLED:
+            runner.start()
+
+    @app.on_event("shutdown")
+    async def stop_jobs():
+        runner.stop()
+        encerrar_pool()
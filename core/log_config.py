@@ -0,0 +1,152 @@
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Tuple
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+
+from config.settings import settings
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler que nunca bloqueia nem formata tracebacks na thread da requisição.
+
+    A mensagem é montada aqui (barato), mas o traceback fica para a thread do
+    QueueListener. Com a fila cheia o registro é descartado e contado.
+    """
+
+    def __init__(self, log_queue: queue.Queue, freeze_message: bool = True):
+        super().__init__(log_queue)
+        self.freeze_message = freeze_message
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Congela a mensagem, pois os argumentos podem mudar antes do consumo.
+        # Formatadores que leem record.args (ex.: log de acesso do uvicorn) usam freeze_message=False
+        if self.freeze_message:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class ClientErrorSamplingFilter(logging.Filter):
+    """
+    Amostra avisos de erros 4xx repetidos.
+
+    Por janela de `window` segundos, cada combinação (mensagem, status, rota) tem
+    os primeiros `burst` registros aceitos e, depois, um a cada `rate`. Os
+    registros aceitos após a rajada levam `sampled_out` com quantos foram omitidos.
+    """
+
+    def __init__(self, burst: int, rate: int, window: float):
+        super().__init__()
+        self.burst = burst
+        self.rate = max(1, rate)
+        self.window = window
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple, list] = {}
+        self._window_start = time.monotonic()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        status_code = getattr(record, "status_code", None)
+        if record.levelno != logging.WARNING or status_code is None or not 400 <= status_code < 500:
+            return True
+
+        key = (record.msg, status_code, getattr(record, "path", None))
+        with self._lock:
+            agora = time.monotonic()
+            if agora - self._window_start >= self.window:
+                self._counters.clear()
+                self._window_start = agora
+            counter = self._counters.setdefault(key, [0, 0])
+            counter[0] += 1
+            if counter[0] <= self.burst:
+                return True
+            if (counter[0] - self.burst) % self.rate:
+                counter[1] += 1
+                return False
+            record.sampled_out = counter[1]
+            counter[1] = 0
+            return True
+
+
+# Atributos padrão do LogRecord; o restante veio de `extra=` e vai para o JSON
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formata cada registro como uma linha JSON, incluindo os campos de `extra=`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        payload.update({
+            chave: valor for chave, valor in vars(record).items() if chave not in _RECORD_ATTRS
+        })
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+_listeners: List[QueueListener] = []
+
+
+def _start_listener(handlers: List[logging.Handler]) -> queue.Queue:
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    _listeners.append(listener)
+    return log_queue
+
+
+def setup_logging() -> None:
+    """
+    Direciona todo o logging para uma fila drenada por uma thread em segundo plano.
+
+    O handler de saída (stderr) e a formatação rodam na thread do QueueListener;
+    o event loop apenas enfileira. Chamadas repetidas não têm efeito.
+    """
+    if _listeners:
+        return
+
+    output = logging.StreamHandler(sys.stderr)
+    if settings.LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    queue_handler = NonBlockingQueueHandler(_start_listener([output]))
+    queue_handler.addFilter(ClientErrorSamplingFilter(
+        settings.LOG_SAMPLE_BURST, settings.LOG_SAMPLE_RATE, settings.LOG_SAMPLE_WINDOW
+    ))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(settings.LOG_LEVEL)
+
+    # Loggers do uvicorn têm handlers próprios e não propagam: passam a escrever
+    # pela fila também, mantendo seus formatadores na thread do listener
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logger = logging.getLogger(name)
+        if logger.handlers:
+            handlers = list(logger.handlers)
+            for handler in handlers:
+                logger.removeHandler(handler)
+            logger.addHandler(NonBlockingQueueHandler(_start_listener(handlers), freeze_message=False))
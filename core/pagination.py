@@ -1,10 +1,10 @@
+from functools import lru_cache
 from typing import Generic, TypeVar, List, Optional
-from pydantic.generics import GenericModel
-from pydantic import Field
+from pydantic import BaseModel, Field, TypeAdapter
 
 T = TypeVar('T')
 
-class PaginatedResponse(GenericModel, Generic[T]):
+class PaginatedResponse(BaseModel, Generic[T]):
     """
     Modelo genérico para respostas paginadas.
     
@@ -47,6 +47,16 @@ class PaginationParams:
         """Retorna o limite de itens por página."""
         return self.size
 
+@lru_cache(maxsize=None)
+def list_adapter(schema) -> TypeAdapter:
+    """
+    Retorna (e mantém em cache) o TypeAdapter de List[schema].
+
+    Construir o validador é caro; reutilizá-lo permite validar e serializar
+    listas inteiras em uma única chamada ao núcleo do Pydantic.
+    """
+    return TypeAdapter(List[schema])
+
 def paginate(query, pagination: PaginationParams, schema):
     """
     Aplica paginação a uma consulta SQLAlchemy e retorna os resultados paginados.
@@ -62,8 +72,8 @@ def paginate(query, pagination: PaginationParams, schema):
     total = query.count()
     items = query.offset(pagination.offset).limit(pagination.limit).all()
     
-    return PaginatedResponse(
-        items=[schema.from_orm(item) for item in items],
+    return PaginatedResponse[schema](
+        items=list_adapter(schema).validate_python(items, from_attributes=True),
         total=total,
         page=pagination.page,
         size=pagination.size,
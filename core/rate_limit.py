@@ -0,0 +1,120 @@
+from collections import OrderedDict
+from typing import Optional, Tuple
+import math
+import time
+
+from fastapi import Request
+from jose import JWTError, jwt
+
+from config.settings import settings
+from core.exceptions import ServiceUnavailableError, TooManyRequestsError
+
+
+class TokenBucketLimiter:
+    """
+    Limitador token bucket em memória, com um balde por (rota, cliente).
+
+    Cada balde recebe `rate` fichas por segundo até o limite `burst`. Os baldes
+    ficam em um OrderedDict usado como LRU, limitado a `max_keys` entradas.
+    Não usa trava: é chamado apenas do event loop.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Tuple[str, str], list]" = OrderedDict()
+
+    def acquire(self, key: Tuple[str, str], rate: float, burst: int) -> float:
+        """
+        Consome uma ficha do balde.
+
+        Args:
+            key: Rota e identificação do cliente
+            rate: Fichas repostas por segundo
+            burst: Capacidade máxima do balde
+
+        Returns:
+            float: 0 se a requisição foi aceita, senão os segundos até haver ficha
+        """
+        agora = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(burst), agora]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(float(burst), bucket[0] + (agora - bucket[1]) * rate)
+            bucket[1] = agora
+
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0.0
+        return (1.0 - bucket[0]) / rate
+
+
+limiter = TokenBucketLimiter(settings.RATE_LIMIT_MAX_KEYS)
+
+# Requisições em andamento neste worker (alterado apenas no event loop)
+_in_flight = 0
+
+
+def client_identity(request: Request) -> str:
+    """
+    Identifica o cliente pelo `sub` do JWT ou, sem token válido, pelo IP.
+
+    Args:
+        request: Requisição atual
+
+    Returns:
+        str: Identificador do cliente
+    """
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            subject: Optional[str] = payload.get("sub")
+            if subject:
+                return f"user:{subject}"
+        except JWTError:
+            pass
+    return f"ip:{request.client.host if request.client else 'desconhecido'}"
+
+
+async def rate_limit(request: Request):
+    """
+    Dependência que aplica o limite de concorrência e o token bucket da rota.
+
+    Raises:
+        ServiceUnavailableError: Se o worker já atende MAX_CONCURRENT_REQUESTS
+        TooManyRequestsError: Se o cliente esgotou o orçamento da rota
+    """
+    global _in_flight
+
+    # A dependência pode estar na aplicação e no router; conta uma vez só
+    if getattr(request.state, "rate_limited", False):
+        yield
+        return
+    request.state.rate_limited = True
+
+    route = request.scope.get("route")
+    route_key = f"{request.method} {getattr(route, 'path', request.url.path)}"
+
+    if _in_flight >= settings.MAX_CONCURRENT_REQUESTS and route_key not in settings.LONG_LIVED_ROUTES:
+        raise ServiceUnavailableError(retry_after=settings.LOAD_SHED_RETRY_AFTER)
+    rate, burst = settings.RATE_LIMITS.get(route_key, settings.RATE_LIMIT_DEFAULT)
+
+    wait = limiter.acquire((route_key, client_identity(request)), rate, burst)
+    if wait > 0:
+        raise TooManyRequestsError(retry_after=math.ceil(wait))
+
+    if route_key in settings.LONG_LIVED_ROUTES:
+        yield
+        return
+
+    _in_flight += 1
+    try:
+        yield
+    finally:
+        _in_flight -= 1
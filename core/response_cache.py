@@ -0,0 +1,204 @@
+"""
+Cache, por worker, das respostas já serializadas das listagens.
+
+Entre duas escritas as listagens recebem muitas requisições idênticas. O
+middleware guarda o corpo JSON já codificado de cada resposta 200, com a
+chave rota + query normalizada + escopo do usuário, junto com as gerações
+dos tópicos do barramento de invalidação de que a rota depende. As escritas
+já publicam esses tópicos; se alguma geração mudou, a entrada é descartada.
+Um acerto é respondido antes do roteamento: sem sessão, sem consulta e sem
+serialização.
+
+Escopos (RESPONSE_CACHE_ROUTES):
+    usuario  uma entrada por usuário do token (listagens filtradas pelo dono)
+    papel    uma entrada por papel (ex.: admin)
+    publico  uma entrada para todos
+"""
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+import math
+import time
+
+from fastapi import Request
+from jose import JWTError
+
+from config.settings import settings
+from core.auth import ACCESS, decode_token
+from core.exceptions import TooManyRequestsError, app_error_response
+from core.invalidation import invalidation_bus
+from core.rate_limit import client_identity, limiter
+from database import replica_engines
+
+USUARIO = "usuario"
+PAPEL = "papel"
+PUBLICO = "publico"
+
+# Cabeçalhos da resposta original que são repetidos no acerto
+_KEPT_HEADERS = {b"content-type", b"content-length"}
+
+
+class _Entry:
+    __slots__ = ("generations", "headers", "body")
+
+    def __init__(self, generations: tuple, headers: List[Tuple[bytes, bytes]], body: bytes):
+        self.generations = generations
+        self.headers = headers
+        self.body = body
+
+
+class ResponseCache:
+    """
+    LRU limitado pelo total de bytes dos corpos guardados.
+
+    Cada chave guarda apenas a versão mais recente; uma entrada com geração
+    antiga é substituída no próximo acesso. Acessado apenas pelo event loop,
+    portanto sem trava.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        # Momento em que cada geração foi vista pela primeira vez (ver `storable`)
+        self._seen: Dict[str, Tuple[int, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple, generations: tuple) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None or entry.generations != generations:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: tuple, generations: tuple, headers: List[Tuple[bytes, bytes]], body: bytes) -> None:
+        if len(body) > self.max_entry_bytes:
+            return
+        self.discard(key)
+        self._entries[key] = _Entry(generations, headers, body)
+        self.bytes += len(body)
+        while self.bytes > self.max_bytes:
+            _, antiga = self._entries.popitem(last=False)
+            self.bytes -= len(antiga.body)
+
+    def discard(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= len(entry.body)
+
+    def storable(self, topics: Tuple[str, ...], generations: tuple) -> bool:
+        """
+        Indica se uma resposta lida nestas gerações pode ser guardada.
+
+        Com réplicas, logo após uma escrita a leitura pode ter vindo de uma
+        réplica atrasada; guardá-la sob a geração nova a manteria até a próxima
+        escrita. Por isso, durante DB_READ_AFTER_WRITE_SECONDS depois de uma
+        geração mudar, as respostas não são guardadas.
+        """
+        if not replica_engines:
+            return True
+        agora = time.monotonic()
+        storable = True
+        for topic, generation in zip(topics, generations):
+            seen = self._seen.get(topic)
+            if seen is None or seen[0] != generation:
+                self._seen[topic] = seen = (generation, agora)
+            storable = storable and agora - seen[1] >= settings.DB_READ_AFTER_WRITE_SECONDS
+        return storable
+
+    def stats(self) -> dict:
+        return {"entradas": len(self._entries), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                "acertos": self.hits, "faltas": self.misses}
+
+
+cache = ResponseCache(settings.RESPONSE_CACHE_MAX_BYTES, settings.RESPONSE_CACHE_MAX_ENTRY_BYTES)
+
+
+def _scope(request: Request, escopo: str) -> Optional[tuple]:
+    """Escopo da chave; None quando o token é inválido (a aplicação responde 401)."""
+    if escopo == PUBLICO:
+        return ()
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = decode_token(token, ACCESS)
+    except JWTError:
+        return None
+    return (payload["uid"],) if escopo == USUARIO else (payload.get("role"),)
+
+
+class ResponseCacheMiddleware:
+    """
+    Responde as rotas de RESPONSE_CACHE_ROUTES a partir do cache.
+
+    Nos acertos o token bucket da rota continua sendo aplicado; o limite de
+    concorrência não, já que o acerto não ocupa o worker.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        route_key = f'{scope["method"]} {scope["path"]}' if scope["type"] == "http" else None
+        route = settings.RESPONSE_CACHE_ROUTES.get(route_key)
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        topics, escopo = tuple(route[0]), route[1]
+        request = Request(scope, receive)
+        user_scope = _scope(request, escopo)
+        if user_scope is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Ordena pelo nome do parâmetro; valores repetidos mantêm a ordem original
+        query = tuple(sorted(parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True),
+                             key=lambda item: item[0]))
+        key = (route_key, query, user_scope)
+        # Lidas antes de executar a rota: uma escrita concorrente invalida o que for guardado
+        generations = tuple(invalidation_bus.generation(topic) for topic in topics)
+
+        entry = cache.get(key, generations)
+        if entry is not None:
+            rate, burst = settings.RATE_LIMITS.get(route_key, settings.RATE_LIMIT_DEFAULT)
+            wait = limiter.acquire((route_key, client_identity(request)), rate, burst)
+            if wait > 0:
+                await app_error_response(TooManyRequestsError(retry_after=math.ceil(wait)))(scope, receive, send)
+                return
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": entry.headers + [(b"x-cache", b"hit")]})
+            await send({"type": "http.response.body", "body": entry.body})
+            return
+
+        response_status = 0
+        response_headers: List[Tuple[bytes, bytes]] = []
+        response_body = bytearray()
+        cacheable = True
+
+        async def capture_send(message):
+            nonlocal response_status, response_headers, cacheable
+            if message["type"] == "http.response.start":
+                response_status = message["status"]
+                headers = message.get("headers", [])
+                cacheable = not any(name.lower() == b"set-cookie" for name, _ in headers)
+                response_headers = [(name, value) for name, value in headers if name.lower() in _KEPT_HEADERS]
+                message = {**message, "headers": list(headers) + [(b"x-cache", b"miss")]}
+            elif message["type"] == "http.response.body" and cacheable:
+                response_body.extend(message.get("body", b""))
+                cacheable = len(response_body) <= cache.max_entry_bytes
+            await send(message)
+
+        await self.app(scope, receive, capture_send)
+
+        if response_status == 200 and cacheable and cache.storable(topics, generations):
+            cache.put(key, generations, response_headers, bytes(response_body))
@@ -0,0 +1,229 @@
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from core.invalidation import OBRIGACOES_ACESSORIAS, invalidation_bus
+from models import ObrigacaoAcessoria, PeriodicidadeEnum, ResumoObrigacoes
+
+TOTAL = "total"
+PERIODICIDADE = "periodicidade"
+EMPRESA = "empresa"
+VENCIMENTO = "vencimento"
+SEM_VENCIMENTO = "sem_vencimento"
+
+Chave = Tuple[str, str]
+
+def _periodicidade(valor) -> str:
+    """Normaliza a periodicidade (membro, nome ou valor do enum) para o nome do enum."""
+    if isinstance(valor, PeriodicidadeEnum):
+        return valor.name
+    if valor in PeriodicidadeEnum.__members__:
+        return valor
+    return PeriodicidadeEnum(valor).name
+
+def _dia(valor) -> Optional[str]:
+    """
+    Converte a data de vencimento (datetime, date ou texto) para o dia em UTC (YYYY-MM-DD).
+
+    Datetimes sem fuso (como os lidos do SQLite) são tratados como UTC. Todos
+    os caminhos do resumo (contagem e desconto) passam por aqui, para que a
+    mesma obrigação caia sempre no mesmo dia.
+    """
+    if valor is None:
+        return None
+    if isinstance(valor, str):
+        try:
+            valor = datetime.fromisoformat(valor)
+        except ValueError:
+            return valor[:10]
+    if isinstance(valor, datetime):
+        if valor.tzinfo is not None:
+            valor = valor.astimezone(timezone.utc)
+        return valor.date().isoformat()
+    return valor.isoformat()
+
+def chaves_obrigacao(periodicidade, empresa_id: int, data_vencimento) -> Iterable[Chave]:
+    """Retorna as linhas do resumo afetadas por uma obrigação."""
+    dia = _dia(data_vencimento)
+    return (
+        (TOTAL, "*"),
+        (PERIODICIDADE, _periodicidade(periodicidade)),
+        (EMPRESA, str(empresa_id)),
+        (VENCIMENTO, dia) if dia else (SEM_VENCIMENTO, "*"),
+    )
+
+def aplicar_deltas(db: Session, deltas: Dict[Chave, int]) -> None:
+    """
+    Soma os deltas às linhas do resumo com INSERT ... ON CONFLICT DO UPDATE.
+
+    Args:
+        db: Sessão do banco de dados (a mesma transação da escrita)
+        deltas: Variação por (dimensao, chave)
+    """
+    deltas = {chave: delta for chave, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(ResumoObrigacoes).values([
+        {"dimensao": dimensao, "chave": chave, "total": delta}
+        for (dimensao, chave), delta in sorted(deltas.items())
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[ResumoObrigacoes.dimensao, ResumoObrigacoes.chave],
+        set_={"total": ResumoObrigacoes.total + stmt.excluded.total},
+    ))
+
+def registrar_obrigacao(db: Session, obrigacao: ObrigacaoAcessoria, delta: int) -> None:
+    """Conta (+1) ou desconta (-1) uma obrigação no resumo."""
+    aplicar_deltas(db, Counter({
+        chave: delta
+        for chave in chaves_obrigacao(obrigacao.periodicidade, obrigacao.empresa_id, obrigacao.data_vencimento)
+    }))
+
+def _contagens(db: Session, *filtros):
+    """
+    Obrigações que atendem aos filtros, agrupadas por empresa, periodicidade e vencimento.
+
+    O agrupamento é pelo vencimento completo, e não por func.date(): o dia
+    depende do fuso da sessão no banco, e aqui ele é calculado por _dia, como
+    na contagem feita pelas escritas.
+    """
+    return db.execute(
+        select(ObrigacaoAcessoria.empresa_id, ObrigacaoAcessoria.periodicidade,
+               ObrigacaoAcessoria.data_vencimento, func.count())
+        .where(*filtros)
+        .group_by(ObrigacaoAcessoria.empresa_id, ObrigacaoAcessoria.periodicidade,
+                  ObrigacaoAcessoria.data_vencimento)
+    ).all()
+
+def descontar_obrigacoes(db: Session, *filtros) -> None:
+    """
+    Desconta do resumo as obrigações que atendem aos filtros, sem carregá-las.
+
+    Deve ser chamada antes de removê-las de obrigacoes_acessorias.
+
+    Args:
+        db: Sessão do banco de dados
+        filtros: Critérios sobre ObrigacaoAcessoria
+    """
+    deltas: Counter = Counter()
+    for empresa_id, periodicidade, vencimento, quantidade in _contagens(db, *filtros):
+        for chave in chaves_obrigacao(periodicidade, empresa_id, vencimento):
+            deltas[chave] -= quantidade
+    aplicar_deltas(db, deltas)
+
+def descontar_empresas(db: Session, *filtros) -> None:
+    """
+    Desconta do resumo as obrigações das empresas que serão excluídas.
+
+    O GROUP BY percorre apenas as obrigações dessas empresas; deve ser chamada
+    antes do DELETE.
+
+    Args:
+        db: Sessão do banco de dados
+        filtros: Critérios sobre ObrigacaoAcessoria (ex.: empresa_id IN ...)
+    """
+    deltas: Counter = Counter()
+    empresas = set()
+    for empresa_id, periodicidade, vencimento, quantidade in _contagens(db, *filtros):
+        empresas.add(str(empresa_id))
+        for chave in chaves_obrigacao(periodicidade, empresa_id, vencimento):
+            deltas[chave] -= quantidade
+    # As linhas das empresas excluídas são removidas em vez de zeradas
+    for chave in list(deltas):
+        if chave[0] == EMPRESA:
+            del deltas[chave]
+    aplicar_deltas(db, deltas)
+    if empresas:
+        db.execute(delete(ResumoObrigacoes).where(
+            ResumoObrigacoes.dimensao == EMPRESA, ResumoObrigacoes.chave.in_(empresas)
+        ))
+
+def reconstruir_resumo(db: Session) -> int:
+    """
+    Recalcula o resumo inteiro a partir de obrigacoes_acessorias (GROUP BY completo).
+
+    Args:
+        db: Sessão do banco de dados
+
+    Returns:
+        int: Número de linhas gravadas no resumo
+    """
+    db.execute(delete(ResumoObrigacoes))
+
+    totais: Counter = Counter()
+    for empresa_id, periodicidade, vencimento, quantidade in _contagens(db):
+        for chave in chaves_obrigacao(periodicidade, empresa_id, vencimento):
+            totais[chave] += quantidade
+    aplicar_deltas(db, totais)
+    return len(totais)
+
+# Resposta global em cache, válida enquanto não houver escrita nem virada do dia
+_cache: Dict[str, Any] = {"chave": None, "resumo": None}
+
+def obter_resumo(db: Session, empresa_id: Optional[int] = None, geral: bool = True) -> Dict[str, Any]:
+    """
+    Monta o resumo do dashboard a partir da tabela de contadores.
+
+    Lê no máximo uma linha por periodicidade e uma por dia de vencimento; a
+    resposta fica em memória até a próxima escrita em obrigações.
+
+    Args:
+        db: Sessão do banco de dados
+        empresa_id: Empresa cujo total deve ser incluído (opcional)
+        geral: Incluir os totais de todas as obrigações; sem eles, apenas o da empresa
+
+    Returns:
+        Dict[str, Any]: Totais por periodicidade, vencidas, a vencer e sem vencimento
+    """
+    if not geral:
+        return {"empresa": _total_empresa(db, empresa_id)}
+
+    hoje = datetime.now(timezone.utc).date().isoformat()
+    chave_cache = (invalidation_bus.generation(OBRIGACOES_ACESSORIAS), hoje)
+
+    resumo = _cache["resumo"] if _cache["chave"] == chave_cache else None
+    if resumo is None:
+        linhas = db.execute(
+            select(ResumoObrigacoes.dimensao, ResumoObrigacoes.chave, ResumoObrigacoes.total)
+            .where(ResumoObrigacoes.dimensao != EMPRESA)
+        ).all()
+
+        por_periodicidade = {nome: 0 for nome in PeriodicidadeEnum.__members__}
+        total = vencidas = a_vencer = sem_vencimento = 0
+        for dimensao, chave, quantidade in linhas:
+            if dimensao == TOTAL:
+                total = quantidade
+            elif dimensao == PERIODICIDADE:
+                por_periodicidade[chave] = quantidade
+            elif dimensao == SEM_VENCIMENTO:
+                sem_vencimento = quantidade
+            elif chave < hoje:
+                vencidas += quantidade
+            else:
+                a_vencer += quantidade
+
+        resumo = {
+            "total": total,
+            "por_periodicidade": {
+                PeriodicidadeEnum[nome].value: quantidade for nome, quantidade in por_periodicidade.items()
+            },
+            "vencidas": vencidas,
+            "a_vencer": a_vencer,
+            "sem_vencimento": sem_vencimento,
+        }
+        _cache["chave"], _cache["resumo"] = chave_cache, resumo
+
+    if empresa_id is None:
+        return resumo
+
+    return {**resumo, "empresa": _total_empresa(db, empresa_id)}
+
+def _total_empresa(db: Session, empresa_id: int) -> Dict[str, int]:
+    linha = db.get(ResumoObrigacoes, (EMPRESA, str(empresa_id)))
+    return {"id": empresa_id, "total": linha.total if linha else 0}
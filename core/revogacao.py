@@ -0,0 +1,207 @@
+"""
+Lista de tokens revogados mantida em memória por cada worker.
+
+Os tokens de acesso duram minutos e são validados sem consultar o banco:
+`get_current_user` pergunta a `lista_revogacao` se o token foi revogado. A
+lista combina um filtro de Bloom, que responde "não" para quase todos os
+tokens com alguns acessos a um bytearray, com um dicionário exato que
+confirma os "talvez". As revogações ficam na tabela tokens_revogados; quem
+revoga publica TOKENS_REVOGADOS no barramento de invalidação e cada worker
+carrega apenas as linhas novas, em segundo plano.
+
+Chaves:
+    jti:<id>      um token (logout, refresh token já usado)
+    usuario:<id>  todos os tokens do usuário emitidos até a revogação (desativação)
+"""
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Dict, Optional, Tuple
+import hashlib
+import logging
+import math
+import struct
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from core.invalidation import TOKENS_REVOGADOS, invalidation_bus
+from database import SessionLocal
+from models import TokenRevogado
+
+logger = logging.getLogger(__name__)
+
+
+class FiltroBloom:
+    """
+    Filtro de Bloom com `k` posições derivadas de um único hash (duplo hashing).
+
+    Não tem falsos negativos; a taxa de falsos positivos fica perto de
+    `taxa_falsos_positivos` enquanto houver até `capacidade` chaves.
+    """
+
+    def __init__(self, capacidade: int, taxa_falsos_positivos: float):
+        capacidade = max(capacidade, 1)
+        self.capacidade = capacidade
+        self._bits_total = max(8, math.ceil(-capacidade * math.log(taxa_falsos_positivos) / math.log(2) ** 2))
+        self._hashes = max(1, round(self._bits_total / capacidade * math.log(2)))
+        self._bits = bytearray((self._bits_total + 7) // 8)
+
+    def _posicoes(self, chave: str):
+        h1, h2 = struct.unpack("<QQ", hashlib.blake2b(chave.encode(), digest_size=16).digest())
+        for i in range(self._hashes):
+            yield (h1 + i * h2) % self._bits_total
+
+    def adicionar(self, chave: str) -> None:
+        for posicao in self._posicoes(chave):
+            self._bits[posicao >> 3] |= 1 << (posicao & 7)
+
+    def __contains__(self, chave: str) -> bool:
+        return all(self._bits[posicao >> 3] & (1 << (posicao & 7)) for posicao in self._posicoes(chave))
+
+
+class ListaRevogacao:
+    """
+    Revogações vigentes: filtro de Bloom na frente de um dicionário exato.
+
+    O dicionário guarda, por chave, (revogado_em, expira_em) em segundos desde
+    a época. Entradas expiradas são descartadas nas cargas; o filtro é
+    reconstruído quando passa da capacidade ou quando acumula muitas chaves
+    que já saíram do dicionário.
+    """
+
+    def __init__(self, capacidade: int, taxa_falsos_positivos: float):
+        self._capacidade = capacidade
+        self._taxa = taxa_falsos_positivos
+        self._lock = Lock()
+        self._filtro = FiltroBloom(capacidade, taxa_falsos_positivos)
+        self._no_filtro = 0
+        self._entradas: Dict[str, Tuple[float, float]] = {}
+        self.ultimo_id = 0
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def revogado(self, jti: Optional[str], usuario_id: Optional[int], emitido_em: float) -> bool:
+        """
+        Indica se o token foi revogado, sem acessar o banco.
+
+        Args:
+            jti: Identificador do token
+            usuario_id: Dono do token
+            emitido_em: Claim iat do token
+        """
+        if jti is not None and self._consultar(f"jti:{jti}") is not None:
+            return True
+        if usuario_id is not None:
+            entrada = self._consultar(f"usuario:{usuario_id}")
+            # O iat tem resolução de segundos: um token emitido no mesmo segundo da revogação também cai
+            if entrada is not None and emitido_em <= entrada[0]:
+                return True
+        return False
+
+    def _consultar(self, chave: str) -> Optional[Tuple[float, float]]:
+        if chave not in self._filtro:
+            return None
+        entrada = self._entradas.get(chave)
+        if entrada is None or entrada[1] <= datetime.now(timezone.utc).timestamp():
+            return None
+        return entrada
+
+    def carregar(self, db: Session) -> int:
+        """
+        Acrescenta as revogações gravadas desde a última carga.
+
+        Returns:
+            int: Quantidade de revogações novas
+        """
+        with self._lock:
+            agora = datetime.now(timezone.utc)
+            linhas = db.execute(
+                select(TokenRevogado.id, TokenRevogado.chave, TokenRevogado.revogado_em, TokenRevogado.expira_em)
+                .where(TokenRevogado.id > self.ultimo_id, TokenRevogado.expira_em > agora)
+                .order_by(TokenRevogado.id)
+            ).all()
+
+            entradas = {
+                chave: revogacao
+                for chave, revogacao in self._entradas.items()
+                if revogacao[1] > agora.timestamp()
+            }
+            for id_, chave, revogado_em, expira_em in linhas:
+                anterior = entradas.get(chave, (0.0, 0.0))
+                entradas[chave] = (max(anterior[0], _timestamp(revogado_em)), max(anterior[1], _timestamp(expira_em)))
+                self.ultimo_id = max(self.ultimo_id, id_)
+
+            if self._no_filtro + len(linhas) > max(self._filtro.capacidade, 2 * len(entradas)):
+                # Cheio, ou com chaves expiradas demais: reconstrói com folga para crescer
+                self._filtro = FiltroBloom(max(self._capacidade, 2 * len(entradas)), self._taxa)
+                self._no_filtro = 0
+                novas = entradas
+            else:
+                novas = {linha[1]: None for linha in linhas}
+            for chave in novas:
+                self._filtro.adicionar(chave)
+            self._no_filtro += len(novas)
+            # Troca por referência: leitores sem trava veem o dicionário antigo ou o novo
+            self._entradas = entradas
+            return len(linhas)
+
+
+def _timestamp(valor: datetime) -> float:
+    # O SQLite devolve datas sem fuso; todas são gravadas em UTC
+    if valor.tzinfo is None:
+        valor = valor.replace(tzinfo=timezone.utc)
+    return valor.timestamp()
+
+
+lista_revogacao = ListaRevogacao(settings.TOKEN_REVOCATION_CAPACITY, settings.TOKEN_REVOCATION_FALSE_POSITIVE_RATE)
+
+
+def revogar(db: Session, chave: str, expira_em: datetime) -> None:
+    """
+    Grava uma revogação; o commit e a publicação de TOKENS_REVOGADOS ficam com quem chama.
+
+    Aproveita para apagar as revogações já expiradas (índice em expira_em).
+
+    Args:
+        db: Sessão do banco primário
+        chave: "jti:<id>" ou "usuario:<id>"
+        expira_em: Quando a revogação deixa de importar (expiração do token)
+    """
+    agora = datetime.now(timezone.utc)
+    db.execute(delete(TokenRevogado).where(TokenRevogado.expira_em <= agora))
+    db.add(TokenRevogado(chave=chave, revogado_em=agora, expira_em=expira_em))
+
+
+def revogar_token(db: Session, payload: dict) -> None:
+    """Revoga um token pelo jti, até a sua expiração."""
+    revogar(db, f"jti:{payload['jti']}", datetime.fromtimestamp(payload["exp"], timezone.utc))
+
+
+def revogar_usuario(db: Session, usuario_id: int) -> None:
+    """
+    Revoga todos os tokens já emitidos para o usuário (ao desativá-lo, por exemplo).
+
+    Vale pelo tempo de vida do refresh token, o mais longo dos dois.
+    """
+    expira_em = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    revogar(db, f"usuario:{usuario_id}", expira_em)
+
+
+def setup_revogacao(app):
+    """Carrega as revogações na inicialização e recarrega a cada publicação de TOKENS_REVOGADOS."""
+
+    def recarregar(topico: str = TOKENS_REVOGADOS) -> None:
+        try:
+            with SessionLocal() as db:
+                lista_revogacao.carregar(db)
+        except Exception:
+            logger.exception("Falha ao carregar os tokens revogados")
+
+    invalidation_bus.subscribe(TOKENS_REVOGADOS, recarregar)
+
+    @app.on_event("startup")
+    async def start_revogacao():
+        # Síncrono de propósito: nenhum token é aceito antes de a lista estar carregada
+        recarregar()
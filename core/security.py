@@ -1,78 +0,0 @@
-from datetime import datetime, timedelta
-from typing import Optional
-
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-
-from config.settings import settings
-
-# Configuração do contexto de criptografia
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# Configuração do esquema OAuth2 para autenticação via token
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """
-    Verifica se a senha fornecida corresponde ao hash armazenado.
-    """
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password: str) -> str:
-    """
-    Gera um hash para a senha fornecida.
-    """
-    return pwd_context.hash(password)
-
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-    """
-    Cria um token de acesso JWT.
-    """
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(
-        to_encode, 
-        settings.SECRET_KEY, 
-        algorithm=settings.ALGORITHM
-    )
-    return encoded_jwt
-
-def verify_token(token: str, credentials_exception):
-    """
-    Verifica se o token JWT é válido e retorna o payload.
-    """
-    try:
-        payload = jwt.decode(
-            token, 
-            settings.SECRET_KEY, 
-            algorithms=[settings.ALGORITHM]
-        )
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        return payload
-    except JWTError:
-        raise credentials_exception
-
-def get_current_user(token: str = Depends(oauth2_scheme)):
-    """
-    Retorna o usuário atual com base no token JWT.
-    """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Não foi possível validar as credenciais",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
-    payload = verify_token(token, credentials_exception)
-    username: str = payload.get("sub")
-    if username is None:
-        raise credentials_exception
-    return username
@@ -0,0 +1,78 @@
+"""
+Tarefas executadas como jobs (core.jobs).
+
+    importar_empresas  cria ou atualiza empresas pelo CNPJ, sem limite de MAX_UPSERT_LOTE
+    exportar           gera os arquivos Parquet/Arrow de core.exportacao
+
+Importado pela aplicação e por scripts/executar_jobs.py para registrar as tarefas.
+"""
+from typing import Any, Dict, List
+
+from config.settings import settings
+from core.exportacao import exportar
+from core.invalidation import EMPRESAS, invalidation_bus
+from core.jobs import ContextoJob, mapear_cpu, tarefa
+from core.upsert import upsert_empresas
+from database import SessionLocal, read_engine
+from validators import normalizar_cnpjs
+
+# CNPJs por parte enviada ao pool de processos
+PARTE_VALIDACAO = 10_000
+
+# Empresas por INSERT ... ON CONFLICT (e por transação) na importação
+LOTE_IMPORTACAO = 1000
+
+
+@tarefa("importar_empresas")
+def importar_empresas(ctx: ContextoJob, parametros: Dict[str, Any], usuario_id: int) -> Dict[str, Any]:
+    """
+    Valida os CNPJs no pool de processos e grava as empresas válidas em lotes.
+
+    Cada lote é uma transação: um job cancelado mantém os lotes já gravados.
+    Os CNPJs inválidos não interrompem a importação e voltam no resultado.
+    O progresso conta as empresas validadas e depois as gravadas (total = 2x).
+    """
+    empresas: List[Dict] = parametros["empresas"]
+    total = 2 * len(empresas)
+    ctx.progresso(0, total, forcar=True)
+
+    cnpjs = [empresa["cnpj"] for empresa in empresas]
+    partes = (cnpjs[inicio:inicio + PARTE_VALIDACAO] for inicio in range(0, len(cnpjs), PARTE_VALIDACAO))
+    validos: List[Dict] = []
+    invalidos: List[Dict] = []
+    posicao = 0
+    for normalizados in mapear_cpu(normalizar_cnpjs, partes):
+        for cnpj in normalizados:
+            if cnpj is None:
+                invalidos.append({"posicao": posicao, "cnpj": empresas[posicao]["cnpj"]})
+            else:
+                validos.append({**empresas[posicao], "cnpj": cnpj})
+            posicao += 1
+        ctx.progresso(posicao, total)
+
+    contagem = {"criadas": 0, "atualizadas": 0, "ignoradas": 0}
+    gravadas = 0
+    for inicio in range(0, len(validos), LOTE_IMPORTACAO):
+        lote = validos[inicio:inicio + LOTE_IMPORTACAO]
+        with SessionLocal() as db:
+            resultado = upsert_empresas(db, lote, usuario_id, validados=True)
+            db.commit()
+        invalidation_bus.publish(EMPRESAS)
+        for chave, quantidade in resultado.items():
+            contagem[chave] += quantidade
+        gravadas += len(lote)
+        ctx.progresso(len(empresas) + gravadas, total)
+
+    ctx.progresso(total, total, forcar=True)
+    return {**contagem, "invalidos": invalidos}
+
+
+@tarefa("exportar")
+def exportar_conjuntos(ctx: ContextoJob, parametros: Dict[str, Any], usuario_id: int) -> List[Dict]:
+    """Exporta os conjuntos lendo de uma réplica, se houver (ver read_engine); o progresso conta conjuntos."""
+    return exportar(
+        read_engine(),
+        formato=parametros.get("formato", "parquet"),
+        lote=parametros.get("lote") or settings.EXPORT_BATCH_SIZE,
+        progresso=lambda feito, total: ctx.progresso(feito, total, forcar=True),
+    )
@@ -0,0 +1,93 @@
+from typing import Dict, Iterable, List
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from core.change_log import reservar_feed
+from core.exceptions import ValidationError
+from models import Alteracao, Empresa, OperacaoEnum
+from validators import CNPJError, normalizar_cnpj
+
+# Colunas atualizadas quando o CNPJ já existe
+CAMPOS_ATUALIZADOS = ("nome", "endereco", "email", "telefone")
+
+def normalizar_registros(registros: Iterable[Dict], validar: bool = True) -> List[Dict]:
+    """
+    Normaliza o CNPJ de cada registro e remove as repetições (vale o último).
+
+    Um mesmo CNPJ duas vezes no mesmo INSERT ... ON CONFLICT é erro no PostgreSQL.
+    Com validar=False os CNPJs já chegam normalizados e só as repetições são removidas.
+
+    Raises:
+        ValidationError: Com a posição e o valor de cada CNPJ inválido
+    """
+    por_cnpj: Dict[str, Dict] = {}
+    invalidos = []
+    for posicao, registro in enumerate(registros):
+        if not validar:
+            por_cnpj.pop(registro["cnpj"], None)
+            por_cnpj[registro["cnpj"]] = registro
+            continue
+        try:
+            cnpj = normalizar_cnpj(registro["cnpj"])
+        except CNPJError:
+            invalidos.append({"posicao": posicao, "cnpj": registro["cnpj"]})
+            continue
+        por_cnpj.pop(cnpj, None)
+        por_cnpj[cnpj] = {**registro, "cnpj": cnpj}
+    if invalidos:
+        raise ValidationError("CNPJ inválido", details={"invalidos": invalidos})
+    return list(por_cnpj.values())
+
+def upsert_empresas(db: Session, registros: Iterable[Dict], usuario_id: int,
+                    validados: bool = False) -> Dict[str, int]:
+    """
+    Cria ou atualiza empresas pelo CNPJ com INSERT ... ON CONFLICT (cnpj) DO UPDATE.
+
+    Não há SELECT prévio nem corrida entre verificar e gravar. Empresas já
+    cadastradas por outro usuário não são alteradas e contam como ignoradas.
+    Criações e atualizações entram no feed de alterações na mesma transação;
+    o commit fica com quem chama.
+
+    Args:
+        db: Sessão do banco de dados
+        registros: Dicionários com nome, cnpj, endereco, email e telefone
+        usuario_id: Responsável pelas empresas criadas
+        validados: CNPJs já validados e normalizados (ex.: pelos jobs de importação)
+
+    Returns:
+        Dict[str, int]: Quantidades de criadas, atualizadas e ignoradas
+    """
+    linhas = [{**registro, "usuario_id": usuario_id} for registro in normalizar_registros(registros, not validados)]
+    if not linhas:
+        return {"criadas": 0, "atualizadas": 0, "ignoradas": 0}
+
+    dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(Empresa)
+    # data_atualizacao só é nula em linhas recém-inseridas: distingue criação de atualização
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Empresa.cnpj],
+        set_={
+            **{campo: getattr(stmt.excluded, campo) for campo in CAMPOS_ATUALIZADOS},
+            "data_atualizacao": func.now(),
+        },
+        where=Empresa.usuario_id == stmt.excluded.usuario_id,
+    ).returning(Empresa.id, Empresa.data_atualizacao)
+
+    # executemany com RETURNING: o SQLAlchemy agrupa as linhas em INSERTs de várias linhas
+    resultado = db.execute(stmt, linhas).all()
+
+    criadas = [empresa_id for empresa_id, atualizacao in resultado if atualizacao is None]
+    atualizadas = [empresa_id for empresa_id, atualizacao in resultado if atualizacao is not None]
+    if resultado:
+        reservar_feed(db)
+        db.execute(insert(Alteracao), [
+            {"tabela": Empresa.__tablename__, "registro_id": empresa_id, "operacao": operacao,
+             "usuario_id": usuario_id}
+            for ids, operacao in ((criadas, OperacaoEnum.CRIACAO), (atualizadas, OperacaoEnum.ATUALIZACAO))
+            for empresa_id in ids
+        ])
+
+    return {"criadas": len(criadas), "atualizadas": len(atualizadas), "ignoradas": len(linhas) - len(resultado)}
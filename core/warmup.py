@@ -0,0 +1,144 @@
+"""
+Aquecimento do worker na inicialização e sinal de prontidão.
+
+Logo após um deploy as primeiras requisições pagam custos que acontecem uma
+vez por processo: abrir as conexões do pool, compilar o SQL de cada consulta,
+carregar o backend do bcrypt e montar os serializadores do Pydantic. O
+aquecimento faz isso em segundo plano antes de o worker se declarar pronto;
+GET /health/ready responde 503 até lá, para o balanceador não mandar tráfego
+a um worker frio.
+"""
+from datetime import datetime, timezone
+from threading import Event
+from types import SimpleNamespace
+from typing import Callable, Iterable, List
+import asyncio
+import logging
+import time
+
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from core.consultas import AQUECIMENTO
+from database import engine, replica_engines, sqlite_reader_engine
+
+logger = logging.getLogger(__name__)
+
+_pronto = Event()
+
+
+def pronto() -> bool:
+    """Indica se o aquecimento terminou (ou está desativado)."""
+    return _pronto.is_set()
+
+
+def abrir_conexoes(db_engine) -> int:
+    """
+    Abre até pool_size conexões ao mesmo tempo e as devolve ao pool.
+
+    Returns:
+        int: Conexões abertas
+    """
+    tamanho = getattr(db_engine.pool, "size", lambda: 1)()
+    conexoes = []
+    try:
+        for _ in range(tamanho):
+            conexoes.append(db_engine.connect())
+    finally:
+        for conexao in conexoes:
+            conexao.close()
+    return len(conexoes)
+
+
+def compilar_consultas(db_engine, consultas: Iterable[Callable[[Session], object]] = ()) -> int:
+    """
+    Executa as consultas frequentes uma vez, populando o cache de compilação da engine.
+
+    Args:
+        db_engine: Engine a aquecer
+        consultas: Funções adicionais que recebem uma sessão e executam uma consulta
+
+    Returns:
+        int: Consultas executadas
+    """
+    total = 0
+    with Session(db_engine) as db:
+        for consulta, parametros in AQUECIMENTO:
+            db.scalars(consulta, parametros).first()
+            total += 1
+        for consulta in consultas:
+            consulta(db)
+            total += 1
+        db.rollback()
+    return total
+
+
+def aquecer_schemas() -> None:
+    """
+    Exercita a serialização das listagens e a verificação de senha.
+
+    Os endpoints de listagem respondem com EmpresaList e ObrigacaoAcessoriaList
+    (validate_python com from_attributes, depois dump_json); aqui o mesmo
+    caminho roda com um registro de cada, como se viesse do banco.
+    """
+    from core.auth import pwd_context
+    from models import PeriodicidadeEnum
+    from schemas.empresa import EmpresaList
+    from schemas.obrigacao_acessoria import ObrigacaoAcessoriaList
+
+    agora = datetime.now(timezone.utc)
+    empresa = SimpleNamespace(id=1, nome="Empresa", cnpj="11222333000181", endereco="Rua", email="a@a.com",
+                              telefone="11999998888", usuario_id=1, data_criacao=agora, data_atualizacao=None)
+    obrigacao = SimpleNamespace(id=1, nome="Obrigação", periodicidade=PeriodicidadeEnum.MENSAL, empresa_id=1,
+                                descricao=None, data_vencimento=agora, data_criacao=agora, data_atualizacao=None)
+    for adapter, item in ((EmpresaList, empresa), (ObrigacaoAcessoriaList, obrigacao)):
+        adapter.dump_json(adapter.validate_python([item], from_attributes=True))
+    # Carrega o backend do bcrypt, que de outra forma pesaria no primeiro login
+    pwd_context.dummy_verify()
+
+
+def aquecer(consultas: Iterable[Callable[[Session], object]] = ()) -> dict:
+    """
+    Executa todas as etapas do aquecimento e marca o worker como pronto.
+
+    Uma etapa que falha é registrada e não impede as demais: um worker
+    morno é melhor do que um worker que nunca fica pronto.
+
+    Returns:
+        dict: Duração de cada etapa, em milissegundos
+    """
+    consultas = list(consultas)
+    engines = (engine, *replica_engines, *([sqlite_reader_engine] if sqlite_reader_engine is not None else []))
+    etapas = {
+        "conexoes": lambda: [abrir_conexoes(e) for e in engines],
+        "consultas": lambda: [compilar_consultas(e, consultas) for e in engines],
+        "schemas": aquecer_schemas,
+    }
+    duracoes = {}
+    for nome, etapa in etapas.items():
+        inicio = time.perf_counter()
+        try:
+            etapa()
+        except Exception:
+            logger.exception("Falha no aquecimento", extra={"etapa": nome})
+        duracoes[nome] = round((time.perf_counter() - inicio) * 1000, 1)
+    _pronto.set()
+    logger.info("Worker aquecido", extra={"duracao_ms": duracoes})
+    return duracoes
+
+
+def setup_warmup(app, consultas: List[Callable[[Session], object]] = ()):
+    """
+    Aquece o worker em segundo plano na inicialização, se WARMUP_ENABLED.
+
+    Args:
+        app: Aplicação FastAPI
+        consultas: Consultas das listagens, montadas como nos endpoints
+    """
+
+    @app.on_event("startup")
+    async def start_warmup():
+        if not settings.WARMUP_ENABLED:
+            _pronto.set()
+            return
+        asyncio.get_running_loop().run_in_executor(None, aquecer, consultas)
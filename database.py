@@ -1,18 +1,65 @@
-from sqlalchemy import create_engine
+from itertools import cycle
+
+from fastapi import Request
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config.settings import settings
+from core.db_pool import engine_options, sqlite_tuned
+from core.db_routing import must_use_primary
+from core.db_sqlite import configurar_sqlite
+
+def _create_engine(url: str, leitura: bool = False):
+    """Cria uma engine com as opções de pool de settings e os ajustes do SQLite."""
+    nova_engine = create_engine(url, **engine_options(url, settings, leitura))
+
+    # O SQLite só aplica chaves estrangeiras (e portanto ON DELETE CASCADE)
+    # quando a pragma é ativada em cada conexão
+    if nova_engine.dialect.name == "sqlite":
+        @event.listens_for(nova_engine, "connect")
+        def _ativar_foreign_keys(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.close()
+
+        if sqlite_tuned(url, settings):
+            configurar_sqlite(nova_engine, settings, leitura)
+
+    return nova_engine
 
-# Cria a conexão com o banco de dados
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,  # Verifica a conexão antes de usá-la
-    pool_recycle=300,    # Recicla conexões após 5 minutos
+# Cria a conexão com o banco de dados (parâmetros de pool vêm de settings.DB_POOL_*)
+engine = _create_engine(settings.DATABASE_URL)
+
+# Réplicas de leitura (opcionais); sem réplica as leituras usam o primário
+replica_engines = [
+    _create_engine(url.strip())
+    for url in (settings.DATABASE_REPLICA_URL or "").split(",")
+    if url.strip()
+]
+
+# SQLite ajustado (SQLITE_TUNED): leitores somente leitura no mesmo arquivo,
+# em paralelo ao escritor único de `engine`
+sqlite_reader_engine = (
+    _create_engine(settings.DATABASE_URL, leitura=True)
+    if sqlite_tuned(settings.DATABASE_URL, settings) else None
 )
 
 # Sessão local para interação com o banco de dados
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Sessões somente leitura, distribuídas entre as réplicas em rodízio
+_replica_sessions = cycle([
+    sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    for replica_engine in replica_engines
+] or ([sessionmaker(autocommit=False, autoflush=False, bind=sqlite_reader_engine)]
+      if sqlite_reader_engine is not None else [SessionLocal]))
+
+def read_engine():
+    """Engine para leituras longas (ex.: exportações): réplica, leitores do SQLite ajustado ou o primário."""
+    if replica_engines:
+        return replica_engines[0]
+    return sqlite_reader_engine or engine
+
 # Classe base para os modelos
 Base = declarative_base()
 
@@ -27,4 +74,25 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db(request: Request):
+    """
+    Fornece uma sessão para endpoints somente leitura.
+
+    Usa uma réplica, exceto quando o cliente escreveu há pouco tempo
+    (ver core.db_routing), caso em que a leitura vai ao primário. Os
+    leitores do SQLite ajustado não têm atraso e são sempre usados.
+
+    Args:
+        request: Requisição atual
+
+    Yields:
+        Session: Sessão do banco de dados
+    """
+    session_factory = SessionLocal if replica_engines and must_use_primary(request) else next(_replica_sessions)
+    db = session_factory()
+    try:
+        yield db
+    finally:
+        db.close()
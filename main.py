@@ -1,13 +1,67 @@
-from typing import Annotated
+from datetime import datetime
+from typing import Annotated, List, Optional
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from starlette import status
-from pydantic import BaseModel, Field
-from fastapi import FastAPI, Depends, HTTPException, Path
+from pydantic import BaseModel, Field, field_validator
+from fastapi import FastAPI, Depends, HTTPException, Path, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 import models
-from models import Empresa, ObrigacaoAcessoria
-from database import engine, SessionLocal
+from config.settings import settings
+from models import (Empresa, Job, ObrigacaoAcessoria, ObrigacaoAcessoriaArquivada, OperacaoEnum,
+                    PeriodicidadeEnum, Usuario)
+from database import engine, SessionLocal, get_read_db
+from core.auth import get_current_active_superuser, get_current_active_user
+from core.catalogo import EmpresaView, como_dict, obter_catalogo, setup_catalogo
+from core.change_log import listar_alteracoes, registrar_alteracao, registrar_exclusoes
+from core.consultas import EMPRESA_POR_CNPJ, EMPRESA_POR_ID, OBRIGACAO_POR_ID
+from core.db_pool import pool_status
+from core.db_routing import setup_db_routing
+from core.due_alerts import event_stream, setup_due_alerts
+from core.exceptions import ConflictError, ValidationError, setup_exception_handlers
+from core.exportacao import FORMATOS, caminho_exportacao, ler_mapeado, listar_exportacoes
+from core.filtros import (ORDENAVEIS_EMPRESAS, ORDENAVEIS_OBRIGACOES, filtros_empresa, filtros_obrigacao,
+                          ordenacao)
+from core import group_commit
+from core.idempotency import IdempotencyMiddleware
+from core.log_config import setup_logging
+from core.jobs import cancelar, enfileirar, runner as job_runner, setup_jobs
+from core.invalidation import EMPRESAS, OBRIGACOES_ACESSORIAS, invalidation_bus, setup_invalidation
+from core.rate_limit import rate_limit
+from core.response_cache import ResponseCacheMiddleware, cache as response_cache
+from core.resumo import descontar_empresas, obter_resumo, registrar_obrigacao
+from core.revogacao import setup_revogacao
+from core.upsert import upsert_empresas
+from core.warmup import pronto, setup_warmup
+from routes import auth as auth_routes
+from schemas.auth import UserRole
+from schemas.empresa import EmpresaList
+from schemas.obrigacao_acessoria import ObrigacaoAcessoriaList
+from validators import normalizar_cnpj
+import core.tarefas  # registra as tarefas dos jobs
 
-app = FastAPI()
+setup_logging()
+
+app = FastAPI(dependencies=[Depends(rate_limit)])
+setup_exception_handlers(app)
+setup_db_routing(app)
+setup_invalidation(app)
+setup_due_alerts(app)
+setup_catalogo(app)
+setup_revogacao(app)
+setup_jobs(app)
+# Listagens mais comuns, compiladas no aquecimento com a mesma forma usada pelos endpoints
+setup_warmup(app, [
+    lambda db: listar_empresas(db, 0, None, None, 0, 1),
+    lambda db: listar_empresas(db, None, None, None, 0, 1),
+    lambda db: listar_obrigacoes(db, limit=1, usuario_id=0),
+    lambda db: listar_obrigacoes(db, limit=1),
+])
+app.add_middleware(IdempotencyMiddleware)
+app.add_middleware(ResponseCacheMiddleware)
+
+app.include_router(auth_routes.router)
 
 models.Base.metadata.create_all(bind=engine)
 
@@ -19,105 +73,474 @@ def get_db():
         db.close()
 
 db_dependency = Annotated[Session, Depends(get_db)]
+# Endpoints somente leitura: réplica, ou primário logo após uma escrita do cliente
+read_db_dependency = Annotated[Session, Depends(get_read_db)]
 
-class EmpresaRequest(BaseModel):
+# Empresas enviadas em lote: os CNPJs são validados e normalizados por core.upsert
+# ou pelo job de importação, que apontam a posição de cada CNPJ inválido
+class EmpresaLoteRequest(BaseModel):
     nome: str = Field(min_length=1, max_length=255)
     cnpj: str = Field(max_length=18)
     endereco: str = Field(min_length=1, max_length=600)
     email: str = Field(min_length=1, max_length=255)
     telefone: str = Field(max_length=11)
 
+class EmpresaRequest(EmpresaLoteRequest):
+    # Gravado apenas com os dígitos: com e sem formatação são o mesmo CNPJ para o índice único
+    @field_validator('cnpj')
+    @classmethod
+    def cnpj_normalizado(cls, v: str) -> str:
+        return normalizar_cnpj(v)
+
+class EmpresaDadosRequest(BaseModel):
+    nome: str = Field(min_length=1, max_length=255)
+    endereco: str = Field(min_length=1, max_length=600)
+    email: str = Field(min_length=1, max_length=255)
+    telefone: str = Field(max_length=11)
+
+# Máximo de empresas por chamada de PUT /empresas/cnpj
+MAX_UPSERT_LOTE = 10_000
+
 class ObrigacaoAcessoriaRequest(BaseModel):
     nome: str = Field(min_length=1, max_length=255)
-    periodicidade: str = Field(min_length=1, max_length=255)
+    periodicidade: PeriodicidadeEnum
     empresa_id: int
 
+    # Aceita o valor ("Mensal") ou o nome ("MENSAL") da periodicidade, como os filtros da listagem
+    @field_validator('periodicidade', mode='before')
+    @classmethod
+    def periodicidade_por_nome(cls, v):
+        if isinstance(v, str) and v in PeriodicidadeEnum.__members__:
+            return PeriodicidadeEnum[v]
+        return v
+
+def lista_json(adapter, itens) -> Response:
+    # Valida e serializa a lista inteira em uma chamada ao núcleo do Pydantic,
+    # em vez de passar cada registro pelo jsonable_encoder
+    return Response(adapter.dump_json(adapter.validate_python(itens, from_attributes=True)),
+                    media_type='application/json')
+
 # Empresa
-# Listar todas as empresas
+def listar_empresas(db: Session, usuario_id: Optional[int], nome: Optional[str], sort: Optional[str],
+                    after_id: int, limit: int):
+    # Paginação por chave (id > after_id): com usuario_id, percorre o índice
+    # (usuario_id, id) sem ordenar nem contar as empresas dos demais usuários
+    if after_id and sort and sort.lstrip('+') != 'id':
+        raise ValidationError('after_id só pode ser usado com a ordenação padrão (sort=id)')
+    query = db.query(Empresa).filter(*filtros_empresa(db.get_bind().dialect.name, nome))
+    if after_id:
+        query = query.filter(Empresa.id > after_id)
+    if usuario_id is not None:
+        query = query.filter(Empresa.usuario_id == usuario_id)
+    return query.order_by(*ordenacao(Empresa, sort, ORDENAVEIS_EMPRESAS)).limit(limit).all()
+
+# Listar as empresas do usuário autenticado
+# Filtros: nome (prefixo); sort: id ou nome (prefixo "-" para decrescente)
 @app.get('/empresas', status_code=status.HTTP_200_OK)
-async def read_all_empresas(db: db_dependency):
-    return db.query(Empresa).all()
+async def read_all_empresas(db: read_db_dependency,
+                            usuario: Usuario = Depends(get_current_active_user),
+                            nome: Optional[str] = Query(None, min_length=1, max_length=255),
+                            sort: Optional[str] = Query(None, max_length=100),
+                            after_id: int = Query(0, ge=0),
+                            limit: int = Query(100, ge=1, le=1000)):
+    return lista_json(EmpresaList, listar_empresas(db, usuario.id, nome, sort, after_id, limit))
+
+# Listar as empresas de todos os usuários (ou de um deles), apenas para administradores
+@app.get('/admin/empresas', status_code=status.HTTP_200_OK)
+async def read_all_empresas_admin(db: read_db_dependency,
+                                  admin: Usuario = Depends(get_current_active_superuser),
+                                  usuario_id: Optional[int] = Query(None, gt=0),
+                                  nome: Optional[str] = Query(None, min_length=1, max_length=255),
+                                  sort: Optional[str] = Query(None, max_length=100),
+                                  after_id: int = Query(0, ge=0),
+                                  limit: int = Query(100, ge=1, le=1000)):
+    return lista_json(EmpresaList, listar_empresas(db, usuario_id, nome, sort, after_id, limit))
+
+def filtros_dono(usuario: Usuario) -> list:
+    """Restringe as empresas às do usuário; administradores acessam todas."""
+    return [] if usuario.role == UserRole.ADMIN else [Empresa.usuario_id == usuario.id]
+
+def obter_empresa(db: Session, empresa_id: int, usuario: Usuario) -> Empresa:
+    """Empresa do usuário (ou qualquer empresa, para administradores); 404 para as demais."""
+    empresa = db.scalars(EMPRESA_POR_ID, {'id': empresa_id}).first()
+    if empresa is None or (empresa.usuario_id != usuario.id and usuario.role != UserRole.ADMIN):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Empresa não encontrada')
+    return empresa
 
 # Procurar uma empresa especifica pelo id
 @app.get('/empresa/{empresa_id}', status_code=status.HTTP_200_OK)
-async def get_empresa_by_id(db: db_dependency, empresa_id: int = Path(gt=0)):
-    empresa = db.query(Empresa).filter(Empresa.id == empresa_id).first()
-    if empresa is not None:
-        return empresa
-    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Empresa não encontrada')
+async def get_empresa_by_id(db: read_db_dependency, usuario: Usuario = Depends(get_current_active_user),
+                            empresa_id: int = Path(gt=0)):
+    return obter_empresa(db, empresa_id, usuario)
+
+# Procurar uma empresa do usuário (qualquer uma, para administradores) pelo CNPJ, com ou sem
+# formatação, no catálogo em memória; o catálogo pode estar atrasado em relação a uma criação
+# recente, então a ausência é confirmada no banco
+@app.get('/empresa/cnpj/{cnpj:path}', status_code=status.HTTP_200_OK)
+async def get_empresa_by_cnpj(db: db_dependency, usuario: Usuario = Depends(get_current_active_user),
+                              cnpj: str = Path(max_length=18)):
+    catalogo = obter_catalogo()
+    empresa = catalogo.por_cnpj(cnpj) if catalogo is not None else None
+    if empresa is None:
+        empresa = db.scalars(EMPRESA_POR_CNPJ, {'cnpj': ''.join(filter(str.isdigit, cnpj))}).first()
+    if empresa is None or (empresa.usuario_id != usuario.id and usuario.role != UserRole.ADMIN):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Empresa não encontrada')
+    return empresa.as_dict() if isinstance(empresa, EmpresaView) else como_dict(empresa)
 
 # Criar uma nova empresa
 @app.post('/empresa', status_code=status.HTTP_201_CREATED)
-async def create_empresa(db: db_dependency, empresa_request: EmpresaRequest):
-    new_empresa = Empresa(**empresa_request.model_dump())
+async def create_empresa(db: db_dependency, empresa_request: EmpresaRequest,
+                         usuario: Usuario = Depends(get_current_active_user)):
+    await group_commit.empresas.criar(db, {**empresa_request.model_dump(), 'usuario_id': usuario.id})
+
+# Criar ou atualizar uma empresa pelo CNPJ (com ou sem formatação)
+@app.put('/empresa/cnpj/{cnpj:path}', status_code=status.HTTP_200_OK)
+async def upsert_empresa(db: db_dependency, empresa_request: EmpresaDadosRequest,
+                         usuario: Usuario = Depends(get_current_active_user),
+                         cnpj: str = Path(max_length=18)):
+    resultado = upsert_empresas(db, [{**empresa_request.model_dump(), 'cnpj': cnpj}], usuario.id)
+    if resultado['ignoradas']:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Empresa pertence a outro usuário')
+    db.commit()
+    invalidation_bus.publish(EMPRESAS)
+    return resultado
 
-    db.add(new_empresa)
+# Criar ou atualizar empresas em lote pelo CNPJ (até MAX_UPSERT_LOTE por chamada)
+@app.put('/empresas/cnpj', status_code=status.HTTP_200_OK)
+async def upsert_empresas_lote(db: db_dependency, empresas_request: List[EmpresaLoteRequest],
+                               usuario: Usuario = Depends(get_current_active_user)):
+    if len(empresas_request) > MAX_UPSERT_LOTE:
+        raise ValidationError(f'Envie no máximo {MAX_UPSERT_LOTE} empresas por chamada')
+    resultado = upsert_empresas(db, (empresa.model_dump() for empresa in empresas_request), usuario.id)
     db.commit()
+    invalidation_bus.publish(EMPRESAS)
+    return resultado
 
 # Editar uma empresa existente
 @app.put('/empresa/{empresa_id}', status_code=status.HTTP_204_NO_CONTENT)
-async def update_empresa(db: db_dependency, empresa_request: EmpresaRequest, empresa_id: int = Path(gt=0)):
-    empresa = db.query(Empresa).filter(Empresa.id == empresa_id).first()
-    if empresa is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Empresa não encontrada')    
-    
+async def update_empresa(db: db_dependency, empresa_request: EmpresaRequest,
+                         usuario: Usuario = Depends(get_current_active_user), empresa_id: int = Path(gt=0)):
+    empresa = obter_empresa(db, empresa_id, usuario)
+
     for var, value in vars(empresa_request).items():
         setattr(empresa, var, value) if value else None
 
-    db.commit()
+    registrar_alteracao(db, empresa, OperacaoEnum.ATUALIZACAO)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise ConflictError('CNPJ já cadastrado', details={'cnpj': empresa_request.cnpj})
+    invalidation_bus.publish(EMPRESAS)
+
+def excluir_empresas(db: Session, filtros: list) -> int:
+    """Exclui as empresas que atendem aos filtros e as suas obrigações (ativas e arquivadas)."""
+    empresas = select(Empresa.id).where(*filtros)
+    obrigacoes_excluidas = ObrigacaoAcessoria.empresa_id.in_(empresas)
+    descontar_empresas(db, obrigacoes_excluidas)
+    registrar_exclusoes(db, ObrigacaoAcessoria, obrigacoes_excluidas)
+    registrar_exclusoes(db, Empresa, *filtros)
+
+    # DELETEs diretos, sem carregar nada na sessão. As filhas são removidas aqui
+    # e não só pelo ON DELETE CASCADE: create_all não altera a chave estrangeira
+    # de um banco criado antes dela
+    db.query(ObrigacaoAcessoria).filter(obrigacoes_excluidas).delete(synchronize_session=False)
+    db.query(ObrigacaoAcessoriaArquivada).filter(
+        ObrigacaoAcessoriaArquivada.empresa_id.in_(empresas)).delete(synchronize_session=False)
+    return db.query(Empresa).filter(*filtros).delete(synchronize_session=False)
 
 # Excluir uma empresa
 @app.delete('/empresa/{empresa_id}', status_code=status.HTTP_204_NO_CONTENT)
-async def delete_empresa(db: db_dependency, empresa_id: int = Path(gt=0)):
-    empresa = db.query(Empresa).filter(Empresa.id == empresa_id).first()
+async def delete_empresa(db: db_dependency, usuario: Usuario = Depends(get_current_active_user),
+                         empresa_id: int = Path(gt=0)):
+    excluidas = excluir_empresas(db, [Empresa.id == empresa_id, *filtros_dono(usuario)])
 
-    if empresa is None:
+    if excluidas == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Empresa não encontrada')
-    
-    db.delete(empresa)
+
+    db.commit()
+    invalidation_bus.publish(EMPRESAS, OBRIGACOES_ACESSORIAS)
+
+# Excluir em lote as empresas do usuário autenticado que atendem aos filtros
+@app.delete('/empresas', status_code=status.HTTP_200_OK)
+async def delete_empresas(db: db_dependency,
+                          usuario: Usuario = Depends(get_current_active_user),
+                          nome: Optional[str] = Query(None, min_length=1, max_length=255),
+                          cnpj: Optional[List[str]] = Query(None)):
+    filtros = []
+    if nome is not None:
+        filtros.append(Empresa.nome.startswith(nome, autoescape=True))
+    if cnpj:
+        filtros.append(Empresa.cnpj.in_([''.join(filter(str.isdigit, c)) for c in cnpj]))
+
+    # Sem filtros a operação apagaria todas as empresas do usuário
+    if not filtros:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail='Informe ao menos um filtro (nome ou cnpj)')
+    # O dono vem do token, nunca da query
+    filtros.append(Empresa.usuario_id == usuario.id)
+
+    excluidas = excluir_empresas(db, filtros)
     db.commit()
+    invalidation_bus.publish(EMPRESAS, OBRIGACOES_ACESSORIAS)
+
+    return {'excluidas': excluidas}
 
 #  Obrigação Acessória 
-# Listar todas obrigações acessórias 
+def listar_obrigacoes(db: Session, empresa_id: Optional[List[int]] = None, periodicidade: Optional[List[str]] = None,
+                      vencimento_de: Optional[datetime] = None, vencimento_antes_de: Optional[datetime] = None,
+                      nome: Optional[str] = None, sort: Optional[str] = None, limit: Optional[int] = None,
+                      arquivadas: bool = False, usuario_id: Optional[int] = None):
+    obrigacoes = []
+    for modelo in (ObrigacaoAcessoria, ObrigacaoAcessoriaArquivada) if arquivadas else (ObrigacaoAcessoria,):
+        query = db.query(modelo)
+        if usuario_id is not None:
+            # Apenas as obrigações das empresas do usuário
+            query = query.join(Empresa, Empresa.id == modelo.empresa_id).filter(Empresa.usuario_id == usuario_id)
+        query = (
+            query
+            .filter(*filtros_obrigacao(modelo, db.get_bind().dialect.name, empresa_id, periodicidade,
+                                       vencimento_de, vencimento_antes_de, nome))
+            .order_by(*ordenacao(modelo, sort, ORDENAVEIS_OBRIGACOES))
+        )
+        if limit is not None:
+            query = query.limit(limit - len(obrigacoes))
+        obrigacoes += query.all()
+        if limit is not None and len(obrigacoes) >= limit:
+            break
+    return obrigacoes
+
+# Listar as obrigações acessórias das empresas do usuário (todas, para administradores)
+# Filtros: empresa_id e periodicidade (repetíveis), vencimento_de (inclusive),
+# vencimento_antes_de (exclusive), nome (prefixo); sort: id, nome, data_vencimento
+# ou empresa_id (prefixo "-" para decrescente).
+# Por padrão só a tabela ativa; as arquivadas (vencimento antigo) apenas com
+# arquivadas=true, listadas depois das ativas
 @app.get('/obrigacaoAcessoria', status_code=status.HTTP_200_OK)
-async def read_all_obrigacaoAcessoria(db: db_dependency):
-    return db.query(ObrigacaoAcessoria).all()
+async def read_all_obrigacaoAcessoria(db: read_db_dependency,
+                                      usuario: Usuario = Depends(get_current_active_user),
+                                      empresa_id: Optional[List[int]] = Query(None),
+                                      periodicidade: Optional[List[str]] = Query(None),
+                                      vencimento_de: Optional[datetime] = Query(None),
+                                      vencimento_antes_de: Optional[datetime] = Query(None),
+                                      nome: Optional[str] = Query(None, min_length=1, max_length=255),
+                                      sort: Optional[str] = Query(None, max_length=100),
+                                      limit: Optional[int] = Query(None, ge=1, le=1000),
+                                      arquivadas: bool = Query(False)):
+    obrigacoes = listar_obrigacoes(db, empresa_id, periodicidade, vencimento_de, vencimento_antes_de, nome, sort,
+                                   limit, arquivadas, None if usuario.role == UserRole.ADMIN else usuario.id)
+    return lista_json(ObrigacaoAcessoriaList, obrigacoes)
     
+def empresa_do_usuario(db: Session, empresa_id: int, usuario: Usuario) -> bool:
+    """Se a empresa existe e pertence ao usuário (qualquer empresa existente, para administradores)."""
+    return db.scalar(select(Empresa.id).where(Empresa.id == empresa_id, *filtros_dono(usuario))) is not None
+
+def obter_obrigacao(db: Session, obrigacao_id: int, usuario: Usuario, arquivadas: bool = False):
+    """Obrigação de uma empresa do usuário (qualquer uma, para administradores); 404 para as demais."""
+    obrigacaoAcessoria = db.scalars(OBRIGACAO_POR_ID, {'id': obrigacao_id}).first()
+    if obrigacaoAcessoria is None and arquivadas:
+        obrigacaoAcessoria = db.get(ObrigacaoAcessoriaArquivada, obrigacao_id)
+    if obrigacaoAcessoria is None or not empresa_do_usuario(db, obrigacaoAcessoria.empresa_id, usuario):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Obrigação Acessória não encontrada')
+    return obrigacaoAcessoria
+
 # Procurar uma obrigação acessória especifica pelo id
 @app.get('/obrigacaoAcessoria/{obrigacaoAcessoria_id}', status_code=status.HTTP_200_OK)
-async def get_obrigacaoAcessoria_by_id(db: db_dependency, obrigacaoAcessoria_id: int = Path(gt=0)):
-    obrigacaoAcessoria = db.query(ObrigacaoAcessoria).filter(ObrigacaoAcessoria.id == obrigacaoAcessoria_id).first()
-    if obrigacaoAcessoria is not None:
-        return obrigacaoAcessoria
-    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Obrigação Acessória não encontrada')
+async def get_obrigacaoAcessoria_by_id(db: read_db_dependency, usuario: Usuario = Depends(get_current_active_user),
+                                       obrigacaoAcessoria_id: int = Path(gt=0), arquivadas: bool = Query(False)):
+    return obter_obrigacao(db, obrigacaoAcessoria_id, usuario, arquivadas)
     
-# Criar uma nova obrigação acessória
+# Criar uma nova obrigação acessória em uma empresa do usuário
 @app.post('/obrigacaoAcessoria', status_code=status.HTTP_201_CREATED)
-async def create_obrigacaoAcessoria(db: db_dependency, obrigacaoAcessoria_request: ObrigacaoAcessoriaRequest):
-    new_obrigacaoAcessoria = ObrigacaoAcessoria(**obrigacaoAcessoria_request.model_dump())
-
-    db.add(new_obrigacaoAcessoria)
-    db.commit()
+async def create_obrigacaoAcessoria(db: db_dependency, obrigacaoAcessoria_request: ObrigacaoAcessoriaRequest,
+                                    usuario: Usuario = Depends(get_current_active_user)):
+    if not empresa_do_usuario(db, obrigacaoAcessoria_request.empresa_id, usuario):
+        raise ValidationError('Empresa não encontrada',
+                              details={'empresa_id': obrigacaoAcessoria_request.empresa_id})
+    await group_commit.obrigacoes.criar(db, obrigacaoAcessoria_request.model_dump())
     
 # Editar uma obrigação acessória existente
 @app.put('/obrigacaoAcessoria/{obrigacaoAcessoria_id}', status_code=status.HTTP_204_NO_CONTENT)
-async def update_obrigacaoAcessoria(db: db_dependency, obrigacaoAcessoria_request: ObrigacaoAcessoriaRequest, obrigacaoAcessoria_id: int = Path(gt=0)):
-    obrigacaoAcessoria = db.query(ObrigacaoAcessoria).filter(ObrigacaoAcessoria.id == obrigacaoAcessoria_id).first()
-    if obrigacaoAcessoria is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Obrigação Acessória não encontrada')
-    
+async def update_obrigacaoAcessoria(db: db_dependency, obrigacaoAcessoria_request: ObrigacaoAcessoriaRequest,
+                                    usuario: Usuario = Depends(get_current_active_user),
+                                    obrigacaoAcessoria_id: int = Path(gt=0)):
+    obrigacaoAcessoria = obter_obrigacao(db, obrigacaoAcessoria_id, usuario)
+    # A obrigação só pode ser movida para outra empresa do mesmo usuário
+    if (obrigacaoAcessoria_request.empresa_id != obrigacaoAcessoria.empresa_id
+            and not empresa_do_usuario(db, obrigacaoAcessoria_request.empresa_id, usuario)):
+        raise ValidationError('Empresa não encontrada',
+                              details={'empresa_id': obrigacaoAcessoria_request.empresa_id})
+
+    registrar_obrigacao(db, obrigacaoAcessoria, -1)
     for var, value in vars(obrigacaoAcessoria_request).items():
         setattr(obrigacaoAcessoria, var, value) if value else None
 
+    registrar_obrigacao(db, obrigacaoAcessoria, 1)
+    registrar_alteracao(db, obrigacaoAcessoria, OperacaoEnum.ATUALIZACAO)
     db.commit()
+    invalidation_bus.publish(OBRIGACOES_ACESSORIAS)
 
 # Excluir uma obrigação acessória
 @app.delete('/obrigacaoAcessoria/{obrigacaoAcessoria_id}', status_code=status.HTTP_204_NO_CONTENT)
-async def delete_obrigacaoAcessoria(db: db_dependency, obrigacaoAcessoria_id: int = Path(gt=0)):
-    obrigacaoAcessoria = db.query(ObrigacaoAcessoria).filter(ObrigacaoAcessoria.id == obrigacaoAcessoria_id).first()
+async def delete_obrigacaoAcessoria(db: db_dependency, usuario: Usuario = Depends(get_current_active_user),
+                                    obrigacaoAcessoria_id: int = Path(gt=0)):
+    obrigacaoAcessoria = obter_obrigacao(db, obrigacaoAcessoria_id, usuario)
 
-    if obrigacaoAcessoria is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Obrigação Acessória não encontrada')
-    
+    registrar_alteracao(db, obrigacaoAcessoria, OperacaoEnum.EXCLUSAO)
+    registrar_obrigacao(db, obrigacaoAcessoria, -1)
     db.delete(obrigacaoAcessoria)
-    db.commit()
\ No newline at end of file
+    db.commit()
+    invalidation_bus.publish(OBRIGACOES_ACESSORIAS)
+
+# Alterações
+# Feed incremental de criações, atualizações e exclusões após o cursor `since`,
+# restrito aos registros do usuário (o administrador vê todos)
+@app.get('/changes', status_code=status.HTTP_200_OK)
+async def read_changes(db: read_db_dependency,
+                       usuario: Usuario = Depends(get_current_active_user),
+                       since: int = Query(0, ge=0),
+                       limit: int = Query(500, ge=1, le=1000)):
+    return listar_alteracoes(db, since, limit, None if usuario.role == UserRole.ADMIN else usuario.id)
+
+# Relatórios
+# Resumo do dashboard a partir dos contadores mantidos pelas escritas. Os totais gerais
+# (de todos os usuários) são só para administradores; os demais consultam o total de uma empresa sua
+@app.get('/relatorios/resumo', status_code=status.HTTP_200_OK)
+async def read_resumo(db: db_dependency, usuario: Usuario = Depends(get_current_active_user),
+                      empresa_id: Optional[int] = Query(None, gt=0)):
+    admin = usuario.role == UserRole.ADMIN
+    if empresa_id is None and not admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail='Resumo geral restrito a administradores; informe empresa_id')
+    if empresa_id is not None and not empresa_do_usuario(db, empresa_id, usuario):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Empresa não encontrada')
+    return obter_resumo(db, empresa_id, geral=admin)
+
+# Exportações
+# Gera em um job os arquivos Parquet/Arrow para análise, lendo de uma réplica se houver
+@app.post('/admin/exportacoes', status_code=status.HTTP_202_ACCEPTED)
+async def create_exportacao(db: db_dependency, admin: Usuario = Depends(get_current_active_superuser),
+                            formato: str = Query('parquet', pattern='^(parquet|arrow)$')):
+    job = enfileirar(db, 'exportar', {'formato': formato}, admin.id)
+    db.commit()
+    job_runner.acordar()
+    return {'id': job.id, 'formato': formato}
+
+@app.get('/admin/exportacoes', status_code=status.HTTP_200_OK)
+async def read_exportacoes(admin: Usuario = Depends(get_current_active_superuser)):
+    return listar_exportacoes()
+
+# Download do arquivo exportado, lido por memory map
+@app.get('/admin/exportacoes/{arquivo}', status_code=status.HTTP_200_OK)
+async def download_exportacao(arquivo: str, admin: Usuario = Depends(get_current_active_superuser)):
+    try:
+        caminho = caminho_exportacao(arquivo)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Exportação não encontrada')
+    media_type = ('application/vnd.apache.parquet' if arquivo.endswith(FORMATOS['parquet'])
+                  else 'application/vnd.apache.arrow.file')
+    return StreamingResponse(
+        ler_mapeado(caminho),
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="{arquivo}"'},
+    )
+
+# Jobs
+# Importa empresas em segundo plano, sem o limite de MAX_UPSERT_LOTE; acompanhe em GET /jobs/{id}
+@app.post('/jobs/importacoes', status_code=status.HTTP_202_ACCEPTED)
+async def create_importacao(db: db_dependency, empresas_request: List[EmpresaLoteRequest],
+                            usuario: Usuario = Depends(get_current_active_user)):
+    if len(empresas_request) > settings.JOB_IMPORT_MAX_EMPRESAS:
+        raise ValidationError(f'Envie no máximo {settings.JOB_IMPORT_MAX_EMPRESAS} empresas por importação')
+    job = enfileirar(db, 'importar_empresas',
+                     {'empresas': [empresa.model_dump() for empresa in empresas_request]}, usuario.id)
+    db.commit()
+    job_runner.acordar()
+    return {'id': job.id, 'status': job.status}
+
+def obter_job(db: Session, job_id: int, usuario: Usuario) -> Job:
+    """Job do usuário (ou qualquer job, para administradores); 404 para os demais."""
+    job = db.get(Job, job_id)
+    if job is None or (job.usuario_id != usuario.id and usuario.role != UserRole.ADMIN):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Job não encontrado')
+    return job
+
+# Status, progresso e resultado de um job
+@app.get('/jobs/{job_id}', status_code=status.HTTP_200_OK)
+async def read_job(db: db_dependency, job_id: int = Path(gt=0),
+                   usuario: Usuario = Depends(get_current_active_user)):
+    job = obter_job(db, job_id, usuario)
+    return {
+        'id': job.id,
+        'tipo': job.tipo,
+        'status': job.status,
+        'progresso': job.progresso,
+        'total': job.total,
+        'cancelamento_pedido': job.cancelar,
+        'resultado': job.resultado,
+        'erro': job.erro,
+        'data_criacao': job.data_criacao,
+        'data_inicio': job.data_inicio,
+        'data_fim': job.data_fim,
+    }
+
+# Cancela um job pendente; um job em execução para na próxima atualização de progresso
+@app.post('/jobs/{job_id}/cancelar', status_code=status.HTTP_202_ACCEPTED)
+async def cancel_job(db: db_dependency, job_id: int = Path(gt=0),
+                     usuario: Usuario = Depends(get_current_active_user)):
+    job = obter_job(db, job_id, usuario)
+    if job.data_fim is not None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Job já finalizado')
+    cancelar(db, job)
+    db.commit()
+    return {'id': job.id, 'status': job.status}
+
+# Notificações
+# Fluxo SSE com os alertas de vencimento das obrigações das empresas do usuário.
+# O usuário vem do token (tipo e revogação conferidos por core.auth), sem prender uma conexão do pool
+@app.get('/notificacoes/vencimentos', status_code=status.HTTP_200_OK)
+async def stream_vencimentos(request: Request, usuario: Usuario = Depends(get_current_active_user)):
+    return StreamingResponse(
+        event_stream(request, usuario.id),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+# Saúde
+# O processo está no ar (liveness)
+@app.get('/health/live', status_code=status.HTTP_200_OK)
+async def read_liveness():
+    return {'status': 'ok'}
+
+# O worker terminou o aquecimento e pode receber tráfego (readiness).
+# O 503 é uma resposta esperada da sonda, não um erro: não passa pelo handler que registra 5xx
+@app.get('/health/ready', status_code=status.HTTP_200_OK)
+async def read_readiness():
+    if not pronto():
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            content={'status': 'aquecendo'}, headers={'Retry-After': '1'})
+    return {'status': 'ok'}
+
+# Diagnóstico
+# Estado do pool de conexões (conexões em uso, esperas e overflow)
+@app.get('/diagnostico/pool', status_code=status.HTTP_200_OK)
+async def read_pool_status():
+    return pool_status(engine)
+
+# Ocupação e acertos do cache de respostas das listagens
+@app.get('/diagnostico/cache', status_code=status.HTTP_200_OK)
+async def read_response_cache_status():
+    return response_cache.stats()
+
+# Lotes e linhas gravados pelo agrupamento de criações
+@app.get('/diagnostico/escritas', status_code=status.HTTP_200_OK)
+async def read_group_commit_status():
+    return {'empresas': group_commit.empresas.stats(), 'obrigacoes': group_commit.obrigacoes.stats()}
+
+# Memória ocupada pelo catálogo de empresas em memória
+@app.get('/diagnostico/catalogo', status_code=status.HTTP_200_OK)
+async def read_catalogo_status():
+    catalogo = obter_catalogo()
+    if catalogo is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Catálogo desativado ou carregando')
+    return catalogo.memoria()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Enum
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Enum, Index, JSON, Text, LargeBinary, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -11,6 +11,8 @@ class Usuario(Base):
     nome = Column(String(100), nullable=False)
     email = Column(String(100), unique=True, index=True, nullable=False)
     senha_hash = Column(String(255), nullable=False)
+    # Valores de schemas.auth.UserRole; "admin" vê as empresas de todos os usuários
+    role = Column(String(20), nullable=False, default='user', server_default='user')
     ativo = Column(Boolean, default=True)
     data_criacao = Column(DateTime(timezone=True), server_default=func.now())
     data_atualizacao = Column(DateTime(timezone=True), onupdate=func.now())
@@ -34,10 +36,20 @@ class Empresa(Base):
     data_atualizacao = Column(DateTime(timezone=True), onupdate=func.now())
     usuario_id = Column(Integer, ForeignKey('usuarios.id'), nullable=False)
     
+    # Listagem por usuário: o filtro e a ordenação por id (ou por nome) percorrem só estes índices
+    __table_args__ = (
+        Index('ix_empresas_usuario_id_id', 'usuario_id', 'id'),
+        Index('ix_empresas_usuario_id_nome', 'usuario_id', 'nome'),
+        Index('ix_empresas_nome_pattern', 'nome', postgresql_ops={'nome': 'text_pattern_ops'}).ddl_if(dialect='postgresql'),
+    )
+    
     # Relacionamentos
     responsavel = relationship("Usuario", back_populates="empresas")
+    # As obrigações são excluídas em um DELETE por conjunto (main.excluir_empresas),
+    # com ON DELETE CASCADE como rede; com passive_deletes o ORM não carrega as
+    # filhas apenas para removê-las.
     obrigacoes_acessorias = relationship("ObrigacaoAcessoria", back_populates="empresa", 
-                                       cascade="all, delete-orphan")
+                                       cascade="all, delete-orphan", passive_deletes=True)
     
     def __repr__(self):
         return f"<Empresa {self.nome} - {self.cnpj}>"
@@ -55,13 +67,24 @@ class PeriodicidadeEnum(str, enum.Enum):
 
 class ObrigacaoAcessoria(Base):
     __tablename__ = 'obrigacoes_acessorias'
+    __table_args__ = (
+        # Filtros da listagem (core/filtros.py) combinados com intervalo de vencimento
+        Index('ix_obrigacoes_acessorias_empresa_id_vencimento', 'empresa_id', 'data_vencimento'),
+        Index('ix_obrigacoes_acessorias_periodicidade_vencimento', 'periodicidade', 'data_vencimento'),
+        # Busca por prefixo (LIKE 'abc%') no PostgreSQL, independente da collation do banco
+        Index('ix_obrigacoes_acessorias_nome_pattern', 'nome',
+              postgresql_ops={'nome': 'text_pattern_ops'}).ddl_if(dialect='postgresql'),
+        # No SQLite, sem AUTOINCREMENT o maior id pode ser reutilizado depois de
+        # arquivado, colidindo com o id guardado em obrigacoes_acessorias_arquivo
+        {'sqlite_autoincrement': True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String(255), nullable=False, index=True)
     descricao = Column(String(1000), nullable=True)
     periodicidade = Column(Enum(PeriodicidadeEnum), nullable=False)
-    data_vencimento = Column(DateTime(timezone=True), nullable=True)
-    empresa_id = Column(Integer, ForeignKey('empresas.id'), nullable=False)
+    data_vencimento = Column(DateTime(timezone=True), nullable=True, index=True)
+    empresa_id = Column(Integer, ForeignKey('empresas.id', ondelete='CASCADE'), nullable=False, index=True)
     data_criacao = Column(DateTime(timezone=True), server_default=func.now())
     data_atualizacao = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -69,4 +92,138 @@ class ObrigacaoAcessoria(Base):
     empresa = relationship("Empresa", back_populates="obrigacoes_acessorias")
     
     def __repr__(self):
-        return f"<ObrigacaoAcessoria {self.nome} - {self.periodicidade}>"
\ No newline at end of file
+        return f"<ObrigacaoAcessoria {self.nome} - {self.periodicidade}>"
+
+# Obrigações com vencimento antigo, movidas de obrigacoes_acessorias pelo job de
+# arquivamento (scripts/arquivar_obrigacoes.py); somente leitura pela API
+class ObrigacaoAcessoriaArquivada(Base):
+    __tablename__ = 'obrigacoes_acessorias_arquivo'
+
+    # Mantém o id original da obrigação
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    nome = Column(String(255), nullable=False)
+    descricao = Column(String(1000), nullable=True)
+    periodicidade = Column(Enum(PeriodicidadeEnum), nullable=False)
+    data_vencimento = Column(DateTime(timezone=True), nullable=True, index=True)
+    empresa_id = Column(Integer, ForeignKey('empresas.id', ondelete='CASCADE'), nullable=False, index=True)
+    data_criacao = Column(DateTime(timezone=True))
+    data_atualizacao = Column(DateTime(timezone=True))
+    data_arquivamento = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<ObrigacaoAcessoriaArquivada {self.nome} - {self.periodicidade}>"
+
+class OperacaoEnum(str, enum.Enum):
+    CRIACAO = "create"
+    ATUALIZACAO = "update"
+    EXCLUSAO = "delete"
+
+# Registro de alterações de empresas e obrigações, lido pelo feed GET /changes
+class Alteracao(Base):
+    __tablename__ = 'alteracoes'
+
+    # O id crescente é o cursor do feed
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tabela = Column(String(50), nullable=False)
+    registro_id = Column(Integer, nullable=False)
+    operacao = Column(Enum(OperacaoEnum), nullable=False)
+    # Dono do registro no momento da alteração: o feed de cada usuário não depende
+    # do registro ainda existir (tombstones)
+    usuario_id = Column(Integer, nullable=True)
+    data = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_alteracoes_usuario_id_id', 'usuario_id', 'id'),
+    )
+    
+    def __repr__(self):
+        return f"<Alteracao {self.id} {self.operacao} {self.tabela}:{self.registro_id}>"
+
+# Contadores de obrigações mantidos pelas escritas, lidos por /relatorios/resumo.
+# dimensao: total, periodicidade, empresa, vencimento (dia) ou sem_vencimento
+class ResumoObrigacoes(Base):
+    __tablename__ = 'resumo_obrigacoes'
+
+    dimensao = Column(String(20), primary_key=True)
+    chave = Column(String(50), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<ResumoObrigacoes {self.dimensao}:{self.chave} = {self.total}>"
+
+# Tokens revogados (logout, rotação do refresh token e desativação de usuários),
+# mantidos em memória por core/revogacao.py; as linhas expiram junto com os tokens
+class TokenRevogado(Base):
+    __tablename__ = 'tokens_revogados'
+    # O id crescente permite carregar só as revogações novas
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # "jti:<id do token>" ou "usuario:<id>" (todos os tokens emitidos até revogado_em)
+    chave = Column(String(64), nullable=False)
+    revogado_em = Column(DateTime(timezone=True), nullable=False)
+    expira_em = Column(DateTime(timezone=True), nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<TokenRevogado {self.chave}>"
+
+# Respostas guardadas por core/idempotency.py, compartilhadas entre os workers.
+# status NULL: a requisição original ainda está em processamento
+class RespostaIdempotente(Base):
+    __tablename__ = 'respostas_idempotentes'
+    __table_args__ = (
+        # Uma reserva por cliente, rota e Idempotency-Key, mesmo entre workers
+        UniqueConstraint('identidade', 'metodo', 'caminho', 'chave', name='uq_respostas_idempotentes_chave'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    identidade = Column(String(255), nullable=False)
+    metodo = Column(String(10), nullable=False)
+    caminho = Column(String(255), nullable=False)
+    chave = Column(String(255), nullable=False)
+    hash_requisicao = Column(LargeBinary(16), nullable=False)
+    status = Column(Integer, nullable=True)
+    cabecalhos = Column(JSON, nullable=True)
+    corpo = Column(LargeBinary, nullable=True)
+    expira_em = Column(DateTime(timezone=True), nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<RespostaIdempotente {self.metodo} {self.caminho} {self.chave}>"
+
+class JobStatusEnum(str, enum.Enum):
+    PENDENTE = "pendente"
+    EXECUTANDO = "executando"
+    CONCLUIDO = "concluido"
+    FALHOU = "falhou"
+    CANCELADO = "cancelado"
+
+# Operações longas executadas em segundo plano por core/jobs.py; a própria
+# tabela é a fila (sem broker externo)
+class Job(Base):
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # Busca do próximo job pendente e dos jobs com lease vencido
+        Index('ix_jobs_status_id', 'status', 'id'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tipo = Column(String(50), nullable=False)
+    status = Column(Enum(JobStatusEnum), nullable=False, default=JobStatusEnum.PENDENTE)
+    parametros = Column(JSON, nullable=False)
+    resultado = Column(JSON, nullable=True)
+    erro = Column(Text, nullable=True)
+    progresso = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=True)
+    # Pedido de cancelamento, verificado pelo job a cada atualização de progresso
+    cancelar = Column(Boolean, nullable=False, default=False)
+    usuario_id = Column(Integer, ForeignKey('usuarios.id', ondelete='CASCADE'), nullable=False, index=True)
+    # Processo que executa o job e último sinal de vida; sem sinal por
+    # JOB_LEASE_SECONDS o job volta para a fila
+    trabalhador = Column(String(100), nullable=True)
+    heartbeat = Column(DateTime(timezone=True), nullable=True)
+    data_criacao = Column(DateTime(timezone=True), server_default=func.now())
+    data_inicio = Column(DateTime(timezone=True), nullable=True)
+    data_fim = Column(DateTime(timezone=True), nullable=True)
+    
+    def __repr__(self):
+        return f"<Job {self.id} {self.tipo} {self.status}>"
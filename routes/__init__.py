@@ -0,0 +1 @@
+# Este arquivo é necessário para que o Python trate o diretório como um pacote
@@ -1,16 +1,19 @@
-from datetime import timedelta
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Path, status
 from fastapi.security import OAuth2PasswordRequestForm
+from jose import JWTError
 from sqlalchemy.orm import Session
 
-from .. import models, schemas
-from ..core import auth
-from ..core.config import settings
-from ..database import get_db
+import models
+from core import auth
+from core.invalidation import TOKENS_REVOGADOS, USUARIOS, invalidation_bus
+from core.rate_limit import rate_limit
+from core.revogacao import revogar_token, revogar_usuario
+from database import get_db
+from schemas import auth as schemas
 
-router = APIRouter(tags=["autenticacao"])
+router = APIRouter(tags=["autenticacao"], dependencies=[Depends(rate_limit)])
 
 @router.post("/login", response_model=schemas.Token)
 async def login_for_access_token(
@@ -25,7 +28,7 @@ async def login_for_access_token(
         db: Sessão do banco de dados
         
     Retorna:
-        Token de acesso JWT
+        Token de acesso (curto) e refresh token
         
     Levanta:
         HTTPException: Se as credenciais estiverem incorretas ou o usuário estiver inativo
@@ -46,14 +49,109 @@ async def login_for_access_token(
             detail="Usuário inativo"
         )
     
-    # Cria o token de acesso
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = auth.create_access_token(
-        data={"sub": user.email}, 
-        expires_delta=access_token_expires
+    return auth.create_token_pair(user)
+
+@router.post("/refresh", response_model=schemas.Token)
+async def refresh_access_token(
+    refresh_in: schemas.RefreshRequest,
+    db: Session = Depends(get_db)
+) -> Any:
+    """
+    Troca um refresh token válido por um novo par de tokens.
+    
+    O refresh token usado é revogado (rotação), e o usuário é relido do banco:
+    um usuário desativado não consegue renovar o acesso.
+    
+    Parâmetros:
+        refresh_in: Refresh token recebido no login ou na última renovação
+        db: Sessão do banco de dados
+        
+    Retorna:
+        Novo par de tokens
+        
+    Levanta:
+        HTTPException: Se o refresh token for inválido, expirado ou revogado, ou o usuário estiver inativo
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Refresh token inválido",
+        headers={"WWW-Authenticate": "Bearer"},
     )
+    try:
+        payload = auth.decode_token(refresh_in.refresh_token, auth.REFRESH)
+    except JWTError:
+        raise credentials_exception
+    
+    user = db.get(models.Usuario, payload["uid"])
+    if user is None or not user.ativo:
+        raise credentials_exception
+    
+    revogar_token(db, payload)
+    db.commit()
+    invalidation_bus.publish(TOKENS_REVOGADOS)
+    
+    return auth.create_token_pair(user)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    logout_in: schemas.LogoutRequest,
+    token: str = Depends(auth.oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> None:
+    """
+    Revoga o token de acesso atual e, se informado, o refresh token.
+    
+    A revogação chega aos demais workers pelo barramento de invalidação.
+    
+    Parâmetros:
+        logout_in: Refresh token a revogar (opcional)
+        token: Token de acesso atual
+        db: Sessão do banco de dados
+        
+    Levanta:
+        HTTPException: Se o token de acesso for inválido
+    """
+    try:
+        access = auth.decode_token(token, auth.ACCESS)
+        refresh = auth.decode_token(logout_in.refresh_token, auth.REFRESH) if logout_in.refresh_token else None
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Não foi possível validar as credenciais",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    revogar_token(db, access)
+    if refresh is not None and refresh["uid"] == access["uid"]:
+        revogar_token(db, refresh)
+    db.commit()
+    invalidation_bus.publish(TOKENS_REVOGADOS)
+
+@router.post("/usuarios/{usuario_id}/desativar", status_code=status.HTTP_204_NO_CONTENT)
+async def deactivate_user(
+    usuario_id: int = Path(gt=0),
+    db: Session = Depends(get_db),
+    current_user: models.Usuario = Depends(auth.get_current_active_superuser)
+) -> None:
+    """
+    Desativa um usuário e revoga todos os tokens já emitidos para ele.
+    
+    Parâmetros:
+        usuario_id: Id do usuário
+        db: Sessão do banco de dados
+        current_user: Administrador autenticado
+        
+    Levanta:
+        HTTPException: Se o usuário não existir
+    """
+    user = db.get(models.Usuario, usuario_id)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado")
+    
+    user.ativo = False
+    revogar_usuario(db, usuario_id)
+    db.commit()
+    invalidation_bus.publish(USUARIOS, TOKENS_REVOGADOS)
 
 @router.post("/registrar", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
 async def create_user(
@@ -96,35 +194,41 @@ async def create_user(
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    invalidation_bus.publish(USUARIOS)
     
     return db_user
 
 @router.get("/eu", response_model=schemas.User)
 async def read_users_me(
-    current_user: models.Usuario = Depends(auth.get_current_active_user)
+    current_user: models.Usuario = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_db)
 ) -> Any:
     """
     Retorna os dados do usuário atualmente autenticado.
     
     Parâmetros:
         current_user: Usuário autenticado
+        db: Sessão do banco de dados
         
     Retorna:
         Dados do usuário autenticado
     """
-    return current_user
+    # O usuário do token só tem id, e-mail e papel; o cadastro completo vem do banco
+    return db.get(models.Usuario, current_user.id)
 
 @router.post("/test-token", response_model=schemas.User)
 async def test_token(
-    current_user: models.Usuario = Depends(auth.get_current_active_user)
+    current_user: models.Usuario = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_db)
 ) -> Any:
     """
     Testa se o token de acesso é válido.
     
     Parâmetros:
         current_user: Usuário autenticado
+        db: Sessão do banco de dados
         
     Retorna:
         Dados do usuário autenticado
     """
-    return current_user
+    return db.get(models.Usuario, current_user.id)
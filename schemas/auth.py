@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, Field, validator
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
 from typing import Optional
 from datetime import datetime
 from enum import Enum
@@ -25,19 +25,20 @@ class UserCreate(UserBase):
         description="Senha do usuário (mínimo 8 caracteres, contendo letras e números)"
     )
     
-    @validator('senha')
-    def validar_senha(cls, v):
+    @field_validator('senha')
+    @classmethod
+    def validar_senha(cls, v: str) -> str:
         """Valida a força da senha."""
         if len(v) < 8:
             raise ValueError("A senha deve ter pelo menos 8 caracteres")
         if not re.search("[a-zA-Z]", v):
             raise ValueError("A senha deve conter pelo menos uma letra")
-        if not re.search("\d", v):
+        if not re.search(r"\d", v):
             raise ValueError("A senha deve conter pelo menos um número")
         return v
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "email": "usuario@exemplo.com",
                 "nome": "Fulano de Tal",
@@ -45,6 +46,7 @@ class UserCreate(UserBase):
                 "role": "user"
             }
         }
+    )
 
 class UserUpdate(BaseModel):
     """Schema para atualização de um usuário existente."""
@@ -54,8 +56,8 @@ class UserUpdate(BaseModel):
     ativo: Optional[bool] = Field(None, description="Status de ativação do usuário")
     role: Optional[UserRole] = Field(None, description="Novo papel do usuário no sistema")
 
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "nome": "Novo Nome do Usuário",
                 "email": "novoemail@exemplo.com",
@@ -64,16 +66,16 @@ class UserUpdate(BaseModel):
                 "role": "user"
             }
         }
+    )
 
 class UserInDBBase(UserBase):
     """Schema base para usuários armazenados no banco de dados."""
     id: int
     ativo: bool
     data_criacao: datetime
-    data_atualizacao: datetime
+    data_atualizacao: Optional[datetime] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class User(UserInDBBase):
     """Schema para retorno de dados do usuário."""
@@ -84,17 +86,30 @@ class UserInDB(UserInDBBase):
     senha_hash: str
 
 class Token(BaseModel):
-    """Schema para o token de acesso JWT."""
+    """Schema para o par de tokens JWT (acesso e refresh)."""
     access_token: str
+    refresh_token: str
     token_type: str = "bearer"
+    expires_in: int = Field(..., description="Validade do token de acesso, em segundos")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "access_token": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9...",
-                "token_type": "bearer"
+                "refresh_token": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9...",
+                "token_type": "bearer",
+                "expires_in": 900
             }
         }
+    )
+
+class RefreshRequest(BaseModel):
+    """Schema para renovar o token de acesso."""
+    refresh_token: str = Field(..., min_length=1)
+
+class LogoutRequest(BaseModel):
+    """Schema para encerrar a sessão; o refresh token, se informado, também é revogado."""
+    refresh_token: Optional[str] = None
 
 class TokenData(BaseModel):
     """Schema para os dados armazenados no token JWT."""
@@ -107,10 +122,11 @@ class Login(BaseModel):
     email: EmailStr
     senha: str = Field(..., min_length=1, description="Senha do usuário")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "email": "usuario@exemplo.com",
                 "senha": "senhaSegura123"
             }
         }
+    )
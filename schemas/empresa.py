@@ -1,8 +1,8 @@
-from pydantic import BaseModel, Field, validator, EmailStr
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, field_validator, EmailStr
+from typing import List, Optional
 from datetime import datetime
 
-from ..validators import validar_cnpj, CNPJError
+from validators import validar_cnpj, CNPJError
 
 class EmpresaBase(BaseModel):
     """Schema base para Empresa, contendo campos comuns para criação e atualização."""
@@ -12,16 +12,17 @@ class EmpresaBase(BaseModel):
     email: EmailStr = Field(..., description="E-mail de contato da empresa")
     telefone: str = Field(..., min_length=10, max_length=15, description="Telefone de contato da empresa")
 
-    @validator('cnpj')
-    def cnpj_must_be_valid(cls, v):
+    @field_validator('cnpj')
+    @classmethod
+    def cnpj_must_be_valid(cls, v: str) -> str:
         """Valida se o CNPJ é válido."""
         if not validar_cnpj(v):
             raise ValueError('CNPJ inválido')
         # Retorna o CNPJ apenas com números
         return ''.join(filter(str.isdigit, v))
 
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "nome": "Empresa Exemplo Ltda",
                 "cnpj": "12345678000100",
@@ -30,6 +31,7 @@ class EmpresaBase(BaseModel):
                 "telefone": "11999998888"
             }
         }
+    )
 
 class EmpresaCreate(EmpresaBase):
     """Schema para criação de uma nova empresa."""
@@ -43,15 +45,16 @@ class EmpresaUpdate(BaseModel):
     email: Optional[EmailStr] = Field(None, description="E-mail de contato da empresa")
     telefone: Optional[str] = Field(None, min_length=10, max_length=15, description="Telefone de contato da empresa")
 
-    @validator('cnpj')
-    def cnpj_must_be_valid(cls, v):
+    @field_validator('cnpj')
+    @classmethod
+    def cnpj_must_be_valid(cls, v: Optional[str]) -> Optional[str]:
         """Valida se o CNPJ é válido (quando fornecido)."""
         if v is not None and not validar_cnpj(v):
             raise ValueError('CNPJ inválido')
         return v if v is None else ''.join(filter(str.isdigit, v))
 
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "nome": "Novo Nome da Empresa",
                 "endereco": "Novo Endereço, 456, Centro, Cidade - Estado",
@@ -59,16 +62,30 @@ class EmpresaUpdate(BaseModel):
                 "telefone": "11988887777"
             }
         }
+    )
 
-class EmpresaInDBBase(EmpresaBase):
-    """Schema base para leitura de uma empresa do banco de dados."""
+class EmpresaInDBBase(BaseModel):
+    """
+    Schema base para leitura de uma empresa do banco de dados.
+
+    Sem as restrições de entrada de EmpresaBase: o registro gravado é devolvido
+    como está, mesmo que anterior a uma regra mais rígida.
+    """
     id: int
+    nome: str
+    cnpj: str
+    endereco: str
+    email: str
+    telefone: str
+    usuario_id: int
     data_criacao: datetime
-    data_atualizacao: datetime
+    data_atualizacao: Optional[datetime] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class Empresa(EmpresaInDBBase):
     """Schema para retorno de uma empresa."""
     pass
+
+# Validação e serialização de listas inteiras em uma única chamada ao núcleo do Pydantic
+EmpresaList = TypeAdapter(List[Empresa])
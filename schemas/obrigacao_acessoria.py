@@ -1,8 +1,10 @@
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, field_validator
 from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+from .empresa import Empresa
+
 class Periodicidade(str, Enum):
     """Enum para os tipos de periodicidade de uma obrigação acessória."""
     DIARIA = "Diária"
@@ -23,18 +25,19 @@ class ObrigacaoAcessoriaBase(BaseModel):
     descricao: Optional[str] = Field(None, max_length=1000, description="Descrição detalhada da obrigação")
     data_vencimento: Optional[str] = Field(None, description="Data de vencimento no formato YYYY-MM-DD")
 
-    @validator('data_vencimento')
-    def validar_data_vencimento(cls, v):
+    @field_validator('data_vencimento')
+    @classmethod
+    def validar_data_vencimento(cls, v: Optional[str]) -> Optional[str]:
         """Valida o formato da data de vencimento."""
-        if v is not None:
+        if isinstance(v, str):
             try:
                 datetime.strptime(v, '%Y-%m-%d')
             except ValueError:
                 raise ValueError('Formato de data inválido. Use YYYY-MM-DD')
         return v
 
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "nome": "Declaração Mensal de Serviços",
                 "periodicidade": "Mensal",
@@ -43,6 +46,7 @@ class ObrigacaoAcessoriaBase(BaseModel):
                 "data_vencimento": "2023-12-31"
             }
         }
+    )
 
 class ObrigacaoAcessoriaCreate(ObrigacaoAcessoriaBase):
     """Schema para criação de uma nova obrigação acessória."""
@@ -55,18 +59,19 @@ class ObrigacaoAcessoriaUpdate(BaseModel):
     descricao: Optional[str] = Field(None, max_length=1000, description="Descrição detalhada da obrigação")
     data_vencimento: Optional[str] = Field(None, description="Data de vencimento no formato YYYY-MM-DD")
     
-    @validator('data_vencimento')
-    def validar_data_vencimento(cls, v):
+    @field_validator('data_vencimento')
+    @classmethod
+    def validar_data_vencimento(cls, v: Optional[str]) -> Optional[str]:
         """Valida o formato da data de vencimento."""
-        if v is not None:
+        if isinstance(v, str):
             try:
                 datetime.strptime(v, '%Y-%m-%d')
             except ValueError:
                 raise ValueError('Formato de data inválido. Use YYYY-MM-DD')
         return v
 
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "nome": "Declaração Anual de Serviços",
                 "periodicidade": "Anual",
@@ -74,15 +79,27 @@ class ObrigacaoAcessoriaUpdate(BaseModel):
                 "data_vencimento": "2023-12-31"
             }
         }
+    )
+
+class ObrigacaoAcessoriaInDBBase(BaseModel):
+    """
+    Schema base para leitura de uma obrigação acessória do banco de dados.
 
-class ObrigacaoAcessoriaInDBBase(ObrigacaoAcessoriaBase):
-    """Schema base para leitura de uma obrigação acessória do banco de dados."""
+    Sem as restrições de entrada de ObrigacaoAcessoriaBase: o registro gravado
+    é devolvido como está.
+    """
     id: int
+    nome: str
+    periodicidade: Periodicidade
+    empresa_id: int
+    descricao: Optional[str] = None
+    data_vencimento: Optional[datetime] = None
     data_criacao: datetime
-    data_atualizacao: datetime
+    data_atualizacao: Optional[datetime] = None
+    # Apenas nas obrigações listadas com arquivadas=true
+    data_arquivamento: Optional[datetime] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ObrigacaoAcessoria(ObrigacaoAcessoriaInDBBase):
     """Schema para retorno de uma obrigação acessória."""
@@ -90,5 +107,7 @@ class ObrigacaoAcessoria(ObrigacaoAcessoriaInDBBase):
 
 class ObrigacaoAcessoriaComEmpresa(ObrigacaoAcessoriaInDBBase):
     """Schema para retorno de uma obrigação acessória com informações da empresa."""
-    from .empresa import Empresa
     empresa: Empresa
+
+# Validação e serialização de listas inteiras em uma única chamada ao núcleo do Pydantic
+ObrigacaoAcessoriaList = TypeAdapter(List[ObrigacaoAcessoria])
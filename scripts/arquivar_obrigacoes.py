@@ -0,0 +1,36 @@
+"""
+Move para obrigacoes_acessorias_arquivo as obrigações com vencimento antigo.
+
+Por padrão arquiva o que venceu há mais de OBRIGACAO_ARCHIVE_AFTER_DAYS dias.
+Pode ser executado periodicamente (cron); cada lote é uma transação curta, e
+a API continua atendendo durante a movimentação.
+
+Uso:
+    python -m scripts.arquivar_obrigacoes [--antes-de 2024-01-01] [--lote 10000]
+"""
+from datetime import datetime, timezone
+import argparse
+
+from core.arquivo import arquivar_obrigacoes, limite_arquivamento
+from core.invalidation import OBRIGACOES_ACESSORIAS, invalidation_bus
+from database import SessionLocal
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--antes-de", type=datetime.fromisoformat, default=None,
+                        help="arquiva vencimentos anteriores a esta data (YYYY-MM-DD)")
+    parser.add_argument("--lote", type=int, default=10_000)
+    args = parser.parse_args()
+
+    limite = args.antes_de.replace(tzinfo=timezone.utc) if args.antes_de else limite_arquivamento()
+    with SessionLocal() as db:
+        total = arquivar_obrigacoes(db, limite, args.lote)
+    if total:
+        # Descarta o resumo em cache nos workers
+        invalidation_bus.publish(OBRIGACOES_ACESSORIAS)
+    print(f"Obrigações arquivadas (vencimento antes de {limite:%Y-%m-%d}): {total}")
+
+
+if __name__ == "__main__":
+    main()
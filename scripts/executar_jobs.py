@@ -0,0 +1,44 @@
+"""
+Executa os jobs da fila (tabela jobs) fora dos workers da API.
+
+Útil para tirar as importações e exportações dos processos que atendem
+requisições: rode com JOBS_ENABLED=false na API e este script em uma ou mais
+máquinas. Cada instância reserva os jobs pelo banco, sem coordenação extra.
+
+Uso:
+    python -m scripts.executar_jobs [--threads 2]
+"""
+import argparse
+import signal
+import threading
+
+from config.settings import settings
+from core.jobs import JobRunner, encerrar_pool
+from core.log_config import setup_logging
+import core.tarefas  # registra as tarefas dos jobs
+import models
+from database import engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=settings.JOB_THREADS)
+    args = parser.parse_args()
+
+    setup_logging()
+    models.Base.metadata.create_all(bind=engine)
+
+    parar = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: parar.set())
+    signal.signal(signal.SIGINT, lambda *_: parar.set())
+
+    runner = JobRunner(args.threads, settings.JOB_POLL_INTERVAL, settings.JOB_LEASE_SECONDS)
+    runner.start()
+    print(f"Executando jobs como {runner.nome} com {args.threads} threads")
+    parar.wait()
+    runner.stop()
+    encerrar_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+Exporta empresas, obrigações e a junção das duas em Parquet (ou Arrow IPC).
+
+Lê da primeira réplica configurada (ou dos leitores do SQLite ajustado), se
+houver, e grava em EXPORT_DIR, de onde os arquivos são servidos por
+GET /admin/exportacoes/{arquivo}. Pode ser executado periodicamente (cron).
+
+Uso:
+    python -m scripts.exportar [--formato parquet|arrow] [--diretorio DIR] [--lote 50000]
+"""
+import argparse
+
+from config.settings import settings
+from core.exportacao import FORMATOS, exportar
+from database import read_engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--formato", choices=sorted(FORMATOS), default="parquet")
+    parser.add_argument("--diretorio", default=settings.EXPORT_DIR)
+    parser.add_argument("--lote", type=int, default=settings.EXPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    for arquivo in exportar(read_engine(), args.diretorio, args.formato, args.lote):
+        print(f"{arquivo['arquivo']}: {arquivo['linhas']} linhas, {arquivo['bytes']} bytes em {arquivo['segundos']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Gera dados sintéticos de usuários, empresas e obrigações acessórias para testes de escala.
+
+Os CNPJs são válidos (dígitos verificadores de validators.calcular_digitos_cnpj)
+e únicos; periodicidades e vencimentos seguem uma distribuição próxima da
+real. Para uma mesma semente, data de referência e parâmetros (e o mesmo
+estado inicial do banco) o resultado é idêntico.
+
+A carga usa COPY no PostgreSQL (psycopg2) e executemany nos demais bancos, em
+lotes, com ids atribuídos aqui (a partir do maior id existente). Ao final a
+tabela resumo_obrigacoes é reconstruída. As linhas não entram no feed de
+alterações: reinicie os workers para que o catálogo em memória as carregue.
+
+Uso:
+    python -m scripts.gerar_dados [--url URL] [--usuarios 10000] [--empresas-por-usuario 5]
+        [--obrigacoes-por-empresa 8] [--semente 42] [--data-referencia 2024-01-01] [--lote 20000]
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+import argparse
+import csv
+import io
+import random
+import time
+
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from core.resumo import reconstruir_resumo
+from core.auth import get_password_hash
+from models import Base, Empresa, ObrigacaoAcessoria, PeriodicidadeEnum, Usuario
+from validators import calcular_digitos_cnpj
+
+# Pesos aproximados das periodicidades no cadastro real
+PERIODICIDADES = {
+    PeriodicidadeEnum.MENSAL: 45,
+    PeriodicidadeEnum.ANUAL: 20,
+    PeriodicidadeEnum.TRIMESTRAL: 10,
+    PeriodicidadeEnum.EVENTUAL: 8,
+    PeriodicidadeEnum.SEMESTRAL: 5,
+    PeriodicidadeEnum.BIMESTRAL: 4,
+    PeriodicidadeEnum.QUINZENAL: 4,
+    PeriodicidadeEnum.SEMANAL: 3,
+    PeriodicidadeEnum.DIARIA: 1,
+}
+
+# Intervalo entre vencimentos, em dias
+PERIODOS = {
+    PeriodicidadeEnum.DIARIA: 1,
+    PeriodicidadeEnum.SEMANAL: 7,
+    PeriodicidadeEnum.QUINZENAL: 15,
+    PeriodicidadeEnum.MENSAL: 30,
+    PeriodicidadeEnum.BIMESTRAL: 60,
+    PeriodicidadeEnum.TRIMESTRAL: 90,
+    PeriodicidadeEnum.SEMESTRAL: 180,
+    PeriodicidadeEnum.ANUAL: 365,
+    PeriodicidadeEnum.EVENTUAL: 365,
+}
+
+OBRIGACOES = ["DCTF", "EFD-Contribuições", "EFD ICMS/IPI", "ECD", "ECF", "DIRF", "RAIS",
+              "DEFIS", "GIA", "DeSTDA", "eSocial", "EFD-Reinf", "DIMOB", "DMED", "SPED Fiscal"]
+RAMOS = ["Comércio", "Indústria", "Serviços", "Tecnologia", "Transportes", "Construtora",
+         "Distribuidora", "Consultoria", "Alimentos", "Logística", "Agropecuária", "Farmácia"]
+NOMES = ["Silva", "Souza", "Oliveira", "Santos", "Pereira", "Lima", "Carvalho", "Ferreira",
+         "Rodrigues", "Almeida", "Costa", "Gomes", "Martins", "Araújo", "Barbosa", "Ribeiro"]
+SUFIXOS = ["Ltda", "S.A.", "ME", "EIRELI", "EPP"]
+RUAS = ["Rua das Flores", "Avenida Brasil", "Rua São João", "Avenida Paulista", "Rua XV de Novembro",
+        "Rua Sete de Setembro", "Avenida Getúlio Vargas", "Rua Amazonas", "Rua da Independência"]
+CIDADES = [("São Paulo", "SP", "11"), ("Rio de Janeiro", "RJ", "21"), ("Belo Horizonte", "MG", "31"),
+           ("Curitiba", "PR", "41"), ("Porto Alegre", "RS", "51"), ("Salvador", "BA", "71"),
+           ("Recife", "PE", "81"), ("Fortaleza", "CE", "85"), ("Goiânia", "GO", "62")]
+
+
+class Gerador:
+    """
+    Gera as linhas das três tabelas de forma determinística a partir da semente.
+
+    Attributes:
+        referencia: Data a partir da qual os vencimentos são sorteados
+        raizes_usadas: Raízes de CNPJ já usadas (inclusive as que já estão no banco)
+    """
+
+    def __init__(self, semente: int, referencia: datetime, raizes_usadas: set):
+        self.rng = random.Random(semente)
+        self.referencia = referencia
+        self.raizes_usadas = raizes_usadas
+        self._periodicidades = list(PERIODICIDADES)
+        self._pesos = list(PERIODICIDADES.values())
+
+    def quantidade(self, media: float) -> int:
+        """Quantidade de filhos com a média dada: muitos com poucos registros, alguns com muitos."""
+        if media <= 0:
+            return 0
+        return int(self.rng.expovariate(1 / (media + 0.5)))
+
+    def cnpj(self) -> str:
+        """CNPJ válido com raiz ainda não usada."""
+        while True:
+            raiz = f"{self.rng.randrange(1, 10 ** 8):08d}"
+            if raiz not in self.raizes_usadas:
+                self.raizes_usadas.add(raiz)
+                break
+        base = raiz + ("0001" if self.rng.random() < 0.9 else f"{self.rng.randrange(2, 50):04d}")
+        return base + calcular_digitos_cnpj(base)
+
+    def usuario(self, usuario_id: int, senha_hash: str) -> Dict:
+        nome = f"{self.rng.choice(NOMES)} {self.rng.choice(NOMES)}"
+        return {"id": usuario_id, "nome": nome, "email": f"usuario{usuario_id}@exemplo.com",
+                "senha_hash": senha_hash, "ativo": self.rng.random() < 0.95}
+
+    def empresa(self, empresa_id: int, usuario_id: int) -> Dict:
+        cidade, uf, ddd = self.rng.choice(CIDADES)
+        nome = f"{self.rng.choice(RAMOS)} {self.rng.choice(NOMES)} {self.rng.choice(SUFIXOS)}"
+        return {
+            "id": empresa_id,
+            "nome": nome,
+            "cnpj": self.cnpj(),
+            "endereco": f"{self.rng.choice(RUAS)}, {self.rng.randrange(1, 5000)}, {cidade} - {uf}",
+            "email": f"contato{empresa_id}@empresa{empresa_id}.com.br",
+            "telefone": f"{ddd}9{self.rng.randrange(10 ** 7, 10 ** 8)}",
+            "usuario_id": usuario_id,
+        }
+
+    def vencimento(self, periodicidade: PeriodicidadeEnum) -> Optional[datetime]:
+        """Próximo vencimento dentro de um período; parte já vencida e parte sem data."""
+        sorteio = self.rng.random()
+        if (periodicidade == PeriodicidadeEnum.EVENTUAL and sorteio < 0.5) or sorteio < 0.03:
+            return None
+        dias = self.rng.randrange(PERIODOS[periodicidade])
+        if sorteio < 0.15:
+            dias = -1 - self.rng.randrange(60)  # vencidas
+        return self.referencia + timedelta(days=dias, hours=23, minutes=59, seconds=59)
+
+    def obrigacao(self, obrigacao_id: int, empresa_id: int) -> Dict:
+        periodicidade = self.rng.choices(self._periodicidades, self._pesos)[0]
+        return {
+            "id": obrigacao_id,
+            "nome": self.rng.choice(OBRIGACOES),
+            "descricao": None,
+            "periodicidade": periodicidade,
+            "data_vencimento": self.vencimento(periodicidade),
+            "empresa_id": empresa_id,
+        }
+
+
+def _valor_copy(valor):
+    if isinstance(valor, PeriodicidadeEnum):
+        return valor.name  # o Enum do SQLAlchemy grava o nome do membro
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
+
+
+def carregar(conn, tabela, linhas: List[Dict]) -> None:
+    """Grava um lote: COPY no PostgreSQL com psycopg2, executemany nos demais."""
+    if not linhas:
+        return
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2":
+        colunas = list(linhas[0])
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for linha in linhas:
+            writer.writerow([_valor_copy(linha[coluna]) for coluna in colunas])
+        buffer.seek(0)
+        cursor = conn.connection.cursor()
+        cursor.copy_expert(f"COPY {tabela.name} ({', '.join(colunas)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    else:
+        conn.execute(insert(tabela), linhas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=settings.DATABASE_URL, help="URL do banco de destino")
+    parser.add_argument("--usuarios", type=int, default=10_000)
+    parser.add_argument("--empresas-por-usuario", type=float, default=5.0)
+    parser.add_argument("--obrigacoes-por-empresa", type=float, default=8.0)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--data-referencia", type=datetime.fromisoformat, default=None,
+                        help="base dos vencimentos (YYYY-MM-DD); padrão: hoje")
+    parser.add_argument("--lote", type=int, default=20_000, help="linhas por lote gravado")
+    parser.add_argument("--senha", default="senha123", help="senha de todos os usuários gerados")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    Base.metadata.create_all(engine)
+
+    with engine.connect() as conn:
+        ultimo_id = {
+            modelo: conn.scalar(select(func.coalesce(func.max(modelo.id), 0)))
+            for modelo in (Usuario, Empresa, ObrigacaoAcessoria)
+        }
+        raizes_usadas = set(conn.scalars(select(func.substr(Empresa.cnpj, 1, 8))))
+
+    # Com a mesma data de referência e a mesma semente os dados gerados são idênticos
+    referencia = (args.data_referencia or datetime.now()).replace(
+        hour=0, minute=0, second=0, microsecond=0, tzinfo=timezone.utc
+    )
+    gerador = Gerador(args.semente, referencia, raizes_usadas)
+    # bcrypt é lento de propósito: um único hash serve para todos os usuários
+    senha_hash = get_password_hash(args.senha)
+
+    tabelas = [Usuario.__table__, Empresa.__table__, ObrigacaoAcessoria.__table__]
+    lotes = {tabela: [] for tabela in tabelas}
+    totais = {tabela: 0 for tabela in tabelas}
+    proximo_id = {modelo.__table__: valor + 1 for modelo, valor in ultimo_id.items()}
+    inicio = time.perf_counter()
+
+    def gravar():
+        # Na ordem das chaves estrangeiras, em uma transação por lote
+        with engine.begin() as conn:
+            for tabela in tabelas:
+                carregar(conn, tabela, lotes[tabela])
+                totais[tabela] += len(lotes[tabela])
+                lotes[tabela] = []
+        print(f"{totais[tabelas[0]]} usuários, {totais[tabelas[1]]} empresas, "
+              f"{totais[tabelas[2]]} obrigações ({time.perf_counter() - inicio:.1f}s)")
+
+    def novo_id(tabela) -> int:
+        valor = proximo_id[tabela]
+        proximo_id[tabela] += 1
+        return valor
+
+    for _ in range(args.usuarios):
+        usuario_id = novo_id(Usuario.__table__)
+        lotes[Usuario.__table__].append(gerador.usuario(usuario_id, senha_hash))
+        for _ in range(gerador.quantidade(args.empresas_por_usuario)):
+            empresa_id = novo_id(Empresa.__table__)
+            lotes[Empresa.__table__].append(gerador.empresa(empresa_id, usuario_id))
+            for _ in range(gerador.quantidade(args.obrigacoes_por_empresa)):
+                lotes[ObrigacaoAcessoria.__table__].append(
+                    gerador.obrigacao(novo_id(ObrigacaoAcessoria.__table__), empresa_id)
+                )
+        if sum(len(linhas) for linhas in lotes.values()) >= args.lote:
+            gravar()
+    gravar()
+
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Os ids foram atribuídos aqui: avança as sequências das chaves primárias
+            for tabela in tabelas:
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{tabela.name}', 'id'), "
+                    f"(SELECT COALESCE(MAX(id), 1) FROM {tabela.name}))"
+                ))
+    with Session(engine) as db:
+        reconstruir_resumo(db)
+        db.commit()
+
+    print(f"Concluído em {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""
+Reconstrói a tabela resumo_obrigacoes a partir de obrigacoes_acessorias.
+
+Use após cargas feitas fora da API ou se houver suspeita de divergência nos
+contadores do dashboard.
+
+Uso:
+    python -m scripts.rebuild_resumo
+"""
+from core.invalidation import OBRIGACOES_ACESSORIAS, invalidation_bus
+from core.resumo import reconstruir_resumo
+from database import SessionLocal
+
+
+def main():
+    with SessionLocal() as db:
+        linhas = reconstruir_resumo(db)
+        db.commit()
+    # Descarta o resumo em cache nos workers
+    invalidation_bus.publish(OBRIGACOES_ACESSORIAS)
+    print(f"Resumo reconstruído: {linhas} linhas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Confere com EXPLAIN que cada combinação de filtros e ordenação das listagens usa um índice.
+
+As consultas são montadas pelas mesmas funções usadas pelos endpoints
+(core/filtros.py). No SQLite uma linha "SCAN <tabela>" sem índice é falha; no
+PostgreSQL a verificação roda com enable_seqscan desligado (tabelas pequenas
+seriam lidas sequencialmente de qualquer forma) e falha se restar um Seq Scan.
+Ordenações feitas em memória são apenas informadas.
+
+Uso:
+    python -m scripts.verificar_indices [--url URL]
+
+Sai com código 1 se alguma combinação não usar índice.
+"""
+from datetime import datetime
+import argparse
+import sys
+
+from sqlalchemy import create_engine, select
+
+from config.settings import settings
+from core.filtros import (ORDENAVEIS_EMPRESAS, ORDENAVEIS_OBRIGACOES, filtros_empresa, filtros_obrigacao,
+                          ordenacao)
+from models import Base, Empresa, ObrigacaoAcessoria
+
+MARCO = {"vencimento_de": datetime(2024, 3, 1), "vencimento_antes_de": datetime(2024, 4, 1)}
+
+# (descrição, filtros de obrigação, sort)
+COMBINACOES_OBRIGACOES = [
+    ("empresa", {"empresa_id": [42]}, None),
+    ("várias empresas", {"empresa_id": [1, 2, 3]}, None),
+    ("empresa + vencimento", {"empresa_id": [42], **MARCO}, None),
+    ("empresa + vencimento, sort=data_vencimento", {"empresa_id": [42], **MARCO}, "data_vencimento"),
+    ("empresa + periodicidade + vencimento", {"empresa_id": [42], "periodicidade": ["Mensal"], **MARCO}, None),
+    ("empresa, sort=-data_vencimento", {"empresa_id": [42]}, "-data_vencimento"),
+    ("periodicidade", {"periodicidade": ["Mensal"]}, None),
+    ("periodicidade + vencimento", {"periodicidade": ["Mensal"], **MARCO}, None),
+    ("vencimento", MARCO, None),
+    ("vencimento, sort=data_vencimento", MARCO, "data_vencimento"),
+    ("nome", {"nome": "DCTF"}, None),
+    ("nome, sort=nome", {"nome": "DCTF"}, "nome"),
+    ("sort=data_vencimento", {}, "data_vencimento"),
+    ("sort=-nome", {}, "-nome"),
+    ("sort=empresa_id", {}, "empresa_id"),
+]
+
+# (descrição, usuario_id, prefixo do nome, sort)
+COMBINACOES_EMPRESAS = [
+    ("usuário", 1, None, None),
+    ("usuário + nome", 1, "Comércio", None),
+    ("usuário, sort=nome", 1, None, "nome"),
+    ("usuário + nome, sort=-nome", 1, "Comércio", "-nome"),
+    ("admin: nome", None, "Comércio", None),
+    ("admin: sort=nome", None, None, "nome"),
+]
+
+
+def consultas(dialeto: str):
+    for descricao, filtros, sort in COMBINACOES_OBRIGACOES:
+        yield f"obrigações: {descricao}", (
+            select(ObrigacaoAcessoria)
+            .where(*filtros_obrigacao(ObrigacaoAcessoria, dialeto, **filtros))
+            .order_by(*ordenacao(ObrigacaoAcessoria, sort, ORDENAVEIS_OBRIGACOES))
+            .limit(100)
+        )
+    for descricao, usuario_id, nome, sort in COMBINACOES_EMPRESAS:
+        consulta = select(Empresa).where(*filtros_empresa(dialeto, nome))
+        if usuario_id is not None:
+            consulta = consulta.where(Empresa.usuario_id == usuario_id)
+        yield f"empresas: {descricao}", (
+            consulta.order_by(*ordenacao(Empresa, sort, ORDENAVEIS_EMPRESAS)).limit(100)
+        )
+
+
+def plano(conn, consulta) -> list:
+    sql = str(consulta.compile(conn, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "postgresql":
+        return [linha[0] for linha in conn.exec_driver_sql("EXPLAIN " + sql, {})]
+    return [linha[-1] for linha in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+
+
+def verificar(dialeto: str, linhas: list) -> bool:
+    if dialeto == "postgresql":
+        return not any("Seq Scan" in linha for linha in linhas)
+    return not any(linha.startswith("SCAN") and "USING" not in linha for linha in linhas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=settings.DATABASE_URL, help="URL do banco a verificar")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    Base.metadata.create_all(engine)
+    dialeto = engine.dialect.name
+
+    falhas = 0
+    with engine.connect() as conn:
+        if dialeto == "postgresql":
+            conn.exec_driver_sql("SET enable_seqscan = off")
+        for descricao, consulta in consultas(dialeto):
+            linhas = plano(conn, consulta)
+            ok = verificar(dialeto, linhas)
+            falhas += not ok
+            em_memoria = any("TEMP B-TREE" in linha or linha.strip().startswith("Sort") for linha in linhas)
+            print(f"[{'ok' if ok else 'FALHA'}] {descricao}{' (ordenação em memória)' if em_memoria else ''}")
+            if not ok:
+                print("\n".join(f"    {linha}" for linha in linhas))
+
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Configuração dos testes: a API roda contra um SQLite temporário.
+
+As variáveis de ambiente são definidas antes de importar main, que lê
+config.settings e cria as tabelas na importação.
+"""
+from types import SimpleNamespace
+import itertools
+import os
+import sys
+import tempfile
+
+_DIRETORIO = tempfile.mkdtemp(prefix="testes_empresas_")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_DIRETORIO, 'testes.db')}",
+    "CACHE_INVALIDATION_PATH": os.path.join(_DIRETORIO, "invalidacao"),
+    "EXPORT_DIR": os.path.join(_DIRETORIO, "exportacoes"),
+    "JOBS_ENABLED": "false",
+    "WARMUP_ENABLED": "false",
+    "RATE_LIMITS": "{}",
+    "RATE_LIMIT_DEFAULT": "[100000, 100000]",
+    "LOG_LEVEL": "CRITICAL",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from core.auth import create_token_pair, get_password_hash
+from models import Usuario
+from validators import calcular_digitos_cnpj
+
+_sequencia = itertools.count(1)
+
+
+def gerar_cnpj() -> str:
+    """CNPJ válido e ainda não usado nos testes."""
+    base = f"{next(_sequencia):012d}"
+    return base + calcular_digitos_cnpj(base)
+
+
+def criar_usuario(role: str = "user", senha: str = None) -> SimpleNamespace:
+    """Grava um usuário e emite os seus tokens; o hash da senha só é calculado se `senha` for informada."""
+    numero = next(_sequencia)
+    with main.SessionLocal() as db:
+        usuario = Usuario(nome=f"Usuário {numero}", email=f"usuario{numero}@exemplo.com",
+                          senha_hash=get_password_hash(senha) if senha else "x", role=role, ativo=True)
+        db.add(usuario)
+        db.commit()
+        tokens = create_token_pair(usuario)
+        return SimpleNamespace(
+            id=usuario.id,
+            email=usuario.email,
+            senha=senha,
+            refresh_token=tokens["refresh_token"],
+            headers={"Authorization": f"Bearer {tokens['access_token']}"},
+        )
+
+
+def dados_empresa(cnpj: str = None, **campos) -> dict:
+    return {"nome": "Empresa Teste", "cnpj": cnpj or gerar_cnpj(), "endereco": "Rua Exemplo, 123",
+            "email": "contato@exemplo.com", "telefone": "11999998888", **campos}
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as cliente:
+        yield cliente
+
+
+@pytest.fixture
+def usuario():
+    return criar_usuario()
+
+
+@pytest.fixture
+def outro_usuario():
+    return criar_usuario()
+
+
+@pytest.fixture
+def admin():
+    return criar_usuario("admin")
+
+
+@pytest.fixture
+def empresa(client, usuario):
+    """Empresa do `usuario`, como devolvida pela busca por CNPJ."""
+    dados = dados_empresa()
+    assert client.post("/empresa", json=dados, headers=usuario.headers).status_code == 201
+    return client.get(f"/empresa/cnpj/{dados['cnpj']}", headers=usuario.headers).json()
+
+
+@pytest.fixture
+def obrigacao(client, usuario, empresa):
+    """Obrigação da `empresa` do `usuario`."""
+    dados = {"nome": "DCTF", "periodicidade": "Mensal", "empresa_id": empresa["id"]}
+    assert client.post("/obrigacaoAcessoria", json=dados, headers=usuario.headers).status_code == 201
+    obrigacoes = client.get("/obrigacaoAcessoria", params={"empresa_id": empresa["id"]},
+                            headers=usuario.headers).json()
+    return obrigacoes[-1]
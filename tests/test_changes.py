@@ -0,0 +1,48 @@
+"""Cursor do feed GET /changes, com os tombstones das exclusões."""
+from conftest import dados_empresa
+
+
+def _ler_tudo(client, headers, since=0, limit=2):
+    """Percorre o feed em páginas de `limit`, como um cliente que guarda o cursor."""
+    alteracoes = []
+    while True:
+        pagina = client.get("/changes", params={"since": since, "limit": limit}, headers=headers).json()
+        alteracoes += pagina["changes"]
+        since = pagina["next_cursor"]
+        if not pagina["has_more"]:
+            return alteracoes, since
+
+
+def test_exclusoes_aparecem_como_tombstones_depois_do_cursor(client, usuario, empresa, obrigacao):
+    alteracoes, cursor = _ler_tudo(client, usuario.headers)
+    cursores = [a["cursor"] for a in alteracoes]
+    assert cursores == sorted(cursores) and len(set(cursores)) == len(cursores)
+    assert ("obrigacoes_acessorias", obrigacao["id"], "create") in \
+        [(a["tabela"], a["id"], a["operacao"]) for a in alteracoes]
+
+    # Excluir a empresa gera os tombstones da obrigação (removida junto) e da empresa
+    assert client.delete(f"/empresa/{empresa['id']}", headers=usuario.headers).status_code == 204
+    novas, _ = _ler_tudo(client, usuario.headers, since=cursor)
+    assert [(a["tabela"], a["id"], a["operacao"], a["dados"]) for a in novas] == [
+        ("obrigacoes_acessorias", obrigacao["id"], "delete", None),
+        ("empresas", empresa["id"], "delete", None),
+    ]
+    assert all(a["cursor"] > cursor for a in novas)
+
+
+def test_criacao_excluida_depois_vem_sem_dados(client, usuario, empresa):
+    _, cursor = _ler_tudo(client, usuario.headers)
+    dados = dados_empresa()
+    client.post("/empresa", json=dados, headers=usuario.headers)
+    criada = client.get(f"/empresa/cnpj/{dados['cnpj']}", headers=usuario.headers).json()
+    client.delete(f"/empresa/{criada['id']}", headers=usuario.headers)
+
+    novas, _ = _ler_tudo(client, usuario.headers, since=cursor)
+    assert [(a["operacao"], a["dados"]) for a in novas] == [("create", None), ("delete", None)]
+
+
+def test_tombstones_de_outro_usuario_nao_aparecem(client, usuario, outro_usuario, empresa):
+    _, cursor = _ler_tudo(client, outro_usuario.headers)
+    client.delete(f"/empresa/{empresa['id']}", headers=usuario.headers)
+    novas, proximo = _ler_tudo(client, outro_usuario.headers, since=cursor)
+    assert novas == [] and proximo == cursor
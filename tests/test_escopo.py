@@ -0,0 +1,103 @@
+"""Cada usuário acessa apenas as próprias empresas, obrigações, alterações e jobs; o administrador, todos."""
+import pytest
+
+from conftest import dados_empresa
+
+
+@pytest.mark.parametrize("metodo, rota", [
+    ("GET", "/empresas"),
+    ("GET", "/empresa/1"),
+    ("GET", "/empresa/cnpj/11222333000181"),
+    ("POST", "/empresa"),
+    ("PUT", "/empresa/1"),
+    ("DELETE", "/empresa/1"),
+    ("DELETE", "/empresas?nome=Empresa"),
+    ("GET", "/obrigacaoAcessoria"),
+    ("GET", "/obrigacaoAcessoria/1"),
+    ("POST", "/obrigacaoAcessoria"),
+    ("DELETE", "/obrigacaoAcessoria/1"),
+    ("GET", "/changes"),
+    ("GET", "/relatorios/resumo"),
+    ("GET", "/jobs/1"),
+    ("GET", "/notificacoes/vencimentos"),
+])
+def test_rotas_exigem_autenticacao(client, metodo, rota):
+    assert client.request(metodo, rota).status_code == 401
+
+
+def test_empresa_de_outro_usuario_nao_e_encontrada(client, outro_usuario, empresa):
+    headers = outro_usuario.headers
+    assert client.get(f"/empresa/{empresa['id']}", headers=headers).status_code == 404
+    assert client.get(f"/empresa/cnpj/{empresa['cnpj']}", headers=headers).status_code == 404
+    assert client.put(f"/empresa/{empresa['id']}", json=dados_empresa(empresa["cnpj"]),
+                      headers=headers).status_code == 404
+    assert client.delete(f"/empresa/{empresa['id']}", headers=headers).status_code == 404
+    assert client.delete("/empresas", params={"cnpj": empresa["cnpj"]}, headers=headers).json() == {"excluidas": 0}
+    dados = {k: v for k, v in dados_empresa().items() if k != "cnpj"}
+    assert client.put(f"/empresa/cnpj/{empresa['cnpj']}", json=dados, headers=headers).status_code == 403
+    assert empresa["id"] not in [e["id"] for e in client.get("/empresas", headers=headers).json()]
+
+
+def test_listagem_de_empresas_mostra_apenas_as_do_usuario(client, usuario, outro_usuario, empresa):
+    client.post("/empresa", json=dados_empresa(), headers=outro_usuario.headers)
+    empresas = client.get("/empresas", headers=usuario.headers).json()
+    assert {e["usuario_id"] for e in empresas} == {usuario.id}
+    assert empresa["id"] in [e["id"] for e in empresas]
+
+
+def test_listagem_administrativa(client, usuario, admin, empresa):
+    assert client.get("/admin/empresas", headers=usuario.headers).status_code == 403
+    empresas = client.get("/admin/empresas", params={"usuario_id": usuario.id}, headers=admin.headers).json()
+    assert [e["id"] for e in empresas] == [empresa["id"]]
+    assert client.get(f"/empresa/{empresa['id']}", headers=admin.headers).status_code == 200
+    assert client.get(f"/empresa/cnpj/{empresa['cnpj']}", headers=admin.headers).status_code == 200
+
+
+def test_obrigacao_de_outro_usuario_nao_e_encontrada(client, outro_usuario, empresa, obrigacao):
+    headers = outro_usuario.headers
+    dados = {"nome": "DCTF", "periodicidade": "Mensal", "empresa_id": empresa["id"]}
+    assert client.get(f"/obrigacaoAcessoria/{obrigacao['id']}", headers=headers).status_code == 404
+    assert client.put(f"/obrigacaoAcessoria/{obrigacao['id']}", json=dados, headers=headers).status_code == 404
+    assert client.delete(f"/obrigacaoAcessoria/{obrigacao['id']}", headers=headers).status_code == 404
+    assert client.post("/obrigacaoAcessoria", json=dados, headers=headers).status_code == 422
+    assert client.get("/obrigacaoAcessoria", params={"empresa_id": empresa["id"]}, headers=headers).json() == []
+
+
+def test_obrigacao_nao_pode_ser_movida_para_empresa_de_outro_usuario(client, usuario, outro_usuario, obrigacao):
+    dados = dados_empresa()
+    client.post("/empresa", json=dados, headers=outro_usuario.headers)
+    alheia = client.get(f"/empresa/cnpj/{dados['cnpj']}", headers=outro_usuario.headers).json()
+    movida = {"nome": "DCTF", "periodicidade": "Mensal", "empresa_id": alheia["id"]}
+    assert client.put(f"/obrigacaoAcessoria/{obrigacao['id']}", json=movida,
+                      headers=usuario.headers).status_code == 422
+
+
+def test_administrador_ve_obrigacoes_de_todos(client, admin, empresa, obrigacao):
+    obrigacoes = client.get("/obrigacaoAcessoria", params={"empresa_id": empresa["id"]}, headers=admin.headers).json()
+    assert [o["id"] for o in obrigacoes] == [obrigacao["id"]]
+
+
+def test_feed_de_alteracoes_por_usuario(client, usuario, outro_usuario, empresa):
+    def empresas_no_feed(headers):
+        alteracoes = client.get("/changes", headers=headers).json()["changes"]
+        return {a["id"] for a in alteracoes if a["tabela"] == "empresas"}
+
+    assert empresa["id"] in empresas_no_feed(usuario.headers)
+    assert empresa["id"] not in empresas_no_feed(outro_usuario.headers)
+
+
+def test_resumo_por_empresa_do_usuario(client, usuario, outro_usuario, admin, empresa, obrigacao):
+    assert client.get("/relatorios/resumo", headers=usuario.headers).status_code == 403
+    assert client.get("/relatorios/resumo", params={"empresa_id": empresa["id"]},
+                      headers=outro_usuario.headers).status_code == 404
+    assert client.get("/relatorios/resumo", params={"empresa_id": empresa["id"]},
+                      headers=usuario.headers).status_code == 200
+    assert client.get("/relatorios/resumo", headers=admin.headers).status_code == 200
+
+
+def test_job_de_outro_usuario_nao_e_encontrado(client, usuario, outro_usuario):
+    resposta = client.post("/jobs/importacoes", json=[dados_empresa()], headers=usuario.headers)
+    job_id = resposta.json()["id"]
+    assert client.get(f"/jobs/{job_id}", headers=usuario.headers).status_code == 200
+    assert client.get(f"/jobs/{job_id}", headers=outro_usuario.headers).status_code == 404
+    assert client.post(f"/jobs/{job_id}/cancelar", headers=outro_usuario.headers).status_code == 404
@@ -0,0 +1,56 @@
+"""Isolamento das falhas por linha em core.group_commit.gravar_lote."""
+from sqlalchemy import select
+
+import main
+from conftest import dados_empresa
+from core.exceptions import AppError, ConflictError
+from core.group_commit import erro_empresa, erro_obrigacao, gravar_lote, inserir_empresas, inserir_obrigacoes
+from models import Alteracao, Empresa
+
+
+def _linha_empresa(usuario, **campos):
+    return {**dados_empresa(**campos), "usuario_id": usuario.id}
+
+
+def test_lote_sem_falhas_grava_tudo_em_um_commit(usuario):
+    linhas = [_linha_empresa(usuario) for _ in range(3)]
+    with main.SessionLocal() as db:
+        ids = gravar_lote(db, linhas, inserir_empresas, erro_empresa)
+        assert [db.get(Empresa, empresa_id).cnpj for empresa_id in ids] == [linha["cnpj"] for linha in linhas]
+
+
+def test_cnpj_duplicado_falha_so_na_propria_linha(usuario):
+    existente = _linha_empresa(usuario)
+    with main.SessionLocal() as db:
+        gravar_lote(db, [existente], inserir_empresas, erro_empresa)
+
+        linhas = [_linha_empresa(usuario), _linha_empresa(usuario, cnpj=existente["cnpj"]), _linha_empresa(usuario)]
+        resultados = gravar_lote(db, linhas, inserir_empresas, erro_empresa)
+
+        assert isinstance(resultados[1], ConflictError)
+        assert resultados[1].details == {"cnpj": existente["cnpj"]}
+        gravadas = [resultados[0], resultados[2]]
+        assert all(isinstance(empresa_id, int) for empresa_id in gravadas)
+        assert db.scalars(select(Empresa.cnpj).where(Empresa.id.in_(gravadas))).all() == \
+            [linhas[0]["cnpj"], linhas[2]["cnpj"]]
+        # O feed só registra as linhas gravadas
+        registradas = db.scalars(select(Alteracao.registro_id).where(
+            Alteracao.tabela == "empresas", Alteracao.registro_id.in_(gravadas))).all()
+        assert sorted(registradas) == sorted(gravadas)
+
+
+def test_falha_que_nao_e_de_restricao_fica_na_linha(usuario, empresa):
+    linhas = [
+        {"nome": "DCTF", "periodicidade": "Mensal", "empresa_id": empresa["id"]},
+        {"nome": "ECD", "periodicidade": "Quando der", "empresa_id": empresa["id"]},
+        {"nome": "ECF", "periodicidade": "Anual", "empresa_id": 10 ** 9},
+    ]
+    with main.SessionLocal() as db:
+        resultados = gravar_lote(db, linhas, inserir_obrigacoes, erro_obrigacao)
+
+    assert isinstance(resultados[0], int)
+    # Valor inválido: a própria exceção, não o erro de restrição
+    assert isinstance(resultados[1], Exception) and not isinstance(resultados[1], AppError)
+    # Chave estrangeira inexistente: o erro de `erro_obrigacao`
+    assert isinstance(resultados[2], AppError)
+    assert resultados[2].details == {"empresa_id": 10 ** 9}
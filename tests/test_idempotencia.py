@@ -0,0 +1,49 @@
+"""Repetições de POST com o mesmo Idempotency-Key (core.idempotency)."""
+from conftest import dados_empresa
+
+
+def _empresas(client, usuario, cnpj):
+    return [e for e in client.get("/empresas", headers=usuario.headers).json() if e["cnpj"] == cnpj]
+
+
+def test_repeticao_reproduz_a_resposta_sem_gravar_de_novo(client, usuario):
+    dados = dados_empresa()
+    headers = {**usuario.headers, "Idempotency-Key": "criar-1"}
+
+    primeira = client.post("/empresa", json=dados, headers=headers)
+    repetida = client.post("/empresa", json=dados, headers=headers)
+
+    assert primeira.status_code == repetida.status_code == 201
+    assert repetida.headers["idempotent-replayed"] == "true"
+    assert repetida.content == primeira.content
+    assert len(_empresas(client, usuario, dados["cnpj"])) == 1
+
+
+def test_mesma_chave_com_outro_corpo_e_rejeitada(client, usuario):
+    headers = {**usuario.headers, "Idempotency-Key": "criar-2"}
+    assert client.post("/empresa", json=dados_empresa(), headers=headers).status_code == 201
+    assert client.post("/empresa", json=dados_empresa(), headers=headers).status_code == 422
+
+
+def test_chave_vale_por_cliente(client, usuario, outro_usuario):
+    chave = {"Idempotency-Key": "criar-3"}
+    assert client.post("/empresa", json=dados_empresa(), headers={**usuario.headers, **chave}).status_code == 201
+    resposta = client.post("/empresa", json=dados_empresa(), headers={**outro_usuario.headers, **chave})
+    assert resposta.status_code == 201
+    assert "idempotent-replayed" not in resposta.headers
+
+
+def test_erro_do_cliente_tambem_e_reproduzido(client, usuario):
+    dados = dados_empresa()
+    assert client.post("/empresa", json=dados, headers=usuario.headers).status_code == 201
+
+    headers = {**usuario.headers, "Idempotency-Key": "duplicada"}
+    primeira = client.post("/empresa", json=dados, headers=headers)
+    repetida = client.post("/empresa", json=dados, headers=headers)
+    assert primeira.status_code == repetida.status_code == 409
+    assert repetida.headers["idempotent-replayed"] == "true"
+
+
+def test_chave_invalida(client, usuario):
+    headers = {**usuario.headers, "Idempotency-Key": "x" * 256}
+    assert client.post("/empresa", json=dados_empresa(), headers=headers).status_code == 400
@@ -0,0 +1,41 @@
+"""Rotação do refresh token e revogação (logout e desativação) dos tokens."""
+from conftest import criar_usuario
+
+
+def test_login_e_rotacao_do_refresh_token(client):
+    usuario = criar_usuario(senha="senha-forte")
+    login = client.post("/login", data={"username": usuario.email, "password": usuario.senha})
+    assert login.status_code == 200
+    refresh = login.json()["refresh_token"]
+
+    renovado = client.post("/refresh", json={"refresh_token": refresh})
+    assert renovado.status_code == 200
+    novo = renovado.json()
+    assert client.get("/empresas", headers={"Authorization": f"Bearer {novo['access_token']}"}).status_code == 200
+
+    # O refresh token usado foi revogado; o novo continua valendo
+    assert client.post("/refresh", json={"refresh_token": refresh}).status_code == 401
+    assert client.post("/refresh", json={"refresh_token": novo["refresh_token"]}).status_code == 200
+
+
+def test_access_token_nao_serve_como_refresh(client, usuario):
+    access_token = usuario.headers["Authorization"].split()[1]
+    assert client.post("/refresh", json={"refresh_token": access_token}).status_code == 401
+
+
+def test_logout_revoga_os_dois_tokens(client, usuario):
+    assert client.get("/empresas", headers=usuario.headers).status_code == 200
+    resposta = client.post("/logout", json={"refresh_token": usuario.refresh_token}, headers=usuario.headers)
+    assert resposta.status_code == 204
+
+    assert client.get("/empresas", headers=usuario.headers).status_code == 401
+    assert client.post("/refresh", json={"refresh_token": usuario.refresh_token}).status_code == 401
+
+
+def test_desativacao_revoga_os_tokens_emitidos(client, usuario, admin):
+    assert client.post(f"/usuarios/{usuario.id}/desativar", headers=usuario.headers).status_code == 403
+    assert client.post(f"/usuarios/{usuario.id}/desativar", headers=admin.headers).status_code == 204
+
+    assert client.get("/empresas", headers=usuario.headers).status_code == 401
+    assert client.post("/refresh", json={"refresh_token": usuario.refresh_token}).status_code == 401
+    assert client.get("/empresas", headers=admin.headers).status_code == 200
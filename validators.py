@@ -1,55 +1,65 @@
 import re
-from typing import Any, Optional
+from typing import Any, List, Optional
 
 class CNPJError(ValueError):
     """Exceção para erros de validação de CNPJ."""
     pass
 
-def validar_cnpj(cnpj: str) -> bool:
+def calcular_digitos_cnpj(base: str) -> str:
     """
-    Valida um CNPJ.
+    Calcula os dois dígitos verificadores de um CNPJ.
     
     Args:
-        cnpj: CNPJ a ser validado (com ou sem formatação)
+        base: Os 12 primeiros dígitos do CNPJ (raiz e filial)
         
     Returns:
-        bool: True se o CNPJ for válido, False caso contrário
+        str: Os dois dígitos verificadores
     """
-    # Remove caracteres não numéricos
-    cnpj = ''.join(filter(str.isdigit, cnpj))
-    
-    # Verifica se tem 14 dígitos
-    if len(cnpj) != 14:
-        return False
-    
-    # Verifica se todos os dígitos são iguais
-    if len(set(cnpj)) == 1:
-        return False
-    
     # Cálculo do primeiro dígito verificador
     soma = 0
     peso = 5
     for i in range(12):
-        soma += int(cnpj[i]) * peso
+        soma += int(base[i]) * peso
         peso = 9 if peso == 2 else peso - 1
     
     resto = soma % 11
     digito1 = 0 if resto < 2 else 11 - resto
     
-    if int(cnpj[12]) != digito1:
-        return False
-    
     # Cálculo do segundo dígito verificador
+    base += str(digito1)
     soma = 0
     peso = 6
     for i in range(13):
-        soma += int(cnpj[i]) * peso
+        soma += int(base[i]) * peso
         peso = 9 if peso == 2 else peso - 1
     
     resto = soma % 11
     digito2 = 0 if resto < 2 else 11 - resto
     
-    return int(cnpj[13]) == digito2
+    return f"{digito1}{digito2}"
+
+def validar_cnpj(cnpj: str) -> bool:
+    """
+    Valida um CNPJ.
+    
+    Args:
+        cnpj: CNPJ a ser validado (com ou sem formatação)
+        
+    Returns:
+        bool: True se o CNPJ for válido, False caso contrário
+    """
+    # Remove caracteres não numéricos
+    cnpj = ''.join(filter(str.isdigit, cnpj))
+    
+    # Verifica se tem 14 dígitos
+    if len(cnpj) != 14:
+        return False
+    
+    # Verifica se todos os dígitos são iguais
+    if len(set(cnpj)) == 1:
+        return False
+    
+    return cnpj[12:] == calcular_digitos_cnpj(cnpj[:12])
 
 def formatar_cnpj(cnpj: str) -> str:
     """
@@ -72,3 +82,35 @@ def formatar_cnpj(cnpj: str) -> str:
     
     # Formata o CNPJ (00.000.000/0000-00)
     return f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}"
+
+def normalizar_cnpj(cnpj: str) -> str:
+    """
+    Valida um CNPJ e retorna apenas os seus dígitos, como é gravado no banco.
+    
+    Args:
+        cnpj: CNPJ com ou sem formatação
+        
+    Returns:
+        str: Os 14 dígitos do CNPJ
+        
+    Raises:
+        CNPJError: Se o CNPJ não for válido
+    """
+    if not validar_cnpj(cnpj):
+        raise CNPJError("CNPJ inválido")
+    
+    return ''.join(filter(str.isdigit, cnpj))
+
+def normalizar_cnpjs(cnpjs: List[str]) -> List[Optional[str]]:
+    """
+    Normaliza uma lista de CNPJs de uma vez, sem levantar exceções.
+    
+    Usada pelos jobs de importação, que validam os lotes em outro processo.
+    
+    Args:
+        cnpjs: CNPJs com ou sem formatação
+        
+    Returns:
+        List[Optional[str]]: Os 14 dígitos de cada CNPJ, ou None para os inválidos
+    """
+    return [''.join(filter(str.isdigit, cnpj)) if validar_cnpj(cnpj) else None for cnpj in cnpjs]